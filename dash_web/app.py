@@ -1,3 +1,6 @@
+import sys
+import time
+
 import dash
 from dash import Dash, html, dcc, callback, Input, Output
 import dash_bootstrap_components as dbc
@@ -29,7 +32,10 @@ THEMES = {
     "Yeti": dbc.themes.YETI,
 }
 
+# 页面模块只注册页面, 数据和图在第一次打开页面时才计算, 见 dash_web/lazy.py
+start = time.perf_counter()
 app = Dash(__name__, use_pages=True)
+logger.info(f"加载 {len(dash.page_registry)} 个页面耗时 {time.perf_counter() - start:.3f}s")
 
 # 硬编码的自定义导航顺序
 CUSTOM_ORDER = [
@@ -103,7 +109,20 @@ def update_theme_store(selected_theme):
     return selected_theme
 
 
+def warmup_report():
+    """依次渲染每个页面, 打印每个页面的首次渲染耗时, 不启动服务"""
+    from dash_web.lazy import log_report
+    for page in nav_pages:
+        if callable(page['layout']):
+            page['layout']()
+    log_report('页面首次渲染')
+
+
 if __name__ == '__main__':
+    # python -m dash_web.app --report  只打印各页面渲染耗时
+    if '--report' in sys.argv:
+        warmup_report()
+        sys.exit(0)
     logger.info("start dash")
     logger.info("可用主题: " + ", ".join(THEMES.keys()))
     app.run(host='0.0.0.0', port=8050, debug=True)
@@ -0,0 +1,92 @@
+"""
+长周期多序列图
+
+每个序列先降采样再画, 见 utils/downsample.py.
+register_zoom 给图注册 relayoutData 回调: 用户缩放/拖动 rangeslider/点范围按钮后,
+按新的可见范围重新降采样, 放大到足够小的范围时就是原始精度.
+"""
+from typing import Callable, List, Optional, Tuple
+
+import pandas as pd
+import plotly.graph_objects as go
+from dash import Input, Output, callback, no_update
+
+from utils.downsample import downsample_series
+
+# 可见范围内所有序列的总点数, 平均分给每个序列, 每个序列至少 MIN_POINTS 个点
+TOTAL_POINTS = 30000
+MIN_POINTS = 300
+
+
+def downsampled_figure(
+    df: pd.DataFrame,
+    x_col: str,
+    columns: Optional[List[str]] = None,
+    x_range: Optional[Tuple] = None,
+    mode: str = 'lines',
+    max_points: Optional[int] = None,
+    method: str = 'lttb',
+) -> go.Figure:
+    """
+    宽表 -> 每列一条线的图, 和 px.line(df, x=x_col, y=columns) 一样, 但每条线都降采样过
+
+    Args:
+        df: 宽表, x_col 为日期列
+        columns: 要画的列, 默认除 x_col 外所有列
+        x_range: 可见范围, None 为全部
+        mode: lines | markers | lines+markers
+        max_points: 每个序列的点数, 默认按 TOTAL_POINTS 平均分配
+    """
+    df = df.sort_values(x_col)
+    columns = columns or [c for c in df.columns if c != x_col]
+    if max_points is None:
+        max_points = max(MIN_POINTS, TOTAL_POINTS // max(len(columns), 1))
+    fig = go.Figure()
+    for col in columns:
+        x, y = downsample_series(df[x_col], df[col], max_points=max_points, x_range=x_range, method=method)
+        fig.add_trace(go.Scatter(x=x, y=y, mode=mode, name=str(col)))
+    # 回调更新图时保留用户的缩放、图例开关
+    fig.update_layout(uirevision=x_col)
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
+    return fig
+
+
+def relayout_x_range(relayout: Optional[dict]) -> Tuple[bool, Optional[Tuple]]:
+    """
+    解析 relayoutData
+
+    Returns:
+        (横轴范围是否变化, 新范围), 范围为 None 表示恢复全部(autorange)
+    """
+    if not relayout:
+        return False, None
+    if 'xaxis.range[0]' in relayout and 'xaxis.range[1]' in relayout:
+        return True, (relayout['xaxis.range[0]'], relayout['xaxis.range[1]'])
+    if 'xaxis.range' in relayout:
+        return True, tuple(relayout['xaxis.range'])
+    if relayout.get('xaxis.autorange'):
+        return True, None
+    return False, None
+
+
+def register_zoom(graph_id: str, build_fig: Callable[[Optional[Tuple]], go.Figure]):
+    """
+    注册缩放回调
+
+    Args:
+        graph_id: dcc.Graph 的 id
+        build_fig: build_fig(x_range) -> Figure, x_range 为 None 时画全部
+    """
+    @callback(
+        Output(graph_id, 'figure'),
+        Input(graph_id, 'relayoutData'),
+        prevent_initial_call=True,
+    )
+    def on_relayout(relayout):
+        changed, x_range = relayout_x_range(relayout)
+        if not changed:
+            return no_update
+        return build_fig(x_range)
+
+    return on_relayout
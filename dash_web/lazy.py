@@ -0,0 +1,63 @@
+"""
+页面懒加载
+
+页面模块 import 时不读数据、不画图, 只在第一次打开时计算:
+- lazy_layout 装饰页面的 layout 函数, 记录每个页面每次渲染的耗时
+- 传入 datasets 时整个页面按数据文件缓存, 文件不变直接返回上次的结果
+- 页面出错只影响这个页面, 显示错误信息, 不影响其他页面和服务启动
+"""
+import functools
+import time
+from typing import Callable, Dict, List, Optional
+
+import dash_bootstrap_components as dbc
+from dash import html
+from loguru import logger
+
+from utils.data_cache import cached_by_datasets
+
+# 页面 -> {renders, first, last, error}
+PAGE_STATS: Dict[str, dict] = {}
+
+
+def lazy_layout(datasets: Optional[List[str]] = None):
+    """
+    Args:
+        datasets: 页面依赖的数据集(名字或路径), 这些文件不变时复用上次生成的页面
+    """
+    def decorator(func: Callable):
+        page = func.__module__.split('.')[-1]
+
+        @functools.wraps(func)
+        def wrapper(**kwargs):
+            stats = PAGE_STATS.setdefault(page, {'renders': 0, 'first': None, 'last': None, 'error': ''})
+            start = time.perf_counter()
+            try:
+                if datasets and not kwargs:
+                    res = cached_by_datasets(('layout', page), datasets, func)
+                else:
+                    res = func(**kwargs)
+                stats['error'] = ''
+            except Exception as e:
+                logger.exception(f"页面 {page} 渲染失败")
+                stats['error'] = str(e)
+                res = dbc.Alert(
+                    [html.H5(f"页面 {page} 加载失败", className="alert-heading"), html.P(str(e))],
+                    color="danger",
+                )
+            elapsed = time.perf_counter() - start
+            stats['renders'] += 1
+            stats['last'] = elapsed
+            if stats['first'] is None:
+                stats['first'] = elapsed
+                logger.info(f"页面 {page} 首次渲染耗时 {elapsed:.3f}s")
+            return res
+        return wrapper
+    return decorator
+
+
+def log_report(title: str = '页面耗时'):
+    """打印每个页面的首次/最近渲染耗时和错误"""
+    for page, s in sorted(PAGE_STATS.items(), key=lambda kv: kv[1]['first'] or 0, reverse=True):
+        status = f"失败: {s['error']}" if s['error'] else 'ok'
+        logger.info(f"{title} {page}: 首次 {s['first']:.3f}s, 最近 {s['last']:.3f}s, 共 {s['renders']} 次, {status}")
@@ -1,7 +1,10 @@
-from dash import Dash, dcc, html, Input, Output, callback
+from dash import Dash, dcc, html, Input, Output, Patch, callback, ctx
 import plotly.graph_objects as go
 import pandas as pd
 import dash
+
+from dash_web.lazy import lazy_layout
+from utils.ohlcv import DEFAULT_SYMBOL, list_symbols, load_ohlcv
 # from pathlib import Path
 # import sys
 #
@@ -12,26 +15,32 @@ import dash
 dash.register_page(__name__)
 # app = Dash(__name__, use_pages=True, pages_folder="my_apps")
 
-layout = html.Div(
-    [
-        html.H4("google stock candlestick chart"),
-        dcc.Checklist(
-            id="toggle-rangeslider",
-            options=[{"label": "Include Rangeslider", "value": "slider"}],
-            value=["slider"],
-        ),
-        dcc.Graph(id="graph"),
-    ]
-)
 
+@lazy_layout()
+def layout(**kwargs):
+    symbols = list_symbols()
+    return html.Div(
+        [
+            html.H4("个股K线"),
+            dcc.Dropdown(
+                id="company-symbol",
+                options=symbols,
+                value=DEFAULT_SYMBOL if DEFAULT_SYMBOL in symbols else (symbols[0] if symbols else None),
+                clearable=False,
+                style={"width": "300px"},
+            ),
+            dcc.Checklist(
+                id="toggle-rangeslider",
+                options=[{"label": "Include Rangeslider", "value": "slider"}],
+                value=["slider"],
+            ),
+            dcc.Graph(id="graph"),
+        ]
+    )
 
-@callback(
-    Output("graph", "figure"),
-    Input("toggle-rangeslider", "value"),
-)
-def display_candlestick(value):
-    # "https://raw.githubusercontent.com/plotly/datasets/master/finance-charts-apple.csv"
-    df = pd.read_excel("datas/raw/stocks/gegu_stock_ak.xlsx")
+
+def build_candlestick(symbol: str, show_slider: bool) -> go.Figure:
+    df = load_ohlcv(symbol)
 
     fig = go.Figure(
         go.Candlestick(
@@ -43,14 +52,15 @@ def display_candlestick(value):
         )
     )
     fig.update_layout(
-        xaxis_rangeslider_visible="slider" in value,
         height=1000,
+        # 切换选项时保留缩放
+        uirevision=symbol,
     )
     fig.update_xaxes(
         # dtick="M1",
         # tickformat="%b\n%Y",
         # tickformat="%Y",
-        rangeslider_visible=True,  # 添加滑动块
+        rangeslider_visible=show_slider,  # 添加滑动块
         # 范围选择器按钮
         rangeselector=dict(
             buttons=list([
@@ -70,5 +80,22 @@ def display_candlestick(value):
     return fig
 
 
+@callback(
+    Output("graph", "figure"),
+    Input("company-symbol", "value"),
+    Input("toggle-rangeslider", "value"),
+)
+def display_candlestick(symbol, value):
+    show_slider = "slider" in value
+    if ctx.triggered_id == "toggle-rangeslider":
+        # 只切换滑动块, 不重新读数据、不重新发送整个图
+        patched = Patch()
+        patched["layout"]["xaxis"]["rangeslider"]["visible"] = show_slider
+        return patched
+    if not symbol:
+        return go.Figure()
+    return build_candlestick(symbol, show_slider)
+
+
 # if __name__ == "__main__":
 #     app.run_server(debug=True)
@@ -6,6 +6,10 @@ import plotly.express as px
 from loguru import logger
 from pathlib import Path
 
+from dash_web.charts import downsampled_figure, register_zoom
+from dash_web.lazy import lazy_layout
+from utils.data_cache import dataset_path, get_frame
+
 
 dash.register_page(__name__)
 
@@ -69,19 +73,15 @@ dash.register_page(__name__)
 #     )
 # )
 
-def get_fig(csv_path: str, x_key: str, y_title: str) -> go.Figure:
-    df = pd.read_csv(csv_path)
+def get_fig(csv_path: str, x_key: str, y_title: str, x_range=None) -> go.Figure:
+    df = get_frame(csv_path)
     # breakpoint()
-    fig = px.line(
-    # fig = px.area(
-    # fig = px.scatter(
-        df,
-        x=x_key,
-        y=df.columns,
-        hover_data={x_key: "|%B %d, %Y"},
+    # 每个指数降采样后再画, x_range 为当前可见范围
+    fig = downsampled_figure(df, x_key, x_range=x_range)
+    fig.update_layout(
         title='indexes chart',
-        color_discrete_sequence=px.colors.qualitative.Dark24,  # Alphabet, Light24, Dark24
-
+        colorway=px.colors.qualitative.Dark24,  # Alphabet, Light24, Dark24
+        xaxis_hoverformat="%B %d, %Y",
     )
     fig.update_layout(
         height=1000,
@@ -114,54 +114,50 @@ def get_fig(csv_path: str, x_key: str, y_title: str) -> go.Figure:
     )
     return fig
 
-# 归一化指数图
-
-# 模糊获取文件路径
-data_dir = Path("datas/processed/indexes")
-file_pattern = "ak_index_global_merged_*.csv"
-matching_files = list(data_dir.glob(file_pattern))
-if not matching_files:
-    raise FileNotFoundError(f"No files matching pattern {file_pattern} found in {data_dir}")
-
-logger.info(f"找到归一化指数数据文件一共 {len(matching_files)}个")
-# 选择日期最大的csv
-matching_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-csv_path = str(matching_files[0])
-logger.info(f"最新的归一化指数数据文件: {csv_path}")
-
-# 提取start
-start = matching_files[0].stem.split("_")[-1]
-logger.info(f"使用的归一化指数数据文件: {csv_path}, 起始日期: {start}")
-
-fig1 = get_fig(csv_path, "日期", "归一化值, 起始于 " + start)
-
-
 # 美元计价指数图, out 了
 # fig2 = get_fig("datas/processed/indexes/all_indexes_data_usd2.csv", "date", "USD(美元)")
 
 
-layout = html.Div(
-    [
-        html.H4("全球经济走势，关注变化，而不是价格"),
-        html.P(
-            "不同国家的股票市场指数"
-            "（如上证指数、标普500、日经225、沪深300等）"
-            "的单位（数值大小）并不相同，而且它们的计算方法、"
-            "基期、基点也各不相同，因此直接比较指数的点数"
-            "是没有意义的"
-        ),
-        # dcc.Checklist(
-        #     id="toggle-rangeslider",
-        #     options=[{"label": "Include Rangeslider", "value": "slider"}],
-        #     value=["slider"],
-        # ),
-        # dcc.Graph(id="graph3"),
-
-
-        dcc.Graph(figure=fig1,),
-        # dcc.Graph(figure=fig2,),
-    ]
-)
+def build_index_fig(x_range=None) -> go.Figure:
+    """归一化指数图, 使用日期最大的合并文件"""
+    csv_path = dataset_path('index_merged')
+    # 提取start
+    start = csv_path.stem.split("_")[-1]
+    return get_fig(csv_path, "日期", "归一化值, 起始于 " + start, x_range)
+
+
+register_zoom('index-graph', build_index_fig)
+
+
+@lazy_layout(datasets=['index_merged'])
+def layout(**kwargs):
+    """页面布局, 第一次打开时计算, 数据文件不变时复用"""
+    csv_path = dataset_path('index_merged')
+    logger.info(f"使用的归一化指数数据文件: {csv_path}")
+    fig1 = build_index_fig()
+
+    return html.Div(
+        [
+            html.H4("全球经济走势，关注变化，而不是价格"),
+            html.P(
+                "不同国家的股票市场指数"
+                "（如上证指数、标普500、日经225、沪深300等）"
+                "的单位（数值大小）并不相同，而且它们的计算方法、"
+                "基期、基点也各不相同，因此直接比较指数的点数"
+                "是没有意义的"
+            ),
+            # dcc.Checklist(
+            #     id="toggle-rangeslider",
+            #     options=[{"label": "Include Rangeslider", "value": "slider"}],
+            #     value=["slider"],
+            # ),
+            # dcc.Graph(id="graph3"),
+
+
+            dcc.Graph(id='index-graph', figure=fig1,),
+            # dcc.Graph(figure=fig2,),
+        ]
+    )
 
 
 # @callback(
@@ -10,6 +10,9 @@ import dash
 from loguru import logger
 
 from utils.clean_data import merge_res
+from dash_web.charts import downsampled_figure, register_zoom
+from dash_web.lazy import lazy_layout
+from utils.data_cache import cached_by_datasets, get_frame
 
 # import sys
 #
@@ -116,18 +119,12 @@ def merge_cpis(res_path: str):
 #     print('addr:', addr)
     
     
-def gene_fig(csv_path: str, yaxis_title: str, title: str):
-    df = pd.read_csv(csv_path)
+def gene_fig(csv_path: str, yaxis_title: str, title: str, x_range=None):
+    df = get_frame(csv_path)
     # breakpoint()
-    # fig = px.line(
-    fig = px.scatter(
-        df,
-        x="date",
-        y=df.columns,
-        hover_data={"date": "|%B %d, %Y"},
-        title=title,
-
-    )
+    # 散点图, 降采样时保留每段的最大最小值, x_range 为当前可见范围
+    fig = downsampled_figure(df, 'date', x_range=x_range, mode='markers', method='minmax')
+    fig.update_layout(title=title, xaxis_hoverformat="%B %d, %Y")
     fig.update_layout(
         height=1000,
         # xaxis_title='花萼宽度（cm）',
@@ -164,77 +161,86 @@ def gene_fig(csv_path: str, yaxis_title: str, title: str):
 
 gdp_res = 'datas/processed/gdps/all_data.csv'
 cpi_res = 'datas/processed/cpis/all_data.csv'
-merge_gdps(gdp_res)
-merge_cpis(cpi_res)
-
-
-fig_gdp = gene_fig(gdp_res, 'GDP年率', 'GDP年率')
-fig_cpi = gene_fig(cpi_res, 'CPI年率', 'CPI年率(e.g., 数值为2.5，意味着物价一年涨2.5%)')
-# fig_unemp = gene_fig("datas/processed/unemps/all_unemps_data.csv", '失业率', '失业率')
-
-
-layout = html.Div(
-    [
-        html.H4("全球经济周期"),
-        html.H6("GDP年率，经济发展状况"),
-        html.H6("CPI年率，反应物价波动状况"),
-        # html.H6("失业率， 经济周期中，通常和GDP，CPI成反方向"),
-        html.H6("GDP， CPI表示经济周期：上升，高点，下降，低点"),
-        html.H5("经济周期阶段特征"),
-        dbc.Table(
-            [
-                html.Thead(
-                    html.Tr([
-                        html.Th("经济周期阶段"),
-                        html.Th("GDP变化趋势"),
-                        html.Th("CPI变化趋势")
+GDP_TITLE = ('GDP年率', 'GDP年率')
+CPI_TITLE = ('CPI年率', 'CPI年率(e.g., 数值为2.5，意味着物价一年涨2.5%)')
+
+register_zoom('gdp-graph', lambda x_range: gene_fig(gdp_res, *GDP_TITLE, x_range))
+register_zoom('cpi-graph', lambda x_range: gene_fig(cpi_res, *CPI_TITLE, x_range))
+
+
+@lazy_layout()
+def layout(**kwargs):
+    """页面布局, 第一次打开时合并数据和画图"""
+    # 合并结果不存在时才合并, 不在 import 时做
+    merge_gdps(gdp_res)
+    merge_cpis(cpi_res)
+
+    fig_gdp = cached_by_datasets('fig_gdp', [gdp_res], lambda: gene_fig(gdp_res, *GDP_TITLE))
+    fig_cpi = cached_by_datasets('fig_cpi', [cpi_res], lambda: gene_fig(cpi_res, *CPI_TITLE))
+    # fig_unemp = gene_fig("datas/processed/unemps/all_unemps_data.csv", '失业率', '失业率')
+
+    return html.Div(
+        [
+            html.H4("全球经济周期"),
+            html.H6("GDP年率，经济发展状况"),
+            html.H6("CPI年率，反应物价波动状况"),
+            # html.H6("失业率， 经济周期中，通常和GDP，CPI成反方向"),
+            html.H6("GDP， CPI表示经济周期：上升，高点，下降，低点"),
+            html.H5("经济周期阶段特征"),
+            dbc.Table(
+                [
+                    html.Thead(
+                        html.Tr([
+                            html.Th("经济周期阶段"),
+                            html.Th("GDP变化趋势"),
+                            html.Th("CPI变化趋势")
+                        ])
+                    ),
+                    html.Tbody([
+                        html.Tr([
+                            html.Td("复苏期"),
+                            html.Td("上升 ↑"),
+                            html.Td("下降 ↓")
+                        ]),
+                        html.Tr([
+                            html.Td("过热期"),
+                            html.Td("上升 ↑"),
+                            html.Td("上升 ↑")
+                        ]),
+                        html.Tr([
+                            html.Td("滞胀期"),
+                            html.Td("下降 ↓"),
+                            html.Td("上升 ↑")
+                        ]),
+                        html.Tr([
+                            html.Td("衰退期"),
+                            html.Td("下降 ↓"),
+                            html.Td("下降 ↓")
+                        ])
                     ])
-                ),
-                html.Tbody([
-                    html.Tr([
-                        html.Td("复苏期"),
-                        html.Td("上升 ↑"),
-                        html.Td("下降 ↓")
-                    ]),
-                    html.Tr([
-                        html.Td("过热期"),
-                        html.Td("上升 ↑"),
-                        html.Td("上升 ↑")
-                    ]),
-                    html.Tr([
-                        html.Td("滞胀期"),
-                        html.Td("下降 ↓"),
-                        html.Td("上升 ↑")
-                    ]),
-                    html.Tr([
-                        html.Td("衰退期"),
-                        html.Td("下降 ↓"),
-                        html.Td("下降 ↓")
-                    ])
-                ])
-            ],
-            bordered=True,
-            striped=True,
-            hover=True,
-            responsive=True,
-            style={
-                'margin-top': '20px',
-                'margin-bottom': '20px'
-            }
-        ),
-        # dcc.Checklist(
-        #     id="toggle-rangeslider",
-        #     options=[{"label": "Include Rangeslider", "value": "slider"}],
-        #     value=["slider"],
-        # ),
-        # dcc.Graph(id="graph3"),
-
-
-        dcc.Graph(figure=fig_gdp,),
-        dcc.Graph(figure=fig_cpi,),
-        # dcc.Graph(figure=fig_unemp,),
-    ]
-)
+                ],
+                bordered=True,
+                striped=True,
+                hover=True,
+                responsive=True,
+                style={
+                    'margin-top': '20px',
+                    'margin-bottom': '20px'
+                }
+            ),
+            # dcc.Checklist(
+            #     id="toggle-rangeslider",
+            #     options=[{"label": "Include Rangeslider", "value": "slider"}],
+            #     value=["slider"],
+            # ),
+            # dcc.Graph(id="graph3"),
+
+
+            dcc.Graph(id='gdp-graph', figure=fig_gdp,),
+            dcc.Graph(id='cpi-graph', figure=fig_cpi,),
+            # dcc.Graph(figure=fig_unemp,),
+        ]
+    )
 
 
 # @callback(
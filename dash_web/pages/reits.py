@@ -9,6 +9,10 @@ import dash
 
 from loguru import logger
 
+from dash_web.charts import downsampled_figure, register_zoom
+from dash_web.lazy import lazy_layout
+from utils.data_cache import get_frame
+
 
 dash.register_page(__name__)
 
@@ -30,10 +34,6 @@ def analyze_reits_data(df):
             'avg_volume': 0
         }
     
-    # 确保数据类型正确
-    df['涨跌幅'] = pd.to_numeric(df['涨跌幅'], errors='coerce')
-    df['成交量'] = pd.to_numeric(df['成交量'], errors='coerce')
-    
     # 基本统计
     total_reits = len(df)
     rising_reits = len(df[df['涨跌幅'] > 0])
@@ -90,157 +90,162 @@ def get_reits_categories(df):
     return category_counts
 
 
-# 处理实时整体数据, 前两个块
-df_reits = pd.read_csv('datas/raw/reits/reits_realtime_em.csv')
-analysis = analyze_reits_data(df_reits)
-category_counts = get_reits_categories(df_reits)
-
-# 绘制整体的历史数据图, 用merged的历史数据
-df = pd.read_csv('datas/processed/reits/reits_merged.csv', parse_dates=['日期'])
-
-# 用px.line绘图，y是所有非日期列
-fig = px.line(
-    df,
-    x='日期',
-    y=[col for col in df.columns if col != '日期'],
-    title='REITs历史价格走势',
-    color_discrete_sequence=px.colors.qualitative.Dark24,
-)
-
-fig.update_layout(
-    title='REITs历史价格走势',
-    xaxis_title='日期',
-    yaxis_title='开盘价',
-    legend_title='REITs名称',
-    height=1000,
-    template='plotly_white'
-)
-fig.update_xaxes(
-    rangeslider_visible=True,  # 添加滑动块
-    minor=dict(ticks="inside", showgrid=True),  # 辅助刻度
-    # 范围选择器按钮
-    rangeselector=dict(
-        buttons=list([
-            dict(count=1, label="1month", step="month", stepmode="backward"),
-            dict(count=6, label="6month", step="month", stepmode="backward"),
-            dict(count=1, label="1year", step="year", stepmode="backward"),
-            dict(count=3, label="3year", step="year", stepmode="backward"),
-            dict(count=5, label="5year", step="year", stepmode="backward"),
-            dict(count=10, label="10year", step="year", stepmode="backward"),
-            dict(count=20, label="20year", step="year", stepmode="backward"),
-            dict(step="all")
-        ])
+def build_history_fig(x_range=None) -> go.Figure:
+    """绘制整体的历史数据图, 用merged的历史数据"""
+    df = get_frame('reits_merged')
+
+    # 每个REITs降采样后再画, x_range 为当前可见范围
+    fig = downsampled_figure(df, '日期', x_range=x_range)
+
+    fig.update_layout(
+        colorway=px.colors.qualitative.Dark24,
+        title='REITs历史价格走势',
+        xaxis_title='日期',
+        yaxis_title='开盘价',
+        legend_title='REITs名称',
+        height=1000,
+        template='plotly_white'
+    )
+    fig.update_xaxes(
+        rangeslider_visible=True,  # 添加滑动块
+        minor=dict(ticks="inside", showgrid=True),  # 辅助刻度
+        # 范围选择器按钮
+        rangeselector=dict(
+            buttons=list([
+                dict(count=1, label="1month", step="month", stepmode="backward"),
+                dict(count=6, label="6month", step="month", stepmode="backward"),
+                dict(count=1, label="1year", step="year", stepmode="backward"),
+                dict(count=3, label="3year", step="year", stepmode="backward"),
+                dict(count=5, label="5year", step="year", stepmode="backward"),
+                dict(count=10, label="10year", step="year", stepmode="backward"),
+                dict(count=20, label="20year", step="year", stepmode="backward"),
+                dict(step="all")
+            ])
+        )
     )
-)
+    return fig
+
+
+register_zoom('reits-history-graph', build_history_fig)
 
 
 # 创建布局
-layout = dbc.Container([
-    # 页面标题
-    dbc.Row([
-        dbc.Col([
-            html.Div([
-                html.H1(
-                    '🏢 REITs市场分析',
-                    className='text-center mb-3',
-                    style={'color': '#2E86AB', 'fontWeight': 'bold'}
-                ),
-                html.P(
-                    '房地产投资信托基金(REITs)实时数据与分析',
-                    className='text-center text-muted lead mb-4'
-                )
-            ], className='py-4', style={'backgroundColor': '#f8f9fa'})
-        ], width=12)
-    ]),
+@lazy_layout(datasets=['reits_realtime', 'reits_merged'])
+def layout(**kwargs):
+    """页面布局, 第一次打开时计算, 数据文件不变时复用"""
+    # 处理实时整体数据, 前两个块
+    df_reits = get_frame('reits_realtime')
+    analysis = analyze_reits_data(df_reits)
+    category_counts = get_reits_categories(df_reits)
+
+    fig = build_history_fig()
+
+    return dbc.Container([
+        # 页面标题
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.H1(
+                        '🏢 REITs市场分析',
+                        className='text-center mb-3',
+                        style={'color': '#2E86AB', 'fontWeight': 'bold'}
+                    ),
+                    html.P(
+                        '房地产投资信托基金(REITs)实时数据与分析',
+                        className='text-center text-muted lead mb-4'
+                    )
+                ], className='py-4', style={'backgroundColor': '#f8f9fa'})
+            ], width=12)
+        ]),
     
-    # 数据概览卡片
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader('📊 REITs市场概览'),
-                dbc.CardBody([
-                    dbc.Row([
-                        dbc.Col([
-                            html.Div([
-                                html.H5('市场统计', className='text-primary'),
+        # 数据概览卡片
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader('📊 REITs市场概览'),
+                    dbc.CardBody([
+                        dbc.Row([
+                            dbc.Col([
                                 html.Div([
-                                    html.Span('总数量: ', className='fw-bold'),
-                                    html.Span(f"{analysis.get('total_reits', 0)}", className='text-info')
-                                ], className='mb-1'),
-                                html.Div([
-                                    html.Span('上涨: ', className='fw-bold'),
-                                    html.Span(f"{analysis.get('rising_reits', 0)}", className='text-success')
-                                ], className='mb-1'),
-                                html.Div([
-                                    html.Span('下跌: ', className='fw-bold'),
-                                    html.Span(f"{analysis.get('falling_reits', 0)}", className='text-danger')
-                                ], className='mb-1'),
-                                html.Div([
-                                    html.Span('平盘: ', className='fw-bold'),
-                                    html.Span(f"{analysis.get('flat_reits', 0)}", className='text-warning')
+                                    html.H5('市场统计', className='text-primary'),
+                                    html.Div([
+                                        html.Span('总数量: ', className='fw-bold'),
+                                        html.Span(f"{analysis.get('total_reits', 0)}", className='text-info')
+                                    ], className='mb-1'),
+                                    html.Div([
+                                        html.Span('上涨: ', className='fw-bold'),
+                                        html.Span(f"{analysis.get('rising_reits', 0)}", className='text-success')
+                                    ], className='mb-1'),
+                                    html.Div([
+                                        html.Span('下跌: ', className='fw-bold'),
+                                        html.Span(f"{analysis.get('falling_reits', 0)}", className='text-danger')
+                                    ], className='mb-1'),
+                                    html.Div([
+                                        html.Span('平盘: ', className='fw-bold'),
+                                        html.Span(f"{analysis.get('flat_reits', 0)}", className='text-warning')
+                                    ])
                                 ])
-                            ])
-                        ], md=4),
-                        dbc.Col([
-                            html.Div([
-                                html.H5('涨跌幅统计', className='text-info'),
-                                html.Div([
-                                    html.Span('平均涨跌: ', className='fw-bold'),
-                                    html.Span(f"{analysis.get('avg_change', 0):.2f}%", 
-                                             className='text-success' if analysis.get('avg_change', 0) > 0 else 'text-danger')
-                                ], className='mb-1'),
+                            ], md=4),
+                            dbc.Col([
                                 html.Div([
-                                    html.Span('最大涨幅: ', className='fw-bold'),
-                                    html.Span(f"{analysis.get('max_rise', 0):.2f}%", className='text-success')
-                                ], className='mb-1'),
-                                html.Div([
-                                    html.Span('最大跌幅: ', className='fw-bold'),
-                                    html.Span(f"{analysis.get('max_fall', 0):.2f}%", className='text-danger')
+                                    html.H5('涨跌幅统计', className='text-info'),
+                                    html.Div([
+                                        html.Span('平均涨跌: ', className='fw-bold'),
+                                        html.Span(f"{analysis.get('avg_change', 0):.2f}%", 
+                                                 className='text-success' if analysis.get('avg_change', 0) > 0 else 'text-danger')
+                                    ], className='mb-1'),
+                                    html.Div([
+                                        html.Span('最大涨幅: ', className='fw-bold'),
+                                        html.Span(f"{analysis.get('max_rise', 0):.2f}%", className='text-success')
+                                    ], className='mb-1'),
+                                    html.Div([
+                                        html.Span('最大跌幅: ', className='fw-bold'),
+                                        html.Span(f"{analysis.get('max_fall', 0):.2f}%", className='text-danger')
+                                    ])
                                 ])
-                            ])
-                        ], md=4),
-                        dbc.Col([
-                            html.Div([
-                                html.H5('成交量统计', className='text-warning'),
-                                html.Div([
-                                    html.Span('总成交量: ', className='fw-bold'),
-                                    html.Span(f"{analysis.get('total_volume', 0):,.0f}", className='text-info')
-                                ], className='mb-1'),
+                            ], md=4),
+                            dbc.Col([
                                 html.Div([
-                                    html.Span('平均成交量: ', className='fw-bold'),
-                                    html.Span(f"{analysis.get('avg_volume', 0):,.0f}", className='text-info')
+                                    html.H5('成交量统计', className='text-warning'),
+                                    html.Div([
+                                        html.Span('总成交量: ', className='fw-bold'),
+                                        html.Span(f"{analysis.get('total_volume', 0):,.0f}", className='text-info')
+                                    ], className='mb-1'),
+                                    html.Div([
+                                        html.Span('平均成交量: ', className='fw-bold'),
+                                        html.Span(f"{analysis.get('avg_volume', 0):,.0f}", className='text-info')
+                                    ])
                                 ])
-                            ])
-                        ], md=4)
+                            ], md=4)
+                        ])
                     ])
-                ])
-            ], className='border-0 shadow-sm mb-4')
-        ], width=12)
-    ]),
+                ], className='border-0 shadow-sm mb-4')
+            ], width=12)
+        ]),
     
-    # REITs分类统计
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader('📈 REITs分类统计'),
-                dbc.CardBody([
-                    dbc.Row([
-                        dbc.Col([
-                            html.Div([
-                                html.H6(category, className='text-center'),
-                                html.H4(count, className='text-center text-primary mb-0'),
-                                html.Small(f'{count/analysis.get("total_reits", 1)*100:.1f}%', 
-                                         className='text-muted d-block text-center')
-                            ])
-                        ], md=2) for category, count in category_counts.items()
+        # REITs分类统计
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader('📈 REITs分类统计'),
+                    dbc.CardBody([
+                        dbc.Row([
+                            dbc.Col([
+                                html.Div([
+                                    html.H6(category, className='text-center'),
+                                    html.H4(count, className='text-center text-primary mb-0'),
+                                    html.Small(f'{count/analysis.get("total_reits", 1)*100:.1f}%', 
+                                             className='text-muted d-block text-center')
+                                ])
+                            ], md=2) for category, count in category_counts.items()
+                        ])
                     ])
-                ])
-            ], className='border-0 shadow-sm mb-4')
-        ], width=12)
-    ]),
+                ], className='border-0 shadow-sm mb-4')
+            ], width=12)
+        ]),
     
-    # REITs图表
-    dcc.Graph(figure=fig,),
+        # REITs图表
+        dcc.Graph(id='reits-history-graph', figure=fig,),
     
     
-], fluid=True, className='py-4', style={'backgroundColor': '#f8f9fa'})
+    ], fluid=True, className='py-4', style={'backgroundColor': '#f8f9fa'})
@@ -3,6 +3,10 @@ import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
 import dash
+
+from dash_web.charts import downsampled_figure, register_zoom
+from dash_web.lazy import lazy_layout
+from utils.data_cache import get_frame
 # from pathlib import Path
 # import sys
 #
@@ -13,61 +17,68 @@ import dash
 dash.register_page(__name__)
 # app = Dash(__name__, use_pages=True, pages_folder="my_apps")
 
-df = pd.read_csv("datas/processed/virtual/all_virtual_data.csv")
-# breakpoint()
-fig = px.line(
-    df,
-    x="date",
-    y=df.columns,
-    hover_data={"date": "|%B %d, %Y"},
-    title='virtual chart',
-
-)
-fig.update_layout(
-    height=1000,
-    # xaxis_title='花萼宽度（cm）',
-    yaxis_title='USD(美元)',
-
-)
-# print('fig.layout.height', fig.layout.height)
-# print('fig.layout.width', fig.layout.width)
-
-fig.update_xaxes(
-    # dtick="M1",
-    # tickformat="%b\n%Y",
-    # tickformat="%Y",
-    rangeslider_visible=True,  # 添加滑动块
-    # 范围选择器按钮
-    rangeselector=dict(
-        buttons=list([
-            dict(count=1, label="1month", step="month", stepmode="backward"),
-            dict(count=6, label="6month", step="month", stepmode="backward"),
-            # dict(count=1, label="YTD", step="year", stepmode="todate"),
-            dict(count=1, label="1year", step="year", stepmode="backward"),
-            dict(count=3, label="3year", step="year", stepmode="backward"),
-            dict(count=5, label="5year", step="year", stepmode="backward"),
-            dict(count=10, label="10year", step="year", stepmode="backward"),
-            dict(count=20, label="20year", step="year", stepmode="backward"),
-            dict(step="all")
-        ])
+
+def build_virtual_fig(x_range=None) -> go.Figure:
+    """加密货币走势图"""
+    df = get_frame('virtual')
+    # 降采样后再画, x_range 为当前可见范围
+    fig = downsampled_figure(df, 'date', x_range=x_range)
+    fig.update_layout(title='virtual chart', xaxis_hoverformat="%B %d, %Y")
+    fig.update_layout(
+        height=1000,
+        # xaxis_title='花萼宽度（cm）',
+        yaxis_title='USD(美元)',
+
+    )
+    # print('fig.layout.height', fig.layout.height)
+    # print('fig.layout.width', fig.layout.width)
+
+    fig.update_xaxes(
+        # dtick="M1",
+        # tickformat="%b\n%Y",
+        # tickformat="%Y",
+        rangeslider_visible=True,  # 添加滑动块
+        # 范围选择器按钮
+        rangeselector=dict(
+            buttons=list([
+                dict(count=1, label="1month", step="month", stepmode="backward"),
+                dict(count=6, label="6month", step="month", stepmode="backward"),
+                # dict(count=1, label="YTD", step="year", stepmode="todate"),
+                dict(count=1, label="1year", step="year", stepmode="backward"),
+                dict(count=3, label="3year", step="year", stepmode="backward"),
+                dict(count=5, label="5year", step="year", stepmode="backward"),
+                dict(count=10, label="10year", step="year", stepmode="backward"),
+                dict(count=20, label="20year", step="year", stepmode="backward"),
+                dict(step="all")
+            ])
+        )
+        # ticklabelmode="period"
+    )
+    return fig
+
+
+register_zoom('virtual-graph', build_virtual_fig)
+
+
+@lazy_layout(datasets=['virtual'])
+def layout(**kwargs):
+    """页面布局, 第一次打开时计算, 数据文件不变时复用"""
+    fig = build_virtual_fig()
+
+    return html.Div(
+        [
+            html.H4("加密货币走势，关注变化，而不是价格"),
+            # dcc.Checklist(
+            #     id="toggle-rangeslider",
+            #     options=[{"label": "Include Rangeslider", "value": "slider"}],
+            #     value=["slider"],
+            # ),
+            # dcc.Graph(id="graph3"),
+
+
+            dcc.Graph(id='virtual-graph', figure=fig,),
+        ]
     )
-    # ticklabelmode="period"
-)
-
-layout = html.Div(
-    [
-        html.H4("加密货币走势，关注变化，而不是价格"),
-        # dcc.Checklist(
-        #     id="toggle-rangeslider",
-        #     options=[{"label": "Include Rangeslider", "value": "slider"}],
-        #     value=["slider"],
-        # ),
-        # dcc.Graph(id="graph3"),
-
-
-        dcc.Graph(figure=fig,),
-    ]
-)
 
 
 # @callback(
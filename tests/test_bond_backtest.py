@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from utils.logics.bond_backtest import BacktestParams, SnapshotPanel, position_ratios, run_backtest
+from utils.logics.bond_logic import POSITION_LEVELS, position_level
+
+
+def test_position_ratios_match_position_level():
+    uppers = [upper for upper, _, _ in POSITION_LEVELS[:-1]]
+    values = [100.0, *uppers, *[u - 0.01 for u in uppers], *[u + 0.01 for u in uppers], 300.0]
+    expected = [position_level(v)[1] for v in values]
+    assert position_ratios(np.array(values)).tolist() == expected
+
+
+def test_position_ratios_shift_and_nan():
+    assert position_ratios(np.array([165.0]), shift=20).tolist() == [position_level(145.0)[1]]
+    assert position_ratios(np.array([np.nan, 140.0])).tolist() == [0.0, 1.0]
+
+
+def test_run_backtest_weights_follow_position():
+    dates = pd.DatetimeIndex(['2025-01-02', '2025-01-03'])
+    n = 4
+    panel = SnapshotPanel(
+        dates=dates,
+        codes=np.array([f'11000{i}' for i in range(n)]),
+        price=np.full((2, n), 105.0),
+        premium=np.tile(np.arange(n, dtype=float), (2, 1)),
+        double_low=np.tile(100.0 + np.arange(n), (2, 1)),
+        eligible=np.ones((2, n), dtype=bool),
+        avg_low=np.array([140.0, np.nan]),
+        next_return=np.zeros((2, n)),
+    )
+    result = run_backtest(panel, BacktestParams(num=2))
+    # 第一天满仓, 第二天没有双低平均值, 空仓
+    assert np.allclose(result.weights.sum(axis=1), [1.0, 0.0])
+    assert (result.weights[0] > 0).sum() == 2
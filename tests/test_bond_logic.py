@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.logics.bond_logic import (
+    ConvertibleBondStrategy,
+    SignalState,
+    Strategy,
+    analyze_bonds,
+    analyze_convertible_bonds,
+    build_portfolio,
+    diff_weights,
+    get_convertible_bond_portfolio,
+    get_trade_signals,
+    holdings_turnover,
+    rebalance_diff,
+)
+
+
+@pytest.fixture
+def bonds():
+    """C, G 溢价率为 NaN; A, B, F, H 双低值都是 110"""
+    return pd.DataFrame({
+        'code': ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H'],
+        'price': [100.0, 105.0, 110.0, 95.0, 120.0, 101.0, 112.0, 99.0],
+        'premium_rate': [10.0, 5.0, np.nan, 20.0, 3.0, 9.0, np.nan, 11.0],
+        'stock_price': [10.0, 10.2, 11.0, 9.3, 12.0, 10.0, 11.0, 9.0],
+        'convert_price': 10.0,
+        'convert_value': [99.0, 104.0, 109.0, 90.0, 110.0, 100.0, 111.0, 98.0],
+        'stock_momentum': [0.1, 0.2, 0.5, 0.3, 0.4, np.nan, 0.6, 0.2],
+        'remain_size': 2.0,
+        'credit_rating': ['AAA', 'AA+', 'AA', 'AA', 'AAA', 'AA', 'AA+', 'AA'],
+        'duration': 2.0,
+    })
+
+
+def test_analyze_bonds(bonds):
+    res = analyze_bonds(bonds, Strategy.DOUBLE_LOW)
+    # 并列时的顺序和 DataFrame.nlargest 一致
+    assert [r['code'] for r in res] == ['A', 'B', 'H', 'F', 'D', 'E']
+    assert res[0] == {'code': 'A', 'strategy': 'double_low', 'score': -10.0, 'reason': '双低值:110.0'}
+    assert [r['code'] for r in analyze_bonds(bonds, Strategy.LOW_PREMIUM)] == ['E', 'B', 'F', 'A', 'H', 'D']
+    assert [r['code'] for r in analyze_bonds(bonds, Strategy.PAR_VALUE)] == ['A', 'E', 'F', 'D']
+    portfolio = build_portfolio(bonds, 'conservative')
+    assert list(portfolio) == ['A', 'B', 'H', 'F', 'D', 'E']
+    assert portfolio['A'] == pytest.approx(0.05) and portfolio['B'] == pytest.approx(0.05)
+
+
+def test_analyze_convertible_bonds_nan_fill(bonds):
+    res = analyze_convertible_bonds(bonds, ConvertibleBondStrategy.DOUBLE_LOW)
+    # 有效值不足 10 个时, 和 nsmallest 一样用双低值为 NaN 的行补齐
+    assert [r['code'] for r in res] == ['A', 'B', 'H', 'F', 'D', 'E', 'C', 'G']
+    assert res[1] == {'code': 'B', 'reason': '双低值:110.00, 溢价率:5.00%', 'score': -10.0}
+    assert res[-1]['reason'] == '双低值:nan, 溢价率:nan%' and np.isnan(res[-1]['score'])
+    par = analyze_convertible_bonds(bonds, ConvertibleBondStrategy.PAR_VALUE)
+    assert [r['code'] for r in par] == ['A', 'B', 'C', 'F', 'G', 'H']
+    high = analyze_convertible_bonds(bonds, ConvertibleBondStrategy.HIGH_PRICE)
+    assert high == [{'code': 'E', 'reason': '股性强,动量:0.40,价格:120.00', 'score': 0.4}]
+
+
+def test_get_convertible_bond_portfolio(bonds):
+    assert list(get_convertible_bond_portfolio(bonds, 'conservative')) == ['A', 'B', 'H', 'F', 'D', 'E', 'C', 'G']
+    assert get_convertible_bond_portfolio(bonds, 'moderate') == {k: 0.1 for k in 'ABHFCE'}
+    assert get_convertible_bond_portfolio(bonds, 'aggressive') == {k: 0.1 for k in 'ABCE'}
+
+
+def test_rebalance_diff():
+    old = pd.DataFrame({'代码': ['A', 'B', 'C'], '现价': [100.0, 101.0, 102.0]})
+    new = pd.DataFrame({'代码': ['B', 'C', 'D', 'E'], '现价': [111.0, 112.0, 113.0, 114.0]})
+    diff = rebalance_diff(new, old)
+    assert diff.entering['代码'].tolist() == ['D', 'E']
+    assert diff.exiting['代码'].tolist() == ['A']
+    assert diff.continuing['代码'].tolist() == ['B', 'C']
+    assert diff.continuing['现价_old'].tolist() == [101.0, 102.0]
+    assert 'status' not in diff.entering.columns
+    # 等权: 1/3 -> 1/4
+    assert diff.turnover == pytest.approx(0.5 * (1 / 3 + 2 / 4 + 2 * (1 / 3 - 1 / 4)))
+
+
+def test_diff_weights_inputs():
+    table = diff_weights({'A': 0.5, 'B': 0.5}, {'B': 0.7, 'C': 0.3})
+    assert table.loc['A', 'status'] == 'exit' and table.loc['C', 'status'] == 'enter'
+    assert table.loc['B', 'delta'] == pytest.approx(0.2)
+
+
+def test_holdings_turnover():
+    holdings = pd.DataFrame({
+        'date': pd.to_datetime(['2025-01-02'] * 2 + ['2025-01-03'] * 2),
+        '代码': ['A', 'B', 'B', 'C'],
+    })
+    res = holdings_turnover(holdings)
+    assert res['entering'].tolist() == [2, 1]
+    assert res['exiting'].tolist() == [0, 1]
+    # 单边换手, 第一期和空仓比较
+    assert res['turnover'].tolist() == pytest.approx([0.5, 0.5])
+
+
+def _premium_history(days=30):
+    """A 全程有数据; B 第 20 天才上市, 历史不足; C 中间有 NaN; D 第 3 天上市, 中间停牌 5 天"""
+    rng = np.random.default_rng(1)
+    rows = []
+    for day, date in enumerate(pd.date_range('2025-01-01', periods=days)):
+        for code in ['A', 'B', 'C', 'D']:
+            if (code == 'B' and day < 20) or (code == 'D' and (day < 3 or 10 <= day < 15)):
+                continue
+            # 整数溢价率, 窗口内有并列
+            rate = np.nan if code == 'C' and day in (8, 22) else float(rng.integers(0, 6))
+            rows.append({'date': date, 'code': code, 'premium_rate': rate})
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('lookback', [5, 12])
+def test_signal_state_replay_matches_batch(lookback):
+    history = _premium_history()
+    state = SignalState(lookback, buy_threshold=0.3, sell_threshold=0.7)
+    for date, day in history.groupby('date', sort=True):
+        signals = state.update(day)
+        expected = get_trade_signals(history[history['date'] <= date], lookback, 0.3, 0.7)
+        assert signals == expected, date
+    if lookback == 12:
+        # 最后 12 天里 C 有 NaN, 归为持有; B 只有 10 天历史, 不出信号
+        assert 'C' in signals['hold']
+        assert all('B' not in codes for codes in signals.values())
+
+
+def test_signal_state_from_history_then_update():
+    history = _premium_history()
+    split = history['date'] < '2025-01-25'
+    state = SignalState.from_history(history[split], 5, 0.3, 0.7)
+    for date, day in history[~split].groupby('date', sort=True):
+        assert state.update(day) == get_trade_signals(history[history['date'] <= date], 5, 0.3, 0.7)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.logics.bond_backtest import SnapshotPanel, param_grid, sweep
+from utils.logics.bond_sweep import read_panel, run_sweep, write_panel
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(0)
+    n_dates, n_codes = 12, 30
+    price = rng.uniform(95, 130, (n_dates, n_codes))
+    premium = rng.uniform(-5, 40, (n_dates, n_codes))
+    return SnapshotPanel(
+        dates=pd.date_range('2025-01-02', periods=n_dates, freq='W'),
+        codes=np.array([f'1100{i:02d}' for i in range(n_codes)]),
+        price=price,
+        premium=premium,
+        double_low=price + premium,
+        eligible=rng.random((n_dates, n_codes)) > 0.1,
+        avg_low=rng.uniform(140, 180, n_dates),
+        next_return=rng.normal(0, 0.02, (n_dates, n_codes)),
+    )
+
+
+def test_panel_round_trip(panel, tmp_path):
+    path = write_panel(panel, tmp_path / 'panel.arrow')
+    loaded = read_panel(path)
+
+    assert loaded.dates.equals(panel.dates)
+    assert loaded.codes.tolist() == panel.codes.tolist()
+    np.testing.assert_array_equal(loaded.avg_low, panel.avg_low)
+    for name in ['price', 'premium', 'double_low', 'eligible', 'next_return']:
+        expected, actual = getattr(panel, name), getattr(loaded, name)
+        assert actual.dtype == expected.dtype
+        np.testing.assert_array_equal(actual, expected)
+    # memory-map 出来的数组是只读的, 不拷贝
+    assert not loaded.price.flags.writeable
+
+
+def test_run_sweep_matches_serial(panel, tmp_path):
+    path = write_panel(panel, tmp_path / 'panel.arrow')
+    grid = param_grid(premium_max=[10, 25], num=[3, 8], pre_select=[5, 15], position_shift=[0, 20])
+
+    parallel = run_sweep(grid, workers=2, panel_path=path)
+    serial = sweep(panel, grid)
+
+    assert parallel['rank'].tolist() == list(range(1, len(grid) + 1))
+    assert parallel['total_return'].is_monotonic_decreasing
+    # 多进程分块后的行顺序不同, 按参数对齐再比较
+    keys = ['premium_max', 'num', 'pre_select', 'position_shift']
+    parallel = parallel.drop(columns='rank').sort_values(keys, ignore_index=True)
+    serial = serial.sort_values(keys, ignore_index=True)
+    pd.testing.assert_frame_equal(parallel, serial)
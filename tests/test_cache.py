@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from utils import cache
+from utils.cache import cache_call
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    monkeypatch.delenv('CACHE_REFRESH', raising=False)
+    return tmp_path
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {'t': 1_000_000.0}
+    monkeypatch.setattr(cache.time, 'time', lambda: now['t'])
+    return now
+
+
+def _counter():
+    calls = []
+
+    def fetch(x):
+        calls.append(x)
+        return [x, len(calls)]
+    return fetch, calls
+
+
+def test_ttl_expiry(cache_dir, clock):
+    fetch, calls = _counter()
+    assert cache_call(fetch, 1, ttl=100) == [1, 1]
+    clock['t'] += 100
+    assert cache_call(fetch, 1, ttl=100) == [1, 1]
+    # 不同参数是不同的 key
+    assert cache_call(fetch, 2, ttl=100) == [2, 2]
+    clock['t'] += 1
+    assert cache_call(fetch, 1, ttl=100) == [1, 3]
+    assert calls == [1, 2, 1]
+
+
+def test_refresh_bypasses_cache(cache_dir, clock, monkeypatch):
+    fetch, calls = _counter()
+    cache_call(fetch, 1)
+    assert cache_call(fetch, 1, refresh=True) == [1, 2]
+    # 强制请求的结果写回缓存
+    assert cache_call(fetch, 1) == [1, 2]
+    monkeypatch.setenv('CACHE_REFRESH', '1')
+    assert cache_call(fetch, 1) == [1, 3]
+    assert len(calls) == 3
+
+
+def test_evict_least_recently_used(cache_dir):
+    for i, name in enumerate(['a', 'b', 'c', 'd']):
+        p = cache_dir / f'{name}.pkl'
+        p.write_bytes(b'x' * 100)
+        os.utime(p, (i, i))
+    # a 最早写入, 但最近被读过
+    os.utime(cache_dir / 'a.pkl', (10, 10))
+    cache._evict(250)
+    assert sorted(p.name for p in cache_dir.glob('*.pkl')) == ['a.pkl', 'd.pkl']
+    cache._evict(1000)
+    assert len(list(cache_dir.glob('*.pkl'))) == 2
+
+
+def test_hit_updates_lru_order(cache_dir):
+    fetch, calls = _counter()
+    cache_call(fetch, 1)
+    cache_call(fetch, 2)
+    for p in cache_dir.glob('*.pkl'):
+        os.utime(p, (0, 0))
+    # 命中后更新访问时间, 淘汰时保留
+    cache_call(fetch, 1)
+    cache._evict(max(p.stat().st_size for p in cache_dir.glob('*.pkl')))
+    assert cache_call(fetch, 1) == [1, 1]
+    assert cache_call(fetch, 2) == [2, 3]
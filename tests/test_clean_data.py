@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from utils.clean_data import merge_on_date
+
+
+def test_merge_on_date_outer_join():
+    a = pd.Series([1.0, 2.0, 3.0], index=pd.to_datetime(['2025-01-03', '2025-01-01', '2025-01-02']))
+    b = pd.Series([10.0, 20.0, 30.0], index=pd.to_datetime(['2025-01-02', '2025-01-02', '2025-01-06']))
+    df = merge_on_date({'a': a, 'b': b})
+    assert df.columns.tolist() == ['日期', 'a', 'b']
+    assert df['日期'].dt.strftime('%m-%d').tolist() == ['01-01', '01-02', '01-03', '01-06']
+    assert df['a'].tolist()[:3] == [2.0, 3.0, 1.0] and np.isnan(df['a'].iloc[3])
+    # 重复日期保留最后一条
+    assert df['b'].iloc[1] == 20.0
+
+
+def test_merge_on_date_edge_cases():
+    assert merge_on_date({}).columns.tolist() == ['日期']
+    s = pd.Series([1.0, 2.0], index=pd.to_datetime(['2025-01-01', None]))
+    df = merge_on_date({'x': s}, date_col='date')
+    assert df.columns.tolist() == ['date', 'x'] and len(df) == 1
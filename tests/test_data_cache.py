@@ -0,0 +1,65 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils import data_cache
+from utils.data_cache import cached_by_files, get_frame
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    data_cache.clear()
+    yield
+    data_cache.clear()
+
+
+def _touch(path, mtime):
+    os.utime(path, ns=(mtime, mtime))
+
+
+def _counter():
+    calls = []
+
+    def build():
+        calls.append(1)
+        return len(calls)
+    return build
+
+
+def test_cached_by_files_invalidates_on_mtime(tmp_path):
+    path = tmp_path / 'a.csv'
+    path.write_text('x\n1\n')
+    _touch(path, 10**18)
+    build = _counter()
+
+    assert cached_by_files('k', [path], build) == 1
+    assert cached_by_files('k', [path], build) == 1
+    # 内容和大小不变, 只有 mtime 变化也重新计算
+    _touch(path, 10**18 + 1)
+    assert cached_by_files('k', [path], build) == 2
+    assert cached_by_files('k', [path], build) == 2
+    # 其他 key 单独缓存
+    assert cached_by_files('other', [path], build) == 3
+
+
+def test_cached_by_files_follows_parquet(tmp_path):
+    # 逻辑路径不带后缀时按 resolve 取 csv / parquet 中较新的
+    logical = tmp_path / 'a'
+    pd.DataFrame({'x': [1]}).to_csv(logical.with_suffix('.csv'), index=False)
+    _touch(logical.with_suffix('.csv'), 10**18)
+    assert get_frame(str(logical))['x'].tolist() == [1]
+
+    pd.DataFrame({'x': [2]}).to_parquet(logical.with_suffix('.parquet'))
+    _touch(logical.with_suffix('.parquet'), 10**18 + 1)
+    assert get_frame(str(logical))['x'].tolist() == [2]
+
+
+def test_missing_non_table_file(tmp_path):
+    path = tmp_path / 'index.bin'
+    build = _counter()
+    assert cached_by_files('k', [path], build) == 1
+    assert cached_by_files('k', [path], build) == 1
+    # 文件出现后缓存失效
+    path.write_bytes(b'x')
+    assert cached_by_files('k', [path], build) == 2
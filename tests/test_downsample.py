@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from utils.downsample import downsample_series, lttb, minmax
+
+
+def _series(n=10_000):
+    x = pd.date_range('2000-01-01', periods=n, freq='D')
+    y = np.sin(np.arange(n) / 50.0)
+    y[1234] = 10.0  # 尖峰
+    return x.values, y
+
+
+def test_lttb_keeps_endpoints_and_spike():
+    x, y = _series()
+    idx = lttb(x, y, 500)
+    assert len(idx) == 500
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert 1234 in idx
+    # 点数足够时原样返回
+    assert len(lttb(x[:100], y[:100], 500)) == 100
+
+
+def test_minmax_keeps_extremes():
+    x, y = _series()
+    idx = minmax(x, y, 500)
+    assert len(idx) <= 502
+    assert np.all(np.diff(idx) > 0)
+    assert 1234 in idx and y[idx].min() == y.min()
+
+
+def test_downsample_series_range():
+    x, y = _series()
+    xs, ys = pd.Series(x), pd.Series(y)
+    ys[5] = np.nan
+    full_x, full_y = downsample_series(xs, ys, max_points=300)
+    assert len(full_x) == 300 and not np.isnan(full_y).any()
+
+    x0, x1 = x[2000], x[2199]
+    zx, _ = downsample_series(xs, ys, max_points=1000, x_range=(x0, x1), overview_points=100)
+    inside = (zx >= x0) & (zx <= x1)
+    # 放大后可见范围内是原始精度, 范围外只有轮廓
+    assert inside.sum() == 200
+    assert (~inside).sum() < 110
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from utils import fetcher
+from utils.fetcher import (
+    AdaptiveRateLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    RateLimiter,
+    SourceGuard,
+    fetch_concurrently,
+    is_source_error,
+    is_throttled,
+    retry_call,
+)
+
+
+def _guard(threshold=2, reset=0.2):
+    return SourceGuard(AdaptiveRateLimiter(1000, burst=100), CircuitBreaker('test', threshold, reset))
+
+
+def test_error_classification():
+    assert is_throttled(RuntimeError('429 Too Many Requests'))
+    assert is_source_error(ConnectionError('reset'))
+    assert is_source_error(TimeoutError())
+    assert not is_source_error(KeyError('symbol'))
+    assert not is_source_error(ValueError('No tables found'))
+
+
+def test_bad_symbols_do_not_open_breaker():
+    fetcher._GUARDS['test-bad-symbols'] = _guard(threshold=2)
+
+    def fetch(key):
+        if key.startswith('bad'):
+            raise KeyError(key)
+        return key
+
+    keys = [f'bad{i}' for i in range(5)] + ['ok1', 'ok2']
+    report = fetch_concurrently(keys, fetch, max_workers=1, host='test-bad-symbols', retries=0, backoff=0)
+    assert sorted(r.key for r in report.successes) == ['ok1', 'ok2']
+    assert len(report.failures) == 5
+    assert all('熔断' not in r.error for r in report.failures)
+    assert fetcher._GUARDS['test-bad-symbols'].breaker.state == 'closed'
+
+
+def test_retry_waits_for_breaker_instead_of_failing():
+    guard = _guard(threshold=2, reset=0.2)
+    for _ in range(2):
+        guard.breaker.record_failure()
+    assert guard.breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        guard.breaker.allow()
+
+    start = time.monotonic()
+    result, attempts = retry_call(lambda: 'ok', retries=0, guard=guard)
+    assert result == 'ok' and attempts == 1
+    assert time.monotonic() - start >= 0.15
+    assert guard.breaker.state == 'closed'
+
+
+def test_breaker_wait_timeout():
+    breaker = CircuitBreaker('test', 1, reset_timeout=10)
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.wait(timeout=0.05)
+
+
+def test_half_open_callers_wait_for_trial():
+    breaker = CircuitBreaker('test', 1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.wait(timeout=1)
+    assert breaker.state == 'half_open'
+
+    entered = threading.Event()
+
+    def other():
+        breaker.wait(timeout=2)
+        entered.set()
+
+    t = threading.Thread(target=other)
+    t.start()
+    # 试探请求还没有结果, 其他调用方等待而不是报错
+    assert not entered.wait(0.1)
+    breaker.record_success()
+    t.join(1)
+    assert entered.is_set()
+
+
+def test_batch_recovers_after_throttling():
+    # 前几次被限速打开熔断, 恢复后剩下的 symbol 仍然能抓完
+    calls = {'n': 0}
+    lock = threading.Lock()
+
+    def fetch(key):
+        with lock:
+            calls['n'] += 1
+            n = calls['n']
+        if n <= 3:
+            raise RuntimeError('429 Too Many Requests')
+        return key
+
+    fetcher._GUARDS['test-recover'] = _guard(threshold=3, reset=0.1)
+    report = fetch_concurrently([str(i) for i in range(10)], fetch, max_workers=4,
+                                host='test-recover', retries=2, backoff=0.01)
+    assert not report.failures
+    assert len(report.successes) == 10
+
+
+def test_rate_limiter_burst():
+    limiter = RateLimiter(rate=1000, burst=3)
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.05
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from utils.incremental import append_incremental, fetch_since, read_last_date
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / 'hist.csv'
+
+
+def _hist(dates, close=1.0, **extra):
+    df = pd.DataFrame({'日期': dates, '收盘': [close + i for i in range(len(dates))]})
+    for k, v in extra.items():
+        df[k] = v
+    return df
+
+
+def test_create_and_read_last_date(path):
+    assert read_last_date(path) is None
+    assert append_incremental(_hist(['2025-01-01', '2025-01-02']), path) == 2
+    assert read_last_date(path) == pd.Timestamp('2025-01-02')
+
+
+def test_append_rewrites_last_row(path):
+    append_incremental(_hist(['2025-01-01', '2025-01-02']), path)
+    # 最后一天是盘中数据, 重新下载后覆盖; 之前的行不动
+    assert append_incremental(_hist(['2025-01-02', '2025-01-03'], close=5.0), path) == 1
+    df = pd.read_csv(path)
+    assert df['日期'].tolist() == ['2025-01-01', '2025-01-02', '2025-01-03']
+    assert df['收盘'].tolist() == [1.0, 5.0, 6.0]
+    # 全量重新下载, 没有新数据
+    assert append_incremental(pd.read_csv(path), path) == 0
+    assert len(pd.read_csv(path)) == 3
+
+
+def test_column_change_keeps_history(path):
+    append_incremental(_hist(['2025-01-01', '2025-01-02', '2025-01-03']), path)
+    # 增量数据多了一列: 历史保留, 按列名对齐
+    assert append_incremental(_hist(['2025-01-03', '2025-01-04'], close=9.0, 成交量=[10, 20]), path) == 1
+    df = pd.read_csv(path)
+    assert df.columns.tolist() == ['日期', '收盘', '成交量']
+    assert df['日期'].tolist() == ['2025-01-01', '2025-01-02', '2025-01-03', '2025-01-04']
+    assert df['收盘'].tolist() == [1.0, 2.0, 9.0, 10.0]
+    assert df['成交量'].isna().tolist() == [True, True, False, False]
+
+
+def test_column_change_full_download_rewrites(path):
+    append_incremental(_hist(['2025-01-02', '2025-01-03']), path)
+    full = _hist(['2025-01-01', '2025-01-02', '2025-01-03', '2025-01-04'], close=7.0, 成交量=1)
+    assert append_incremental(full, path) == 1
+    pd.testing.assert_frame_equal(pd.read_csv(path), full)
+
+
+def test_fetch_since_passes_start_date():
+    calls = {}
+
+    def with_start(symbol, start_date='19700101'):
+        calls['start'] = start_date
+        return symbol
+
+    def without_start(symbol):
+        return symbol
+
+    assert fetch_since(with_start, pd.Timestamp('2025-01-02'), symbol='a') == 'a'
+    assert calls['start'] == '20250102'
+    assert fetch_since(without_start, pd.Timestamp('2025-01-02'), symbol='b') == 'b'
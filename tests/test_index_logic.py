@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.logics.index_logic import analyze_trend, trend_scores
+
+
+def _per_index_trend(index_data, ma_short, ma_long):
+    """原来逐个指数 rolling 的算法, 作为对照"""
+    rows = {}
+    for code in index_data['code'].unique():
+        close = index_data.loc[index_data['code'] == code, 'close']
+        short = close.rolling(ma_short).mean().iloc[-1]
+        long = close.rolling(ma_long).mean().iloc[-1]
+        if short > long:
+            signal = 'buy'
+        elif short < long:
+            signal = 'sell'
+        else:
+            signal = 'hold'
+        rows[code] = {'short': short, 'long': long, 'signal': signal}
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+@pytest.fixture
+def index_data():
+    rng = np.random.default_rng(0)
+    up = 100 + np.cumsum(rng.normal(0.3, 1, 120))
+    down = np.r_[[np.nan] * 5, 50 - np.cumsum(rng.normal(0.2, 0.5, 70))]
+    # 长度只够短均线, 长均线为 NaN
+    short = np.r_[[np.nan] * 3, rng.normal(10, 1, 40)]
+    # 窗口里还有 NaN, 两条均线都是 NaN
+    gappy = np.r_[[np.nan] * 50, rng.normal(20, 1, 30)]
+    flat = np.full(80, 7.3)
+    frames = [pd.DataFrame({'code': code, 'close': close})
+              for code, close in [('A', up), ('B', down), ('C', short), ('D', gappy), ('E', flat)]]
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.mark.parametrize('ma_short, ma_long', [(20, 60), (5, 30)])
+def test_trend_scores_matches_per_index_rolling(index_data, ma_short, ma_long):
+    expected = _per_index_trend(index_data, ma_short, ma_long)
+    scores = trend_scores(index_data, ((ma_short, ma_long),))
+
+    assert list(scores.index) == list(expected.index)
+    np.testing.assert_allclose(scores[f'ma_{ma_short}'], expected['short'], rtol=1e-12)
+    np.testing.assert_allclose(scores[f'ma_{ma_long}'], expected['long'], rtol=1e-12)
+    np.testing.assert_allclose(scores[f'strength_{ma_short}_{ma_long}'],
+                               (expected['short'] - expected['long']) / expected['long'],
+                               rtol=1e-9, atol=1e-12)
+    assert scores[f'signal_{ma_short}_{ma_long}'].to_dict() == expected['signal'].to_dict()
+    assert analyze_trend(index_data, ma_short, ma_long) == expected['signal'].to_dict()
+
+
+def test_trend_scores_multiple_pairs(index_data):
+    scores = trend_scores(index_data, ((20, 60), (5, 30)))
+    votes = {'buy': 1, 'sell': -1, 'hold': 0}
+    expected = (scores['signal_20_60'].map(votes) + scores['signal_5_30'].map(votes)) / 2
+    np.testing.assert_allclose(scores['score'], expected)
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from utils import meta_index
+from utils.meta_index import common_start_date, get_meta
+
+
+def _write(path, dates):
+    pd.DataFrame({'日期': dates, '今开': range(len(dates))}).to_csv(path, index=False)
+    return path
+
+
+def test_common_start_date(tmp_path):
+    meta_index._cache.clear()
+    a = _write(tmp_path / 'a.csv', ['2025-01-01', '2025-01-03', '2025-01-06'])
+    b = _write(tmp_path / 'b.csv', ['2025-01-02', '2025-01-03', '2025-01-06'])
+    assert common_start_date([a, b]) == pd.Timestamp('2025-01-03')
+    assert get_meta(a)['rows'] == 3
+    assert (tmp_path / meta_index.META_FILE).exists()
+
+
+def test_common_start_date_none(tmp_path):
+    meta_index._cache.clear()
+    a = _write(tmp_path / 'a.csv', ['2025-01-01'])
+    b = _write(tmp_path / 'b.csv', ['2025-01-02'])
+    # 没有共同日期, 或者没有文件
+    assert common_start_date([a, b]) is None
+    assert common_start_date([]) is None
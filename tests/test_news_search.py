@@ -0,0 +1,85 @@
+import threading
+
+import pandas as pd
+
+from utils.news_search import NewsIndex, tokenize
+from utils.news_store import append_news
+
+
+def _news(titles, source='em'):
+    n = len(titles)
+    return pd.DataFrame({
+        'id': range(1, n + 1),
+        'source': [source] * n,
+        'title': titles,
+        'summary': [''] * n,
+        'time': pd.date_range('2025-12-11 10:00', periods=n, freq='min'),
+        'link': [''] * n,
+    })
+
+
+def test_tokenize():
+    assert tokenize('可转债') == ['可转', '转债']
+    assert tokenize('可转债', unigrams=True) == ['可转', '转债', '可', '转', '债']
+    assert tokenize('债') == ['债']
+    assert tokenize('NVIDIA 涨3.5%') == ['nvidia', '涨', '3.5']
+    # 全角字符规范化
+    assert tokenize('ＡＩ芯片') == ['ai', '芯片']
+
+
+def test_single_character_query():
+    index = NewsIndex(store='unused', sources=None)
+    index.add(_news(['可转债市场回暖', '美股收涨', '国债期货走弱']))
+    res = index.search('债')
+    assert sorted(res['title']) == ['可转债市场回暖', '国债期货走弱']
+
+
+def test_bm25_ranking():
+    index = NewsIndex(store='unused', sources=None)
+    index.add(_news(['英伟达发布新芯片', '英伟达股价', '苹果发布新手机']))
+    res = index.search('英伟达 芯片')
+    assert res['title'].iloc[0] == '英伟达发布新芯片'
+    assert res['matched'].iloc[0] > res['matched'].iloc[1]
+    assert '苹果发布新手机' not in res['title'].tolist()
+    assert index.search('不存在的词').empty
+    # 重复加入的 id 跳过
+    assert index.add(_news(['英伟达发布新芯片'])) == 0
+
+
+def test_sync_only_indexes_new_parts(tmp_path):
+    store = tmp_path / 'news_store'
+    append_news(pd.DataFrame({'标题': ['可转债市场回暖'], '摘要': ['x'], '发布时间': ['2025-12-11 10:00:00'],
+                              '链接': ['a']}), 'em', store)
+    index = NewsIndex(store)
+    assert index.sync() == 1 and index.sync() == 0
+    append_news(pd.DataFrame({'标题': ['国债期货走弱'], '摘要': ['y'], '发布时间': ['2025-12-11 11:00:00'],
+                              '链接': ['b']}), 'em', store)
+    assert index.sync() == 1
+    assert len(index.search('债')) == 2
+
+
+def test_search_while_adding():
+    rounds = 50
+    index = NewsIndex(store='unused', sources=None)
+    errors = []
+
+    def writer():
+        for i in range(rounds):
+            df = _news([f'债券新闻{i}'])
+            df['id'] = i + 1
+            index.add(df)
+
+    def reader():
+        try:
+            for _ in range(rounds):
+                index.search('债券')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(index.search('债券', limit=100)) == rounds
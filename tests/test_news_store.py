@@ -0,0 +1,176 @@
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+from utils import data_cache, news_store
+from utils.news_store import (
+    MAX_DISTANCE,
+    _SimIndex,
+    append_news,
+    assign_clusters,
+    backfill_clusters,
+    collapse_clusters,
+    latest_news,
+    manifest_path,
+    read_parts,
+    simhash,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return tmp_path / 'news_store'
+
+
+def _em(*rows):
+    """东方财富格式: (标题, 发布时间)"""
+    return pd.DataFrame({
+        '标题': [r[0] for r in rows],
+        '摘要': [f'{r[0]}摘要' for r in rows],
+        '发布时间': [r[1] for r in rows],
+        '链接': [f'https://em/{i}' for i in range(len(rows))],
+    })
+
+
+def _ths(*rows):
+    return pd.DataFrame({
+        '标题': [r[0] for r in rows],
+        '内容': [f'{r[0]}内容' for r in rows],
+        '发布时间': [r[1] for r in rows],
+        '链接': [f'https://ths/{i}' for i in range(len(rows))],
+    })
+
+
+def _distance(a, b):
+    return bin(simhash(a) ^ simhash(b)).count('1')
+
+
+def test_simhash_near_and_far():
+    assert simhash('摩尔线程股价突破900元') == simhash('摩尔线程 股价突破900元!')
+    assert _distance('华为余承东：尚界H5将于9月23日上市', '余承东：尚界H5将于9月23日上市') <= MAX_DISTANCE
+    assert _distance('中汽协开展汽车行业反歧视调查', '韩国拟放松银企分离规则 以刺激投资') > MAX_DISTANCE
+
+
+def test_assign_clusters_uses_window(tmp_path):
+    index = _SimIndex(tmp_path / 'sim.bin')
+    t = pd.Timestamp('2025-12-11 10:00')
+    news = pd.DataFrame({
+        'id': pd.Series([1, 2, 3, 4], dtype='uint64'),
+        'title': ['华为余承东：尚界H5将于9月23日上市', '余承东：尚界H5将于9月23日上市',
+                  '余承东：尚界H5将于9月23日上市', '韩国拟放松银企分离规则 以刺激投资'],
+        'time': [t, t + pd.Timedelta(minutes=5), t + pd.Timedelta(days=3), t],
+    })
+    news['simhash'] = [simhash(x) for x in news['title']]
+    clusters, records = assign_clusters(news, index)
+    # 第二条并入第一条; 第三条超出时间窗口, 第四条内容不同, 各自成簇
+    assert clusters.tolist() == [1, 1, 3, 4]
+    assert len(records) == 4
+
+
+def test_append_news_dedup_and_cluster(store):
+    t = '2025-12-11 10:00:00'
+    assert append_news(_em(('余承东：尚界H5将于9月23日上市', t)), 'em', store) == 1
+    assert append_news(_ths(('华为余承东：尚界H5将于9月23日上市', '2025-12-11 10:03:00')), 'ths', store) == 1
+    # 同来源同标题(规范化后)不再入库
+    assert append_news(_em(('余承东： 尚界H5将于9月23日上市', t)), 'em', store) == 0
+
+    df = latest_news(10, store)
+    assert len(df) == 2 and df['cluster'].nunique() == 1
+    collapsed = latest_news(10, store, collapse=True)
+    assert len(collapsed) == 1
+    assert [s for s, _ in collapsed.loc[0, 'sources']] == ['ths', 'em']
+
+
+def test_clusters_persist_across_processes(store):
+    append_news(_em(('余承东：尚界H5将于9月23日上市', '2025-12-11 10:00:00')), 'em', store)
+    # 模拟新进程: 清掉进程内缓存, 从 _simhash.bin 重新读
+    news_store._sim_indexes.clear()
+    news_store._indexes.clear()
+    append_news(_ths(('华为余承东：尚界H5将于9月23日上市', '2025-12-11 10:03:00')), 'ths', store)
+    assert latest_news(10, store)['cluster'].nunique() == 1
+
+
+def _write_legacy_part(store, df, source, fetched_at):
+    """写一个没有 simhash/cluster 列的旧格式分区"""
+    news = news_store.to_news(df, source)
+    news['id'] = pd.Series([news_store.news_hash(source, t) for t in news['title']], dtype='uint64')
+    news['fetched_at'] = pd.Timestamp(fetched_at)
+    legacy_schema = pa.schema([f for f in news_store.NEWS_SCHEMA if f.name not in ('simhash', 'cluster')])
+    part_dir = store / f"date={news['time'].iloc[0].date().isoformat()}"
+    part_dir.mkdir(parents=True, exist_ok=True)
+    path = part_dir / f"part-{fetched_at:%Y%m%d%H%M%S%f}-{source}.parquet"
+    pq.write_table(pa.Table.from_pandas(news[legacy_schema.names], schema=legacy_schema, preserve_index=False), path)
+    with open(store / news_store.INDEX_NAME, 'ab') as f:
+        f.write(news['id'].to_numpy(dtype='<u8').tobytes())
+    return path
+
+
+def test_legacy_parts_are_singletons_until_backfill(store):
+    t = '2025-12-11 10:00:00'
+    _write_legacy_part(store, _em(('余承东：尚界H5将于9月23日上市', t), ('韩国拟放松银企分离规则', t)), 'em', datetime(2025, 12, 11, 10))
+    _write_legacy_part(store, _ths(('华为余承东：尚界H5将于9月23日上市', t)), 'ths', datetime(2025, 12, 11, 11))
+
+    df = latest_news(10, store)
+    assert df['cluster'].tolist() == df['id'].tolist()
+    assert df['cluster'].dtype == 'uint64'
+    assert len(latest_news(10, store, collapse=True)) == 3
+
+    assert backfill_clusters(store) == 3
+    assert backfill_clusters(store) == 0
+    assert len(latest_news(10, store, collapse=True)) == 2
+    # 补算后新写入的新闻也能和旧新闻归为一簇
+    append_news(_ths(('余承东：尚界H5将于9月23日上市!', '2025-12-11 12:00:00')), 'ths', store)
+    assert len(latest_news(10, store, collapse=True)) == 2
+
+
+def test_collapse_keeps_order():
+    df = pd.DataFrame({
+        'id': [1, 2, 3, 4],
+        'cluster': [1, 2, 1, 4],
+        'source': ['em', 'ths', 'sina', 'em'],
+        'link': ['a', 'b', 'c', 'd'],
+        'title': ['x', 'y', 'x2', 'z'],
+    })
+    res = collapse_clusters(df)
+    assert res['id'].tolist() == [1, 2, 4]
+    assert res.loc[0, 'sources'] == [('em', 'a'), ('sina', 'c')]
+
+
+def test_read_parts_empty_filter(store):
+    append_news(_em(('标题一', '2025-12-11 10:00:00')), 'em', store)
+    parts = list(store.glob('date=*/part-*.parquet'))
+    assert read_parts(parts, ds.field('source') == 'ths').empty
+
+
+def test_append_only_and_index_refresh(store):
+    append_news(_em(('标题一', '2025-12-11 10:00:00')), 'em', store)
+    first = {p: p.read_bytes() for p in store.glob('date=*/part-*.parquet')}
+    # 新进程从 _index.bin 读已入库的哈希, 重复的不再写
+    news_store._indexes.clear()
+    assert append_news(_em(('标题一', '2025-12-11 10:00:00')), 'em', store) == 0
+    assert append_news(_em(('标题二', '2025-12-12 09:00:00')), 'em', store) == 1
+    parts = list(store.glob('date=*/part-*.parquet'))
+    assert len(parts) == 2
+    # 已有分区不会被改写
+    assert all(p.read_bytes() == data for p, data in first.items())
+    assert [d.date().isoformat() for d in news_store.news_dates(store)] == ['2025-12-11', '2025-12-12']
+
+
+def test_manifest_signature_is_read_only(store):
+    manifest = manifest_path(store)
+    # 空库: 取缓存 key 不报错, 也不会导入或创建任何文件
+    assert data_cache._signature([manifest]) == ((str(manifest), None, None),)
+    assert latest_news(10, store).empty
+    assert not store.exists()
+
+    append_news(_em(('标题一', '2025-12-11 10:00:00')), 'em', store)
+    sig = data_cache._signature([manifest])
+    assert sig[0][2] > 0
+    append_news(_em(('标题一', '2025-12-11 10:00:00')), 'em', store)
+    assert data_cache._signature([manifest]) == sig
+    append_news(_em(('标题二', '2025-12-11 11:00:00')), 'em', store)
+    assert data_cache._signature([manifest]) != sig
@@ -0,0 +1,70 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils import ohlcv
+
+
+@pytest.fixture
+def raw_dir(tmp_path, monkeypatch):
+    raw = tmp_path / 'datas' / 'raw' / 'stocks'
+    raw.mkdir(parents=True)
+    monkeypatch.setattr(ohlcv, 'RAW_DIR', raw)
+    ohlcv._read.cache_clear()
+    return raw
+
+
+def _write_xlsx(path, dates):
+    pd.DataFrame({
+        'date': dates,
+        'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 100,
+        'turnover': 0.1,
+    }).to_excel(path)
+
+
+def test_load_ohlcv_uses_storage_conversion(raw_dir):
+    _write_xlsx(raw_dir / 'sh600000_gegu_stock_ak.xlsx', ['2025-01-03', '2025-01-02'])
+    assert ohlcv.list_symbols() == ['sh600000']
+    df = ohlcv.load_ohlcv('sh600000')
+    assert df.columns.tolist() == ohlcv.OHLCV_COLUMNS
+    assert df['date'].tolist() == [pd.Timestamp('2025-01-02'), pd.Timestamp('2025-01-03')]
+    # 只有 storage.convert_excel 写的同名 parquet 一份
+    assert sorted(p.name for p in raw_dir.parent.parent.rglob('*.parquet')) == ['sh600000_gegu_stock_ak.parquet']
+    # 转换后删掉 xlsx 也能读, 也还在列表里
+    (raw_dir / 'sh600000_gegu_stock_ak.xlsx').unlink()
+    assert ohlcv.list_symbols() == ['sh600000']
+    assert ohlcv.load_ohlcv('sh600000') is df
+    with pytest.raises(FileNotFoundError):
+        ohlcv.load_ohlcv('sz000001')
+
+
+def test_load_ohlcv_reloads_when_xlsx_changes(raw_dir):
+    xlsx = raw_dir / 'sh600000_gegu_stock_ak.xlsx'
+    _write_xlsx(xlsx, ['2025-01-02'])
+    first = ohlcv.load_ohlcv('sh600000')
+    # 同一秒内写入时 mtime 可能相同, 把旧 parquet 的时间往前调
+    parquet = xlsx.with_suffix('.parquet')
+    os.utime(parquet, (0, 0))
+    _write_xlsx(xlsx, ['2025-01-02', '2025-01-03'])
+    second = ohlcv.load_ohlcv('sh600000')
+    assert len(first) == 1 and len(second) == 2
+    assert ohlcv.load_ohlcv('sh600000') is second
+
+
+def test_load_ohlcv_cache_is_bounded(raw_dir):
+    symbols = [f'sz{i:06d}' for i in range(ohlcv.CACHE_SIZE + 1)]
+    frame = pd.DataFrame({'date': pd.to_datetime(['2025-01-02']), 'open': 1.0, 'high': 1.0,
+                          'low': 1.0, 'close': 1.0, 'volume': 1})
+    for symbol in symbols:
+        frame.to_parquet(raw_dir / f'{symbol}_gegu_stock_ak.parquet')
+
+    first = ohlcv.load_ohlcv(symbols[0])
+    for symbol in symbols[1:]:
+        ohlcv.load_ohlcv(symbol)
+    assert ohlcv.cache_info().currsize == ohlcv.CACHE_SIZE
+    # 最久没用的被淘汰, 重新读取; 最近用过的还在缓存里
+    last = ohlcv.load_ohlcv(symbols[-1])
+    assert ohlcv.cache_info().hits == 1
+    assert ohlcv.load_ohlcv(symbols[0]) is not first
+    assert ohlcv.load_ohlcv(symbols[-1]) is last
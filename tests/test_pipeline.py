@@ -0,0 +1,124 @@
+import json
+import os
+import time
+
+import pytest
+
+from utils.fetcher import FetchReport, FetchResult
+from utils.pipeline import BLOCKED, DONE, FAILED, SKIPPED, Task, run_pipeline
+
+
+@pytest.fixture
+def state_file(tmp_path):
+    return str(tmp_path / 'state.json')
+
+
+def _calls():
+    calls = []
+
+    def make(name, fail=False, report=None):
+        def func():
+            calls.append(name)
+            if fail:
+                raise RuntimeError(f'{name} 出错')
+            return report
+        return func
+    return calls, make
+
+
+def test_run_order_and_states(state_file):
+    calls, make = _calls()
+    tasks = [
+        Task('fetch', make('fetch')),
+        Task('merge', make('merge'), deps=['fetch']),
+    ]
+    res = run_pipeline(tasks, max_workers=2, state_file=state_file, run_id='r1')
+    assert calls == ['fetch', 'merge']
+    assert {k: v['status'] for k, v in res.items()} == {'fetch': DONE, 'merge': DONE}
+    saved = json.loads(open(state_file, encoding='utf-8').read())
+    assert saved['run_id'] == 'r1' and saved['tasks']['merge']['status'] == DONE
+
+
+def test_exception_marks_failed_and_blocks_downstream(state_file):
+    calls, make = _calls()
+    tasks = [
+        Task('fetch', make('fetch', fail=True)),
+        Task('merge', make('merge'), deps=['fetch']),
+        Task('other', make('other')),
+    ]
+    res = run_pipeline(tasks, state_file=state_file, run_id='r1')
+    assert res['fetch']['status'] == FAILED
+    assert 'fetch 出错' in res['fetch']['error']
+    assert res['merge']['status'] == BLOCKED
+    assert res['other']['status'] == DONE
+    assert 'merge' not in calls
+
+
+def test_report_with_failures_marks_failed(state_file):
+    report = FetchReport(results=[
+        FetchResult('a', True, 0.1, 1),
+        FetchResult('b', False, 0.1, 3, 'timeout'),
+    ])
+    _, make = _calls()
+    res = run_pipeline([Task('fetch', make('fetch', report=report))], state_file=state_file, run_id='r1')
+    assert res['fetch']['status'] == FAILED
+    assert 'b' in res['fetch']['error']
+
+
+def test_rerun_executes_only_failed_and_blocked(state_file):
+    calls, make = _calls()
+    first = [
+        Task('ok', make('ok')),
+        Task('fetch', make('fetch', fail=True)),
+        Task('merge', make('merge'), deps=['fetch']),
+    ]
+    run_pipeline(first, state_file=state_file, run_id='r1')
+
+    calls.clear()
+    second = [
+        Task('ok', make('ok')),
+        Task('fetch', make('fetch')),
+        Task('merge', make('merge'), deps=['fetch']),
+    ]
+    res = run_pipeline(second, state_file=state_file, run_id='r1')
+    assert sorted(calls) == ['fetch', 'merge']
+    assert res['ok']['status'] == SKIPPED
+    assert res['fetch']['status'] == DONE and res['merge']['status'] == DONE
+
+
+def test_failed_task_not_skipped_by_fresh_outputs(state_file, tmp_path):
+    # 失败前已经写了部分输出, 重跑时不能因为输出是新的就跳过
+    out = tmp_path / 'out.csv'
+    calls, make = _calls()
+
+    def partial():
+        out.write_text('x')
+        raise RuntimeError('写到一半')
+
+    run_pipeline([Task('fetch', partial, outputs=[str(out)])], state_file=state_file, run_id='r1')
+    res = run_pipeline([Task('fetch', make('fetch'), outputs=[str(out)])], state_file=state_file, run_id='r1')
+    assert calls == ['fetch']
+    assert res['fetch']['status'] == DONE
+
+
+def test_fresh_outputs_skip_and_force(state_file, tmp_path):
+    out = tmp_path / 'out.csv'
+    out.write_text('x')
+    calls, make = _calls()
+    tasks = [Task('fetch', make('fetch'), outputs=[str(out)])]
+    assert run_pipeline(tasks, state_file=state_file, run_id='r1')['fetch']['status'] == SKIPPED
+    assert calls == []
+
+    old = time.time() - 2 * 24 * 3600
+    os.utime(out, (old, old))
+    assert run_pipeline(tasks, state_file=state_file, run_id='r2')['fetch']['status'] == DONE
+    assert run_pipeline(tasks, state_file=state_file, run_id='r2', force=True)['fetch']['status'] == DONE
+    assert calls == ['fetch', 'fetch']
+
+
+def test_missing_dependency_and_cycle(state_file):
+    _, make = _calls()
+    with pytest.raises(ValueError):
+        run_pipeline([Task('a', make('a'), deps=['x'])], state_file=state_file)
+    with pytest.raises(ValueError):
+        run_pipeline([Task('a', make('a'), deps=['b']), Task('b', make('b'), deps=['a'])], state_file=state_file)
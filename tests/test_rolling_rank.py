@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.logics.rolling_rank import RollingRank, rolling_rank_pct
+
+
+@pytest.mark.parametrize('window', [None, 5, 20])
+def test_matches_pandas(window):
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 10, 200).astype(float)  # 有并列
+    values[[3, 50, 51]] = np.nan
+    s = pd.Series(values)
+    expected = s.expanding().rank(pct=True) if window is None else s.rolling(window).rank(pct=True)
+    np.testing.assert_allclose(rolling_rank_pct(values, window), expected.to_numpy(), equal_nan=True)
+
+
+def test_min_periods_and_from_history():
+    roller = RollingRank(window=3, min_periods=2)
+    assert np.isnan(roller.push(1.0))
+    assert roller.push(2.0) == 1.0
+    assert roller.push(np.nan) != roller.push(np.nan)  # NaN 不参与排名
+    assert len(roller) == 1 and roller.count == 3
+
+    history = [5.0, 1.0, 3.0, 4.0]
+    roller = RollingRank.from_history(history, window=3)
+    assert roller.count == 3
+    streamed = RollingRank(window=3)
+    streamed.extend(history)
+    assert roller.push(2.0) == streamed.push(2.0)
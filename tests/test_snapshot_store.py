@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from utils.snapshot_store import (
+    append_snapshot,
+    bond_history,
+    ingest_raw,
+    load_history,
+    snapshot_dates,
+    universe_as_of,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return tmp_path / 'conv_store'
+
+
+def _snapshot(codes, price):
+    return pd.DataFrame({
+        '代码': codes,
+        '转债名称': [f'转债{c}' for c in codes],
+        '现价': [price + i for i in range(len(codes))],
+        '到期时间': ['2030-01-01'] * len(codes),
+    })
+
+
+def test_append_only(store):
+    assert append_snapshot(_snapshot([110001, 123002], 100.0), '2025-01-02', store) is not None
+    # 同一天再次写入跳过, 不改已有数据
+    assert append_snapshot(_snapshot([110001], 999.0), '2025-01-02', store) is None
+    df = universe_as_of('2025-01-02', store)
+    assert df['代码'].tolist() == ['110001', '123002']
+    assert df['现价'].tolist() == [100.0, 101.0]
+    assert not list(store.rglob('.*.tmp'))
+
+
+def test_universe_as_of(store):
+    append_snapshot(_snapshot([110001], 100.0), '2025-01-02', store)
+    append_snapshot(_snapshot([110001, 123002], 105.0), '2025-01-06', store)
+    # 取当天(含)之前最近的快照
+    assert universe_as_of('2025-01-05', store)['date'].iloc[0] == pd.Timestamp('2025-01-02')
+    assert len(universe_as_of('2025-01-06', store)) == 2
+    assert universe_as_of('2025-02-01', store, columns=['代码']).columns.tolist() == ['date', '代码']
+    with pytest.raises(FileNotFoundError):
+        universe_as_of('2024-12-31', store)
+
+
+def test_bond_history_and_load_history(store):
+    assert load_history(store).empty
+    for i, date in enumerate(['2025-01-02', '2025-01-03', '2025-01-06']):
+        append_snapshot(_snapshot([110001, 123002], 100.0 + i), date, store)
+    hist = bond_history('110001', store, columns=['现价'])
+    assert hist.columns.tolist() == ['date', '代码', '现价']
+    assert hist['现价'].tolist() == [100.0, 101.0, 102.0]
+    assert bond_history(110001, store, start='2025-01-03', end='2025-01-03')['date'].tolist() == [pd.Timestamp('2025-01-03')]
+    df = load_history(store)
+    assert len(df) == 6
+    assert df[['date', '代码']].equals(df[['date', '代码']].sort_values(['date', '代码'], ignore_index=True))
+
+
+def test_ingest_raw(tmp_path, store):
+    raw = tmp_path / 'raw'
+    raw.mkdir()
+    _snapshot([110001], 100.0).to_csv(raw / 'conv_20250102.csv', index=False)
+    _snapshot([110001], 101.0).to_csv(raw / 'conv_20250103.csv', index=False)
+    assert ingest_raw(raw, store=store) == 2
+    assert ingest_raw(raw, store=store) == 0
+    assert snapshot_dates(store) == [pd.Timestamp('2025-01-02'), pd.Timestamp('2025-01-03')]
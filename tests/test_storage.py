@@ -0,0 +1,96 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils.storage import (
+    append_table,
+    convert_excel,
+    get_schema,
+    last_date,
+    list_tables,
+    migrate,
+    read_table,
+    resolve,
+    write_table,
+)
+
+
+@pytest.fixture
+def hist(tmp_path):
+    """匹配 raw/reits/reits_hist_em_* 的 schema"""
+    return tmp_path / 'datas' / 'raw' / 'reits' / 'reits_hist_em_508000_测试.csv'
+
+
+def _df(dates, start=1.0):
+    return pd.DataFrame({'日期': dates, '今开': [str(start + i) for i in range(len(dates))]})
+
+
+def test_get_schema(hist):
+    assert get_schema(hist)['日期'] == 'datetime'
+    assert get_schema('datas/processed/gdps/all_data.csv')['*'] == 'float'
+    assert get_schema('somewhere/else.csv') == {}
+
+
+@pytest.mark.parametrize('backend', ['csv', 'parquet'])
+def test_write_read_applies_schema(hist, backend):
+    target = write_table(_df(['2025-01-02', '2025-01-03']), hist, backend=backend)
+    assert target.suffix == f'.{backend}'
+    df = read_table(hist)
+    assert pd.api.types.is_datetime64_any_dtype(df['日期'])
+    assert df['今开'].dtype == float
+    assert read_table(hist, columns=['日期']).columns.tolist() == ['日期']
+
+
+def test_resolve_prefers_newer_parquet(hist):
+    write_table(_df(['2025-01-02']), hist, backend='csv')
+    assert resolve(hist).suffix == '.csv'
+    write_table(_df(['2025-01-02']), hist, backend='parquet')
+    assert resolve(hist).suffix == '.parquet'
+    # csv 更新后又读 csv
+    old = hist.with_suffix('.parquet').stat().st_mtime - 10
+    os.utime(hist.with_suffix('.parquet'), (old, old))
+    assert resolve(hist).suffix == '.csv'
+    assert list_tables(hist.parent, 'reits_hist_em_*') == [hist]
+
+
+@pytest.mark.parametrize('backend', ['csv', 'parquet'])
+def test_append_table(hist, backend):
+    assert append_table(_df(['2025-01-02', '2025-01-03']), hist, backend=backend) == 2
+    # 最后一天被新数据替换, 之后的追加
+    assert append_table(_df(['2025-01-03', '2025-01-06'], start=9.0), hist, backend=backend) == 1
+    assert last_date(hist, backend=backend) == pd.Timestamp('2025-01-06')
+    df = read_table(hist)
+    assert df['日期'].dt.strftime('%Y-%m-%d').tolist() == ['2025-01-02', '2025-01-03', '2025-01-06']
+    assert df['今开'].tolist() == [1.0, 9.0, 10.0]
+
+
+def test_migrate(tmp_path, hist):
+    write_table(_df(['2025-01-02']), hist, backend='csv')
+    converted = migrate(root=tmp_path / 'datas')
+    assert converted == [hist.with_suffix('.parquet')]
+    assert pd.read_parquet(converted[0])['今开'].dtype == float
+    # 已经是最新的跳过
+    assert migrate(root=tmp_path / 'datas') == []
+
+
+def test_convert_excel(tmp_path):
+    src = tmp_path / 'datas' / 'zhishu_ak_test.xlsx'
+    src.parent.mkdir(parents=True)
+    pd.DataFrame({'名称': ['上证指数'], '指数开始时间': ['1990-12-19']}).to_excel(src)
+    df = read_table(src)
+    # to_excel 写出的索引列去掉, 日期列按 schema 转换
+    assert df.columns.tolist() == ['名称', '指数开始时间']
+    assert pd.api.types.is_datetime64_any_dtype(df['指数开始时间'])
+    target = src.with_suffix('.parquet')
+    assert convert_excel(src) == target
+    mtime = target.stat().st_mtime_ns
+    convert_excel(src)
+    assert target.stat().st_mtime_ns == mtime
+    # xlsx 更新后重新转换
+    pd.DataFrame({'名称': ['深证成指', '创业板指'], '指数开始时间': ['1991-04-03', '2010-06-01']}).to_excel(src)
+    later = target.stat().st_mtime + 10
+    os.utime(src, (later, later))
+    assert len(read_table(src)) == 2
+    with pytest.raises(FileNotFoundError):
+        convert_excel(tmp_path / 'missing.xlsx')
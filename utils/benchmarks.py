@@ -0,0 +1,169 @@
+"""
+性能基准
+
+python -m utils.benchmarks merge     逐列 pd.merge vs 一次性 concat 对齐, 10 -> 1000 个品种
+python -m utils.benchmarks screen    逐策略 iterrows vs 一次向量化筛选, 1000 -> 10000 只转债
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from utils.clean_data import merge_on_date
+from utils.logics import bond_logic
+from utils.logics.bond_logic import ConvertibleBondStrategy, Strategy
+
+
+def _fake_series(n_series: int, n_days: int = 2500, seed: int = 0) -> dict:
+    """生成 n_series 个日期部分重叠的序列, 模拟不同市场的交易日"""
+    rng = np.random.default_rng(seed)
+    all_dates = pd.date_range('2010-01-01', periods=int(n_days * 1.5), freq='D')
+    series = {}
+    for i in range(n_series):
+        start = rng.integers(0, n_days // 2)
+        idx = np.sort(rng.choice(np.arange(start, len(all_dates)), size=n_days - start, replace=False))
+        series[f's{i}'] = pd.Series(rng.random(len(idx)), index=all_dates[idx])
+    return series
+
+
+def _merge_loop(series: dict) -> pd.DataFrame:
+    """原来的做法: 循环里逐列 outer merge"""
+    merged_df = None
+    for name, s in series.items():
+        df = pd.DataFrame({'日期': s.index, name: s.values})
+        merged_df = df if merged_df is None else pd.merge(merged_df, df, on='日期', how='outer')
+    return merged_df.sort_values('日期').reset_index(drop=True)
+
+
+def bench_merge(sizes=(10, 100, 300, 1000)):
+    for n in sizes:
+        series = _fake_series(n)
+
+        start = time.perf_counter()
+        old = _merge_loop(series)
+        t_loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new = merge_on_date(series)
+        t_concat = time.perf_counter() - start
+
+        pd.testing.assert_frame_equal(old, new, check_names=False)
+        logger.info(
+            f"{n:>5} 个品种: 逐列merge {t_loop:.3f}s, concat {t_concat:.3f}s, "
+            f"加速 {t_loop / t_concat:.1f}x"
+        )
+
+
+def _fake_bonds(n: int, seed: int = 0) -> pd.DataFrame:
+    """生成 n 只转债的截面数据"""
+    rng = np.random.default_rng(seed)
+    stock_price = rng.uniform(3, 60, n)
+    convert_price = stock_price * rng.uniform(0.6, 1.6, n)
+    convert_value = stock_price * 100 / convert_price
+    premium_rate = rng.uniform(-5, 80, n)
+    return pd.DataFrame({
+        'code': [f'{110000 + i}' for i in range(n)],
+        'price': convert_value * (1 + premium_rate / 100),
+        'stock_price': stock_price,
+        'convert_price': convert_price,
+        'convert_value': convert_value,
+        'premium_rate': premium_rate,
+        'remain_size': rng.uniform(0.2, 50, n),
+        'credit_rating': rng.choice(['AAA', 'AA+', 'AA', 'AA-', 'A+'], n),
+        'duration': rng.uniform(0.1, 6, n),
+        'stock_momentum': rng.normal(0, 10, n),
+    })
+
+
+def _screen_loop(bonds: pd.DataFrame) -> dict:
+    """原来的做法: 每个策略各筛选一次, iterrows 拼字典"""
+    res = {}
+    base = bonds[
+        (bonds['duration'] >= 1.0) & (bonds['remain_size'] >= 1.0) & (bonds['price'] >= 90.0) &
+        (bonds['premium_rate'] <= 30.0) & (bonds['credit_rating'].isin(['AAA', 'AA+', 'AA']))
+    ]
+    for strategy in Strategy:
+        filtered = base.copy()
+        if strategy == Strategy.DOUBLE_LOW:
+            filtered['score'] = 100 - (filtered['premium_rate'] + filtered['price'])
+            reason = lambda b: f"双低值:{b['premium_rate'] + b['price']:.1f}"
+        elif strategy == Strategy.LOW_PREMIUM:
+            filtered['score'] = 100 - filtered['premium_rate']
+            reason = lambda b: f"溢价率:{b['premium_rate']:.1f}%"
+        else:
+            filtered['price_diff'] = abs(filtered['price'] - filtered['stock_price'] * 100 / filtered['convert_price'])
+            filtered['score'] = 100 - filtered['price_diff'] * 10
+            filtered = filtered[filtered['price_diff'] <= 3]
+            reason = lambda b: f"价差:{b['price_diff']:.1f}"
+        res[strategy] = [
+            {'code': b['code'], 'strategy': strategy.value, 'score': b['score'], 'reason': reason(b)}
+            for _, b in filtered.nlargest(10, 'score').iterrows()
+        ]
+
+    base = bonds[(bonds['remain_size'] >= 1.0) & (bonds['credit_rating'].isin(['AAA', 'AA+', 'AA']))].copy()
+    base['double_low'] = base['premium_rate'] + base['price']
+    base['price_diff'] = abs(base['price'] - base['convert_value'])
+    res[ConvertibleBondStrategy.DOUBLE_LOW] = [
+        {'code': b['code'], 'reason': f"双低值:{b['double_low']:.2f}, 溢价率:{b['premium_rate']:.2f}%",
+         'score': 100 - b['double_low']}
+        for _, b in base.nsmallest(10, 'double_low').iterrows()
+    ]
+    res[ConvertibleBondStrategy.PAR_VALUE] = [
+        {'code': b['code'], 'reason': f"转股价值差:{b['price_diff']:.2f}, 价格:{b['price']:.2f}",
+         'score': 100 - b['price_diff'] * 10}
+        for _, b in base[base['price_diff'] <= 3].nsmallest(10, 'price_diff').iterrows()
+    ]
+    high = base[(base['price'] >= 110) & (base['premium_rate'] <= 30.0)]
+    res[ConvertibleBondStrategy.HIGH_PRICE] = [
+        {'code': b['code'], 'reason': f"股性强,动量:{b['stock_momentum']:.2f},价格:{b['price']:.2f}",
+         'score': b['stock_momentum']}
+        for _, b in high.nlargest(10, 'stock_momentum').iterrows()
+    ]
+    return res
+
+
+def _screen_vectorized(bonds: pd.DataFrame) -> dict:
+    res = {}
+    screened = bond_logic.screen_bonds(bonds)
+    for strategy in Strategy:
+        res[strategy] = bond_logic._to_records(screened, strategy.value, bond_logic.SCREEN_COLUMNS)
+    screened = bond_logic.screen_convertible_bonds(bonds)
+    for strategy in ConvertibleBondStrategy:
+        res[strategy] = bond_logic._to_records(screened, strategy.value, ['code', 'reason', 'score'])
+    return res
+
+
+def bench_screen(sizes=(1000, 3000, 10000), repeat=5):
+    for n in sizes:
+        bonds = _fake_bonds(n)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            old = _screen_loop(bonds)
+        t_loop = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            new = _screen_vectorized(bonds)
+        t_vec = (time.perf_counter() - start) / repeat
+
+        assert old == new, "筛选结果不一致"
+        logger.info(
+            f"{n:>6} 只转债, 6 个策略: 逐策略iterrows {t_loop * 1000:.1f}ms, "
+            f"向量化 {t_vec * 1000:.1f}ms, 加速 {t_loop / t_vec:.1f}x"
+        )
+
+
+BENCHES = {
+    'merge': bench_merge,
+    'screen': bench_screen,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHES)
+    for name in names:
+        logger.info(f"===== {name} =====")
+        BENCHES[name]()
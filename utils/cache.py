@@ -0,0 +1,126 @@
+"""
+数据源调用缓存
+
+宏观数据(CPI, GDP, 贵金属持仓等)按月更新, 每天都请求网络没有必要, 还容易被限速.
+cache_call 把数据源调用结果缓存在磁盘上:
+- key 由函数名和参数生成
+- 每类数据单独设置有效期(ttl)
+- 缓存目录总大小超过上限时, 按最近访问时间淘汰(LRU)
+- refresh=True 或环境变量 CACHE_REFRESH=1 时跳过缓存, 强制请求并更新缓存
+"""
+import functools
+import hashlib
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+CACHE_DIR = Path(os.getenv('CACHE_DIR', 'datas/cache'))
+CACHE_MAX_MB = float(os.getenv('CACHE_MAX_MB', 200))
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# 各类数据的有效期(秒)
+TTLS = {
+    'macro': 7 * DAY,    # CPI, GDP 等月度数据
+    'metals': DAY,       # 贵金属持仓, 日度
+    'bond_info': DAY,    # 债券基本信息
+}
+
+
+def make_key(func: Callable, args: tuple, kwargs: dict) -> str:
+    """函数全名 + 参数 -> key"""
+    name = f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', repr(func))}"
+    raw = repr((name, args, sorted(kwargs.items())))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _refresh_all() -> bool:
+    return os.getenv('CACHE_REFRESH', '0').lower() in ('1', 'true', 'yes')
+
+
+def _evict(max_bytes: float):
+    """缓存超过上限时, 删除最久没有访问的文件"""
+    files = []
+    for p in CACHE_DIR.glob('*.pkl'):
+        try:
+            st = p.stat()
+            files.append((st.st_mtime, st.st_size, p))
+        except FileNotFoundError:
+            continue
+    total = sum(size for _, size, _ in files)
+    for _, size, p in sorted(files):
+        if total <= max_bytes:
+            break
+        p.unlink(missing_ok=True)
+        total -= size
+        logger.debug(f"缓存淘汰 {p.name}")
+
+
+def cache_call(func: Callable, *args, ttl: float = DAY, refresh: bool = False, **kwargs):
+    """
+    带磁盘缓存地调用 func(*args, **kwargs)
+
+    Args:
+        func: 数据源函数, 如 ak.macro_china_cpi_yearly
+        ttl: 缓存有效期(秒)
+        refresh: 跳过缓存强制请求
+
+    Returns:
+        func 的返回值
+    """
+    key = make_key(func, args, kwargs)
+    path = CACHE_DIR / f'{key}.pkl'
+    name = getattr(func, '__name__', repr(func))
+
+    if not (refresh or _refresh_all()) and path.exists():
+        try:
+            with open(path, 'rb') as f:
+                created, value = pickle.load(f)
+            if time.time() - created <= ttl:
+                os.utime(path)  # 更新访问时间, 用于 LRU
+                logger.debug(f"{name} 命中缓存")
+                return value
+        except Exception as e:
+            logger.warning(f"读取 {name} 缓存失败: {e}")
+
+    value = func(*args, **kwargs)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp, 'wb') as f:
+            pickle.dump((time.time(), value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        _evict(CACHE_MAX_MB * 1024 * 1024)
+    except Exception as e:
+        logger.warning(f"写入 {name} 缓存失败: {e}")
+    return value
+
+
+def cached(ttl: float = DAY):
+    """
+    装饰器版本, 调用时可以传 refresh=True 跳过缓存
+
+    @cached(ttl=TTLS['macro'])
+    def load_cpi(): ...
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, refresh: bool = False, **kwargs):
+            return cache_call(func, *args, ttl=ttl, refresh=refresh, **kwargs)
+        return wrapper
+    return decorator
+
+
+def clear_cache():
+    """清空缓存"""
+    for p in CACHE_DIR.glob('*.pkl'):
+        p.unlink(missing_ok=True)
@@ -4,6 +4,7 @@ from loguru import logger
 import pandas as pd
 
 from .constants import *
+from .storage import read_table, write_table
 
 
 def merge_indexes():
@@ -32,6 +33,28 @@ def merge_virtuals():
 
 
 
+def merge_on_date(series: dict, date_col: str = '日期') -> pd.DataFrame:
+    """
+    把多个按日期索引的序列一次性对齐成宽表, 代替循环里逐列 pd.merge
+    Args:
+        series: {列名: Series}, Series 的 index 为日期
+        date_col: 输出的日期列名
+
+    Returns:
+        DataFrame: 第一列为日期(升序), 其余每列一个序列, 日期取并集
+    """
+    if not series:
+        return pd.DataFrame(columns=[date_col])
+    cleaned = {}
+    for name, s in series.items():
+        s = s[s.index.notna()]
+        # 同一日期只保留最后一条, 否则 concat 无法对齐
+        cleaned[name] = s[~s.index.duplicated(keep='last')]
+    merged = pd.concat(cleaned, axis=1, join='outer', sort=True)
+    merged.index.name = date_col
+    return merged.reset_index()
+
+
 def merge_res(csv_paths: list, target_columns: list, new_columns: list, output_csv: str):
     """
     按照时间, 合并多种类型的csv为一个csv
@@ -45,7 +68,7 @@ def merge_res(csv_paths: list, target_columns: list, new_columns: list, output_c
 
     """
 
-    df_list = [pd.read_csv(csv_path) for csv_path in csv_paths]
+    df_list = [read_table(csv_path) for csv_path in csv_paths]
     df_list_target = []  # target df
     for df in df_list:
         # if '日期' in df.columns:
@@ -69,7 +92,7 @@ def merge_res(csv_paths: list, target_columns: list, new_columns: list, output_c
     # df_m['以太坊'] = df_m['以太坊'].str.replace(',', '')
     # df_m['以太坊'] = df_m['以太坊'].astype(float)
     # pd.to_numeric()
-    df_m.to_csv(output_csv, index=False)
+    write_table(df_m, output_csv)
     logger.info(f'{output_csv}已更新')
     return output_csv
 
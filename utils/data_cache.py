@@ -0,0 +1,134 @@
+"""
+进程内数据缓存
+
+Dash 页面不再在 import 时把数据读进模块全局变量, 而是在 layout / callback 里通过这里取:
+- 按数据集名缓存, 同一进程内所有页面、所有请求共享一份
+- 每次取数据时比较源文件 mtime, 文件更新后自动重新读取, 不用重启服务
+- 没有更新时直接返回缓存, 不会每个请求都重新解析csv
+
+get_frame 取一个数据集; cached_by_files / cached_by_datasets 用于缓存由若干文件派生出来的结果(筛选结果, 图等).
+每个 gunicorn worker 各自按需加载一份, 只有被访问的数据集才会占内存.
+"""
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+import pandas as pd
+from loguru import logger
+
+from utils.storage import list_tables, read_table, resolve
+
+PathLike = Union[str, Path]
+
+TABLE_SUFFIXES = ('.csv', '.parquet')
+
+
+def latest_table(directory: PathLike, pattern: str) -> Path:
+    """目录下匹配 pattern 的最新数据集(按 mtime)"""
+    files = list_tables(directory, pattern)
+    if not files:
+        raise FileNotFoundError(f"{directory} 下没有匹配 {pattern} 的文件")
+    return max(files, key=lambda p: resolve(p).stat().st_mtime)
+
+
+def _news_manifest() -> Path:
+    """新闻库用索引文件判断是否更新, 用到时才导入 news_store"""
+    from utils.news_store import manifest_path
+    return manifest_path()
+
+
+# 数据集名 -> 逻辑路径, 或者返回逻辑路径的函数(如取最新的文件)
+DATASETS: Dict[str, Union[PathLike, Callable[[], PathLike]]] = {
+    'bond_rate': 'datas/raw/bonds/ak_cn_us_rate.csv',
+    'bond_base_info': 'datas/raw/bonds/ef_get_all_base_info.csv',
+    'reits_realtime': 'datas/raw/reits/reits_realtime_em.csv',
+    'reits_merged': 'datas/processed/reits/reits_merged.csv',
+    'index_merged': lambda: latest_table('datas/processed/indexes', 'ak_index_global_merged_*'),
+    'virtual': 'datas/processed/virtual/all_virtual_data.csv',
+    'gold': 'datas/raw/metals/macro_cons_gold.csv',
+    'silver': 'datas/raw/metals/macro_cons_silver.csv',
+    'industry': 'datas/raw/stocks/ef_行业板块.csv',
+    'gdps': 'datas/processed/gdps/all_data.csv',
+    'cpis': 'datas/processed/cpis/all_data.csv',
+    'news_ths': 'datas/raw/news/ak_stock_info_global_ths.csv',
+    'news_em': 'datas/raw/news/ak_stock_info_global_em.csv',
+    'news': _news_manifest,
+}
+
+_lock = threading.Lock()
+_key_locks: Dict[Any, threading.Lock] = {}
+_entries: Dict[Any, Tuple[tuple, Any]] = {}  # key -> (文件状态, 值)
+
+
+def dataset_path(name: str) -> Path:
+    """数据集名 -> 逻辑路径, 不在 DATASETS 里的当作路径"""
+    target = DATASETS.get(name, name)
+    return Path(target() if callable(target) else target)
+
+
+def _signature(paths: List[Path]) -> tuple:
+    sig = []
+    for p in paths:
+        if p.suffix in TABLE_SUFFIXES or not p.suffix:
+            target = resolve(p)
+            st = target.stat()
+        else:
+            # 不是数据表的文件(如新闻库的索引)直接取状态, 还不存在时记为空, 出现后缓存自动失效
+            target = p
+            try:
+                st = target.stat()
+            except FileNotFoundError:
+                sig.append((str(target), None, None))
+                continue
+        sig.append((str(target), st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+def cached_by_files(key: Any, paths: List[PathLike], builder: Callable[[], Any]) -> Any:
+    """
+    返回 builder() 的缓存结果, paths 中任何文件变化(mtime/大小)后重新计算
+
+    Args:
+        key: 缓存key
+        paths: 结果依赖的数据文件(逻辑路径)
+        builder: 计算函数
+    """
+    paths = [Path(p) for p in paths]
+    with _lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    # 同一个 key 同时只有一个线程在计算, 其他线程等待结果
+    with key_lock:
+        sig = _signature(paths)
+        entry = _entries.get(key)
+        if entry is not None and entry[0] == sig:
+            return entry[1]
+        value = builder()
+        _entries[key] = (sig, value)
+        if entry is not None:
+            logger.info(f"数据已更新, 重新加载 {key}")
+        return value
+
+
+def cached_by_datasets(key: Any, names: List[str], builder: Callable[[], Any]) -> Any:
+    """同 cached_by_files, 依赖用数据集名表示"""
+    return cached_by_files(key, [dataset_path(n) for n in names], builder)
+
+
+def get_frame(name: str, **kwargs) -> pd.DataFrame:
+    """
+    取数据集, 返回浅拷贝: 可以增删列, 不要原地修改已有列的值
+
+    Args:
+        name: DATASETS 中的数据集名, 或者数据文件的逻辑路径
+        kwargs: 传给 read_table
+    """
+    path = dataset_path(name)
+    key = ('frame', str(path), repr(sorted(kwargs.items())))
+    df = cached_by_files(key, [path], lambda: read_table(path, **kwargs))
+    return df.copy(deep=False)
+
+
+def clear():
+    """清空缓存"""
+    with _lock:
+        _entries.clear()
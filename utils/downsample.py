@@ -0,0 +1,126 @@
+"""
+时间序列降采样
+
+长周期多序列图(全球指数, REITs, 加密货币)把每天的每个点都发给浏览器, 数据量大, 渲染慢.
+屏幕宽度只有一两千像素, 每个序列保留 max_points 个点就足够:
+- lttb: Largest-Triangle-Three-Buckets, 保留视觉形状, 适合折线
+- minmax: 每个桶保留最小和最大值, 不会漏掉尖峰, 全向量化, 速度最快
+
+downsample_series 在可见范围内按 max_points 降采样, 范围外只保留粗略的轮廓(给 rangeslider 用),
+放大后范围变小, 可见范围内的点会越来越密, 直到原始精度.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _as_float(x: np.ndarray) -> np.ndarray:
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    LTTB 降采样
+
+    Args:
+        x: 升序的横坐标(数值或 datetime64), 不能有 NaN
+        y: 纵坐标, 不能有 NaN
+        n_out: 输出点数
+
+    Returns:
+        np.ndarray: 保留点的下标
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    xf, yf = _as_float(x), np.asarray(y, dtype=float)
+
+    # 第一个和最后一个点固定, 中间 n - 2 个点分成 n_out - 2 个桶
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # 每个桶的平均点, 作为下一个桶的第三个顶点
+    sums_x = np.add.reduceat(xf[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(yf[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, xf[-1])
+    avg_y = np.append(sums_y / counts, yf[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # 三角形面积(省略 1/2): 上一个选中点 a, 当前桶的候选点, 下一个桶的平均点
+        area = np.abs(
+            (xf[a] - avg_x[i + 1]) * (yf[lo:hi] - yf[a])
+            - (xf[a] - xf[lo:hi]) * (avg_y[i + 1] - yf[a])
+        )
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def minmax(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    min-max 降采样, 每个桶保留最小值和最大值, 返回升序下标
+    """
+    n = len(x)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    n_bins = n_out // 2
+    edges = np.linspace(0, n, n_bins + 1).astype(np.int64)[:-1]
+    yf = np.asarray(y, dtype=float)
+    # 桶内的 argmin/argmax: 按桶排序后取每个桶第一个/最后一个
+    bins = np.repeat(np.arange(n_bins), np.diff(np.append(edges, n)))
+    order = np.lexsort((yf, bins))
+    starts = np.append(edges, n)
+    idx_min = order[starts[:-1]]
+    idx_max = order[starts[1:] - 1]
+    return np.unique(np.concatenate([idx_min, idx_max, [0, n - 1]]))
+
+
+METHODS = {'lttb': lttb, 'minmax': minmax}
+
+
+def downsample_series(
+    x: pd.Series,
+    y: pd.Series,
+    max_points: int = 2000,
+    x_range: Optional[Tuple] = None,
+    overview_points: int = 300,
+    method: str = 'lttb',
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    降采样一个序列
+
+    Args:
+        x: 横坐标(日期), 升序
+        y: 纵坐标, NaN 会被去掉
+        max_points: 可见范围内最多保留的点数
+        x_range: 可见范围 (x0, x1), None 为全部
+        overview_points: 可见范围外保留的点数, 用于 rangeslider 显示整体轮廓
+        method: lttb | minmax
+
+    Returns:
+        (x, y)
+    """
+    mask = y.notna().values
+    xv, yv = x.values[mask], y.values[mask]
+    func = METHODS[method]
+    if x_range is None:
+        idx = func(xv, yv, max_points)
+        return xv[idx], yv[idx]
+
+    x0, x1 = x_range
+    if np.issubdtype(xv.dtype, np.datetime64):
+        x0, x1 = np.datetime64(pd.Timestamp(x0)), np.datetime64(pd.Timestamp(x1))
+    # 左右各多留一个点, 线可以连到可见范围边缘
+    lo = max(int(np.searchsorted(xv, x0, side='left')) - 1, 0)
+    hi = min(int(np.searchsorted(xv, x1, side='right')) + 1, len(xv))
+    inside = np.arange(lo, hi)[func(xv[lo:hi], yv[lo:hi], max_points)]
+    overview = func(xv, yv, overview_points)
+    outside = overview[(overview < lo) | (overview >= hi)]
+    idx = np.union1d(inside, outside)
+    return xv[idx], yv[idx]
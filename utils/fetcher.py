@@ -0,0 +1,401 @@
+"""
+并发抓取引擎
+
+逐个 symbol 下载历史数据的接口(如 ak.reits_hist_em)串行调用时, 总耗时等于所有网络往返之和.
+这里提供一个有界线程池执行器:
+- max_workers 控制并发数
+- 按 host(数据源)共享令牌桶限速, 遇到 429/5xx 自动降速, 成功后慢慢恢复(AIMD)
+- 失败重试, 带随机抖动的指数退避
+- 熔断: 同一数据源连续被限速或连不上后暂停请求, 过一段时间再放一个请求试探;
+  熔断期间调用方等待恢复, 而不是直接失败. 单个 symbol 的参数、解析错误不计入熔断
+- 每个 symbol 下载完成后立即回调(写csv), 不等全部结束
+- 汇总报告: 成功/失败, 单个 symbol 耗时, 相对串行的加速比
+
+单个接口调用用 guarded(host, func) 包装, 和批量抓取共享同一数据源的限速和熔断状态.
+
+python -m utils.fetcher  用本地 stub 代替 akshare, 对比串行和并发的耗时
+"""
+import functools
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from loguru import logger
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import Timeout as RequestsTimeout
+
+
+class RateLimiter:
+    """令牌桶限速器, rate: 每秒令牌数, burst: 桶容量"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌, 没有则阻塞等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    自适应令牌桶: 被限速(429/5xx)时速率减半, 每次成功按 max_rate 的 5% 回升
+    """
+
+    def __init__(self, max_rate: float, burst: int = 1, min_rate: float = 0.1):
+        super().__init__(max_rate, burst)
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            # 清空令牌, 避免降速后还能突发
+            self._tokens = min(self._tokens, 0)
+        logger.warning(f"数据源限速, 降低请求速率到 {self.rate:.2f}/s")
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断中, 不再请求该数据源"""
+
+
+class CircuitBreaker:
+    """
+    熔断器
+    - closed: 正常请求, 连续失败 failure_threshold 次后 open
+    - open: 拒绝请求, reset_timeout 秒后进入 half_open
+    - half_open: 只放一个请求试探, 成功则 closed, 失败重新 open
+
+    record_success / record_failure 之后唤醒 wait 中的调用方
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._cond = threading.Condition()
+
+    def _try_enter(self) -> Optional[float]:
+        """持有锁时调用: 可以请求返回 None, 否则返回建议等待的秒数(0 表示等试探结果)"""
+        if self.state == 'open':
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                return remaining
+            self.state = 'half_open'
+            self._trial = False
+        if self.state == 'half_open':
+            if self._trial:
+                return 0.0
+            self._trial = True
+        return None
+
+    def allow(self):
+        """是否可以请求, 不可以则抛出 CircuitOpenError"""
+        with self._cond:
+            if self._try_enter() is not None:
+                raise CircuitOpenError(f"{self.name} 熔断中")
+
+    def wait(self, timeout: Optional[float] = None):
+        """
+        等到可以请求为止: open 时等 reset_timeout 到期, half_open 时等试探请求的结果
+
+        Args:
+            timeout: 最多等待秒数, 超时仍在熔断则抛出 CircuitOpenError, None 为一直等
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                delay = self._try_enter()
+                if delay is None:
+                    return
+                if deadline is not None:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        raise CircuitOpenError(f"{self.name} 熔断中, 等待 {timeout:.0f}s 仍未恢复")
+                    delay = min(delay, left) if delay > 0 else left
+                self._cond.wait(delay if delay > 0 else None)
+
+    def record_success(self):
+        with self._cond:
+            if self.state != 'closed':
+                logger.info(f"{self.name} 恢复, 关闭熔断")
+            self.state = 'closed'
+            self._failures = 0
+            self._trial = False
+            self._cond.notify_all()
+
+    def record_failure(self):
+        with self._cond:
+            self._failures += 1
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logger.error(f"{self.name} 连续失败 {self._failures} 次, 熔断 {self.reset_timeout:.0f}s")
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+            self._trial = False
+            self._cond.notify_all()
+
+
+@dataclass
+class SourceGuard:
+    """一个数据源的限速器和熔断器"""
+    limiter: AdaptiveRateLimiter
+    breaker: CircuitBreaker
+
+
+# 各数据源每秒请求数上限, 没有配置的用默认值
+SOURCE_RATES: Dict[str, float] = {
+    'eastmoney': 5.0,
+    'sina': 2.0,
+    'ths': 2.0,
+    'cls': 2.0,
+    'jin10': 2.0,
+    'jisilu': 1.0,
+    'yahoo': 0.5,
+}
+
+# 每个 host 一个 guard, 同一数据源的所有调用共享
+_GUARDS: Dict[str, SourceGuard] = {}
+_GUARDS_LOCK = threading.Lock()
+
+
+def get_guard(host: str, rate: Optional[float] = None, burst: int = 5) -> SourceGuard:
+    """获取 host 对应的限速器和熔断器, 不存在则创建"""
+    with _GUARDS_LOCK:
+        if host not in _GUARDS:
+            rate = rate or SOURCE_RATES.get(host, 5.0)
+            _GUARDS[host] = SourceGuard(AdaptiveRateLimiter(rate, burst), CircuitBreaker(host))
+        return _GUARDS[host]
+
+
+def get_limiter(host: str, rate: float = 5.0, burst: int = 5) -> RateLimiter:
+    """获取 host 对应的限速器, 不存在则创建"""
+    return get_guard(host, rate, burst).limiter
+
+
+def is_throttled(exc: Exception) -> bool:
+    """是否是被数据源限速或服务端错误(429/5xx)"""
+    status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    msg = str(exc)
+    return 'Too Many Requests' in msg or 'Rate limited' in msg or bool(re.search(r'\b(429|50[0-4])\b', msg))
+
+
+# 连不上数据源的异常, 和 is_throttled 一起计入熔断
+NETWORK_ERRORS = (ConnectionError, TimeoutError, RequestsConnectionError, RequestsTimeout)
+
+
+def is_source_error(exc: Exception) -> bool:
+    """是否是数据源本身的问题(限速、5xx、连不上), 只有这类错误计入熔断"""
+    return isinstance(exc, NETWORK_ERRORS) or is_throttled(exc)
+
+
+@dataclass
+class FetchResult:
+    """单个 symbol 的抓取结果"""
+    key: str
+    ok: bool
+    latency: float        # 秒, 包含重试
+    attempts: int
+    error: str = ''
+
+
+@dataclass
+class FetchReport:
+    """一次批量抓取的汇总"""
+    results: List[FetchResult] = field(default_factory=list)
+    elapsed: float = 0.0  # 墙钟时间
+    max_workers: int = 1
+
+    @property
+    def successes(self) -> List[FetchResult]:
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failures(self) -> List[FetchResult]:
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def serial_time(self) -> float:
+        """串行执行的估计耗时: 单个耗时之和"""
+        return sum(r.latency for r in self.results)
+
+    @property
+    def speedup(self) -> float:
+        return self.serial_time / self.elapsed if self.elapsed > 0 else 1.0
+
+    def summary(self) -> str:
+        return (
+            f"成功 {len(self.successes)}, 失败 {len(self.failures)}, "
+            f"耗时 {self.elapsed:.2f}s, 串行估计 {self.serial_time:.2f}s, "
+            f"加速比 {self.speedup:.1f}x (并发 {self.max_workers})"
+        )
+
+    def log(self, title: str):
+        """打印汇总, 以及每个 symbol 的耗时(慢的在前)和失败原因"""
+        logger.info(f"{title}: {self.summary()}")
+        for r in sorted(self.results, key=lambda r: r.latency, reverse=True):
+            if r.ok:
+                logger.debug(f"{title} {r.key}: {r.latency:.2f}s, 尝试{r.attempts}次")
+            else:
+                logger.error(f"{title} {r.key}: 失败 {r.latency:.2f}s, 尝试{r.attempts}次, {r.error}")
+
+
+def retry_call(
+    func: Callable,
+    *args,
+    retries: int = 3,
+    backoff: float = 1.0,
+    limiter: Optional[RateLimiter] = None,
+    guard: Optional[SourceGuard] = None,
+    breaker_wait: Optional[float] = None,
+    **kwargs,
+):
+    """
+    调用 func, 失败后按 [0, backoff * 2^n] 秒随机退避重试
+
+    Args:
+        limiter: 只限速
+        guard: 限速 + 熔断, 被限速时降低速率; 熔断时等待恢复, 只有 is_source_error 的错误计入熔断
+        breaker_wait: 熔断时最多等待秒数, 默认 2 倍 reset_timeout, 超时抛出 CircuitOpenError
+
+    Returns:
+        (返回值, 尝试次数)
+    """
+    if guard is not None:
+        limiter = guard.limiter
+        if breaker_wait is None:
+            breaker_wait = guard.breaker.reset_timeout * 2
+    for attempt in range(1, retries + 2):
+        if guard is not None:
+            guard.breaker.wait(breaker_wait)
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            throttled = is_throttled(e)
+            if guard is not None:
+                if is_source_error(e):
+                    guard.breaker.record_failure()
+                else:
+                    # 数据源有响应, 只是这个请求本身出错(如 symbol 不存在), 不计入熔断
+                    guard.breaker.record_success()
+                if throttled:
+                    guard.limiter.on_throttle()
+            if attempt > retries:
+                raise
+            # 被限速时退避时间加倍
+            delay = random.uniform(0, backoff * 2 ** (attempt - 1 + throttled))
+            logger.warning(f"{getattr(func, '__name__', func)} 第{attempt}次失败: {e}, {delay:.1f}s 后重试")
+            time.sleep(delay)
+            continue
+        if guard is not None:
+            guard.breaker.record_success()
+            guard.limiter.on_success()
+        return result, attempt
+
+
+def guarded(host: str, func: Callable, retries: int = 2, backoff: float = 1.0) -> Callable:
+    """
+    包装数据源函数, 调用时走 host 的限速、重试和熔断
+
+    返回的函数保留原函数名和签名, 可以直接给 cache_call / fetch_since 使用:
+    df = guarded('eastmoney', ak.stock_info_global_em)()
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result, _ = retry_call(func, *args, retries=retries, backoff=backoff, guard=get_guard(host), **kwargs)
+        return result
+    return wrapper
+
+
+def fetch_concurrently(
+    keys: Iterable[Any],
+    fetch: Callable[[Any], Any],
+    on_result: Optional[Callable[[Any, Any], None]] = None,
+    max_workers: int = 8,
+    host: str = 'default',
+    rate: Optional[float] = None,
+    retries: int = 3,
+    backoff: float = 1.0,
+) -> FetchReport:
+    """
+    并发抓取多个 symbol
+
+    Args:
+        keys: symbol 列表
+        fetch: fetch(key) -> data, 如 lambda s: ak.reits_hist_em(symbol=s)
+        on_result: on_result(key, data), 下载完成后在工作线程里立即调用(写盘)
+        max_workers: 并发上限, 1 即串行
+        host: 数据源, 同一个 host 共享限速和熔断
+        rate: host 每秒请求数上限, 第一次创建 guard 时生效
+        retries: 失败重试次数
+        backoff: 退避基数(秒)
+
+    Returns:
+        FetchReport
+    """
+    guard = get_guard(host, rate, burst=max(1, max_workers))
+
+    def run_one(key) -> FetchResult:
+        start = time.perf_counter()
+        attempts = 0
+        try:
+            data, attempts = retry_call(fetch, key, retries=retries, backoff=backoff, guard=guard)
+            if on_result is not None:
+                on_result(key, data)
+            return FetchResult(str(key), True, time.perf_counter() - start, attempts)
+        except Exception as e:
+            logger.error(f"抓取 {key} 失败: {e}")
+            return FetchResult(str(key), False, time.perf_counter() - start, attempts or retries + 1, str(e))
+
+    report = FetchReport(max_workers=max_workers)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(run_one, key) for key in keys]
+        for future in as_completed(futures):
+            report.results.append(future.result())
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+if __name__ == "__main__":
+    # 本地 stub 代替 akshare: 每次请求固定延迟, 偶发失败
+    def stub_hist(symbol, latency=0.05):
+        time.sleep(latency)
+        if random.random() < 0.05:
+            raise ConnectionError('stub 网络错误')
+        return [symbol]
+
+    symbols = [f'{508000 + i}' for i in range(80)]
+    serial = fetch_concurrently(symbols, stub_hist, max_workers=1, host='stub-serial', rate=1000, backoff=0.01)
+    parallel = fetch_concurrently(symbols, stub_hist, max_workers=16, host='stub-parallel', rate=1000, backoff=0.01)
+    logger.info(f"串行: {serial.summary()}")
+    logger.info(f"并发: {parallel.summary()}")
+    logger.info(f"墙钟加速: {serial.elapsed / parallel.elapsed:.1f}x")
@@ -0,0 +1,142 @@
+"""
+历史数据增量更新
+
+每天只会多出一两行, 没必要重新写整个历史csv:
+- 从文件末尾读最后一行, 得到已保存的最后日期, 不解析整个文件
+- 数据源支持 start_date 参数时, 只请求最后日期之后的数据
+- 否则下载全量, 和已保存数据按日期比较, 只追加新行
+- 最后一天可能是盘中数据, 重写最后一行
+- 数据源加减了列时, 历史数据按列名对齐后重写, 不丢历史
+"""
+import inspect
+import io
+import os
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import pandas as pd
+from loguru import logger
+
+
+def _read_last_line(path: Path) -> Tuple[int, str]:
+    """
+    从文件末尾向前读, 返回最后一行的起始偏移和内容
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b''
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+            stripped = data.rstrip(b'\r\n')
+            idx = stripped.rfind(b'\n')
+            if idx != -1:
+                return pos + idx + 1, stripped[idx + 1:].decode('utf-8')
+        return 0, data.rstrip(b'\r\n').decode('utf-8')
+
+
+def read_last_date(path, date_col: str = '日期') -> Optional[pd.Timestamp]:
+    """
+    读取csv中最后一行的日期, 文件不存在或没有数据返回None
+    """
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+    with open(path, encoding='utf-8') as f:
+        header = f.readline().rstrip('\r\n')
+    offset, last_line = _read_last_line(path)
+    if offset == 0:
+        return None
+    try:
+        last = pd.read_csv(io.StringIO(f"{header}\n{last_line}"))
+        return pd.to_datetime(last[date_col].iloc[0])
+    except Exception as e:
+        logger.warning(f"读取 {path} 最后日期失败: {e}")
+        return None
+
+
+def fetch_since(func: Callable, last_date: Optional[pd.Timestamp], fmt: str = '%Y%m%d', **kwargs) -> pd.DataFrame:
+    """
+    调用数据源, 如果 func 支持 start_date 参数, 只请求 last_date 之后的数据
+    """
+    try:
+        params = inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        params = {}
+    if last_date is not None and 'start_date' in params:
+        kwargs['start_date'] = last_date.strftime(fmt)
+    return func(**kwargs)
+
+
+def _merge_columns(df: pd.DataFrame, path: Path, date_col: str) -> int:
+    """
+    列和已保存的不一致(数据源加减了列): 读出历史数据, 按列名对齐后拼接重写
+
+    df 最早日期及之后的历史行用 df 替换; df 是全量下载(覆盖全部历史)时才全量重写
+    """
+    old = pd.read_csv(path)
+    old_dates = pd.to_datetime(old[date_col], errors='coerce')
+    dates = pd.to_datetime(df[date_col], errors='coerce')
+    start = dates.min()
+    keep = old[old_dates < start] if pd.notna(start) else old
+    if keep.empty:
+        logger.warning(f"{path} 列不一致, 新数据覆盖全部历史, 全量重写")
+        df.to_csv(path, index=False)
+        return int((dates > old_dates.max()).sum())
+    merged = pd.concat([keep, df], ignore_index=True)
+    # 新数据的列在前, 只在历史数据里有的列放后面
+    merged = merged[[*df.columns, *[c for c in old.columns if c not in df.columns]]]
+    logger.warning(f"{path} 列不一致, 保留 {len(keep)} 行历史数据, 按列名对齐后重写")
+    merged.to_csv(path, index=False)
+    return int((dates > old_dates.max()).sum())
+
+
+def append_incremental(df: pd.DataFrame, path, date_col: str = '日期') -> int:
+    """
+    把 df 中比已保存数据更新的行追加到csv
+
+    Args:
+        df: 新下载的数据(全量或增量)
+        path: csv路径
+        date_col: 日期列
+
+    Returns:
+        int: 新增的行数(不含重写的最后一行)
+    """
+    path = Path(path)
+    if df.empty:
+        return 0
+    if not path.exists() or path.stat().st_size == 0:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(path, index=False)
+        return len(df)
+
+    with open(path, encoding='utf-8') as f:
+        header = f.readline().rstrip('\r\n')
+    offset, last_line = _read_last_line(path)
+    if offset == 0:
+        # 只有表头没有历史数据, 直接重写
+        df.to_csv(path, index=False)
+        return len(df)
+    if header.split(',') != [str(c) for c in df.columns]:
+        return _merge_columns(df, path, date_col)
+
+    last_date = pd.to_datetime(pd.read_csv(io.StringIO(f"{header}\n{last_line}"))[date_col].iloc[0])
+    dates = pd.to_datetime(df[date_col], errors='coerce')
+    new_rows = df[dates >= last_date]
+    if new_rows.empty:
+        return 0
+
+    text = new_rows.to_csv(index=False, header=False)
+    if text.strip('\r\n') == last_line:
+        return 0
+
+    # 截掉最后一行(可能是盘中数据), 写入最后一天及之后的数据
+    with open(path, 'r+b') as f:
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(text.encode('utf-8'))
+    return int((dates > last_date).sum())
@@ -0,0 +1,213 @@
+"""
+可转债双低轮动回测
+
+按日期回放 datas/raw/bonds/conv_*.csv 快照(从 utils/snapshot_store 读取), 每个快照调仓一次:
+- 仓位: judge_bonds 按全市场双低平均值给出的仓位比例
+- 选债: 双低平均值低于 switch_avg_low 用 get_low_premium_rate_and_double_low, 否则用 get_double_low_and_low_premium_rate
+- 持仓等权, 持有到下一个快照, 收益按两个快照的现价计算
+
+快照先对齐成 日期 x 转债 的矩阵(SnapshotPanel), 之后每组参数只在矩阵上做向量化的筛选和排序,
+几百组参数几秒内跑完.
+
+python -m utils.logics.bond_backtest          默认参数回测 + 参数扫描
+"""
+import itertools
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from utils.logics.bond_logic import POSITION_LEVELS, common_logic
+from utils.snapshot_store import ingest_raw, load_history
+
+SNAPSHOT_DIR = Path('datas/raw/bonds')
+SNAPSHOT_PATTERN = 'conv_*'
+
+
+@dataclass(frozen=True)
+class BacktestParams:
+    """回测参数, 默认值和 bond 页面的筛选一致"""
+    premium_max: float = 20.0        # 转股溢价率上限
+    double_low_max: float = 125.0    # 双低上限
+    price_max: float = 110.0         # 现价上限, 只用于债性策略
+    pre_select: int = 50             # 第一轮排序保留数量
+    num: int = 30                    # 最终持仓数量
+    switch_avg_low: float = 160.0    # 双低平均值低于该值用股性策略, 否则用债性策略
+    position_shift: float = 0.0      # POSITION_LEVELS 各档阈值整体平移, 0 即页面上 judge_bonds 的仓位
+    fee_rate: float = 0.001          # 单边交易费率
+
+
+@dataclass
+class SnapshotPanel:
+    """对齐后的快照, 矩阵都是 日期 x 转债"""
+    dates: pd.DatetimeIndex
+    codes: np.ndarray
+    price: np.ndarray          # 现价, 不在快照里为 NaN
+    premium: np.ndarray        # 转股溢价率
+    double_low: np.ndarray     # 双低
+    eligible: np.ndarray       # 可买: 在快照里, 有成交, 满足 common_logic
+    avg_low: np.ndarray        # 每个快照全市场双低平均值
+    next_return: np.ndarray    # 持有到下一个快照的收益, 最后一个快照和下一个快照不在的为 0
+
+
+@dataclass
+class BacktestResult:
+    params: BacktestParams
+    dates: pd.DatetimeIndex
+    weights: np.ndarray        # 日期 x 转债, 调仓后的目标权重
+    returns: np.ndarray        # 每期扣费后收益
+    turnover: np.ndarray       # 每期单边换手率
+    equity: np.ndarray         # 净值
+    drawdown: np.ndarray       # 回撤
+
+    def stats(self) -> Dict[str, float]:
+        days = max((self.dates[-1] - self.dates[0]).days, 1)
+        total = self.equity[-1] - 1
+        return {
+            'total_return': total,
+            'annual_return': (1 + total) ** (365 / days) - 1,
+            'max_drawdown': self.drawdown.min(),
+            'avg_turnover': self.turnover.mean(),
+            'avg_holdings': (self.weights > 0).sum(axis=1).mean(),
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'return': self.returns,
+            'turnover': self.turnover,
+            'equity': self.equity,
+            'drawdown': self.drawdown,
+            'position': self.weights.sum(axis=1),
+        }, index=self.dates)
+
+
+def load_snapshots(directory=SNAPSHOT_DIR, pattern: str = SNAPSHOT_PATTERN) -> Dict[pd.Timestamp, pd.DataFrame]:
+    """按日期升序读取所有快照, 新的 csv 先导入快照库, 之后一次读出全部历史"""
+    ingest_raw(directory, pattern)
+    history = load_history()
+    return {date: df.drop(columns='date').reset_index(drop=True) for date, df in history.groupby('date')}
+
+
+def build_panel(snapshots: Dict[pd.Timestamp, pd.DataFrame]) -> SnapshotPanel:
+    """快照对齐成矩阵, 和参数无关, 只需要算一次"""
+    dates = pd.DatetimeIndex(sorted(snapshots))
+    codes = np.array(sorted(set().union(*(df['代码'] for df in snapshots.values()))))
+    shape = (len(dates), len(codes))
+    price, premium, double_low = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+    eligible = np.zeros(shape, dtype=bool)
+    avg_low = np.empty(len(dates))
+
+    for i, date in enumerate(dates):
+        df = snapshots[date]
+        cols = np.searchsorted(codes, df['代码'].to_numpy())
+        price[i, cols] = df['现价'].to_numpy(dtype=float)
+        premium[i, cols] = df['转股溢价率'].to_numpy(dtype=float)
+        double_low[i, cols] = df['双低'].to_numpy(dtype=float)
+        avg_low[i] = df['双低'].mean()
+        # 没有成交额的是未上市或停牌, 买不到; 收盘后抓的快照成交额全是 0, 不过滤
+        traded = df['成交额'] > 0
+        tradable = df[traded] if traded.any() else df
+        kept = common_logic(tradable.copy(), as_of=date.to_pydatetime())
+        eligible[i, np.searchsorted(codes, kept['代码'].to_numpy())] = True
+
+    # 下一个快照不在的(到期/强赎/退市)按收益 0 处理
+    next_return = np.zeros(shape)
+    next_return[:-1] = np.nan_to_num(price[1:] / price[:-1] - 1, nan=0.0)
+    return SnapshotPanel(dates, codes, price, premium, double_low, eligible, avg_low, next_return)
+
+
+def _top_k(key: np.ndarray, mask: np.ndarray, k: int) -> np.ndarray:
+    """每行 mask 内 key 最小的 k 个, 并列保持原顺序"""
+    key = np.where(mask, key, np.inf)
+    order = np.argsort(key, axis=1, kind='stable')
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.arange(key.shape[1])[None, :].repeat(key.shape[0], axis=0), axis=1)
+    return mask & (rank < k)
+
+
+def select(panel: SnapshotPanel, params: BacktestParams) -> np.ndarray:
+    """每个快照的选债结果, 返回 日期 x 转债 的 bool 矩阵"""
+    base = panel.eligible & (panel.premium < params.premium_max)
+
+    # 股性: 低溢价率取前 pre_select, 再按双低取前 num
+    stock = _top_k(panel.premium, base, params.pre_select)
+    stock = _top_k(panel.double_low, stock & (panel.double_low < params.double_low_max), params.num)
+
+    # 债性: 双低/现价/溢价率过滤, 按双低取前 pre_select, 再按溢价率取前 num
+    bond = base & (panel.double_low < params.double_low_max) & (panel.price < params.price_max)
+    bond = _top_k(panel.double_low, bond, params.pre_select)
+    bond = _top_k(panel.premium, bond, params.num)
+
+    use_stock = (panel.avg_low < params.switch_avg_low)[:, None]
+    return np.where(use_stock, stock, bond)
+
+
+def position_ratios(avg_low: np.ndarray, shift: float = 0.0) -> np.ndarray:
+    """
+    双低平均值 -> 仓位比例, 向量化的 position_level, 档位阈值取自 POSITION_LEVELS 再加 shift
+
+    shift=0 时和 position_level 一致; 双低平均值为 NaN(快照里没有数据)时仓位为 0
+    """
+    uppers = np.array([upper for upper, _, _ in POSITION_LEVELS[:-1]]) + shift
+    ratios = np.array([ratio for _, _, ratio in POSITION_LEVELS])
+    avg_low = np.asarray(avg_low, dtype=float)
+    # position_level 用 avg_low < upper, 等于阈值时落到下一档, 对应 side='right'
+    level = np.searchsorted(uppers, avg_low, side='right')
+    return np.where(np.isnan(avg_low), 0.0, ratios[level])
+
+
+def run_backtest(panel: SnapshotPanel, params: Optional[BacktestParams] = None) -> BacktestResult:
+    params = params or BacktestParams()
+    selected = select(panel, params)
+    ratio = position_ratios(panel.avg_low, params.position_shift)
+    counts = selected.sum(axis=1)
+    weights = np.where(selected, (ratio / np.maximum(counts, 1))[:, None], 0.0)
+
+    prev = np.vstack([np.zeros((1, weights.shape[1])), weights[:-1]])
+    traded = np.abs(weights - prev).sum(axis=1)
+    returns = (weights * panel.next_return).sum(axis=1) - traded * params.fee_rate
+    equity = np.cumprod(1 + returns)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    return BacktestResult(params, panel.dates, weights, returns, traded / 2, equity, drawdown)
+
+
+def param_grid(**values: Iterable) -> List[BacktestParams]:
+    """参数网格, 如 param_grid(num=[10, 20, 30], premium_max=[15, 20]), 其余用默认值"""
+    names = list(values)
+    return [BacktestParams(**dict(zip(names, combo))) for combo in itertools.product(*values.values())]
+
+
+def sweep(panel: SnapshotPanel, grid: Iterable[BacktestParams], sort_by: str = 'total_return') -> pd.DataFrame:
+    """每组参数回测一次, 返回参数和指标, 按 sort_by 从高到低"""
+    rows = [{**asdict(p), **run_backtest(panel, p).stats()} for p in grid]
+    return pd.DataFrame(rows).sort_values(sort_by, ascending=False, ignore_index=True)
+
+
+DEFAULT_GRID = dict(
+    premium_max=[10, 15, 20, 25, 30],
+    double_low_max=[115, 120, 125, 130, 135],
+    num=[10, 20, 30],
+    switch_avg_low=[150, 160, 170],
+    pre_select=[30, 50],
+    position_shift=[0, 20, 40],
+)
+
+
+if __name__ == "__main__":
+    panel = build_panel(load_snapshots())
+    logger.info(f"{len(panel.dates)} 个快照 {panel.dates[0].date()} ~ {panel.dates[-1].date()}, {len(panel.codes)} 只转债")
+
+    result = run_backtest(panel)
+    logger.info(f"默认参数:\n{result.to_frame()}")
+    logger.info(f"默认参数指标: {result.stats()}")
+
+    grid = param_grid(**DEFAULT_GRID)
+    start = time.perf_counter()
+    table = sweep(panel, grid)
+    logger.info(f"{len(grid)} 组参数, 耗时 {time.perf_counter() - start:.2f}s")
+    logger.info(f"\n{table.head(int(sys.argv[1]) if len(sys.argv) > 1 else 20)}")
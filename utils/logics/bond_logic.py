@@ -1,9 +1,13 @@
-from typing import Dict, List
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import numpy as np
 import pandas as pd
 from loguru import logger
 
+from utils.logics.rolling_rank import RollingRank
+
 
 class Strategy(Enum):
     """可转债策略类型"""
@@ -35,6 +39,150 @@ class ConvertibleBond:
         """计算双低值"""
         return self.premium_rate + self.price
 
+RATINGS = ['AAA', 'AA+', 'AA']
+
+# 风险偏好系数
+RISK_FACTORS = {
+    'conservative': 0.7,
+    'moderate': 1.0,
+    'aggressive': 1.3
+}
+
+
+def _score_arrays(bonds_data: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """compute_strategy_scores 的 numpy 版本, 筛选内部用"""
+    price = bonds_data['price'].to_numpy(dtype=float)
+    premium_rate = bonds_data['premium_rate'].to_numpy(dtype=float)
+    nan = np.full(len(bonds_data), np.nan)
+
+    def column(name: str) -> np.ndarray:
+        return bonds_data[name].to_numpy(dtype=float) if name in bonds_data else nan
+
+    double_low = premium_rate + price
+    price_diff = np.abs(price - column('stock_price') * 100 / column('convert_price'))
+    return {
+        'double_low': double_low,
+        'double_low_score': 100 - double_low,
+        'low_premium_score': 100 - premium_rate,
+        'price_diff': price_diff,
+        'par_value_score': 100 - price_diff * 10,
+        'value_diff': np.abs(price - column('convert_value')),
+        'high_price_score': column('stock_momentum'),
+    }
+
+
+def compute_strategy_scores(bonds_data: pd.DataFrame) -> pd.DataFrame:
+    """一次向量化计算所有策略用到的指标和分数
+
+    Args:
+        bonds_data: 可转债数据
+
+    Returns:
+        pd.DataFrame: index 与 bonds_data 相同, 列:
+            double_low          双低值
+            double_low_score    双低分数, 100 - 双低值
+            low_premium_score   低溢价分数, 100 - 溢价率
+            price_diff          价格与转股价值(正股价*100/转股价)的差, 缺列为 NaN
+            par_value_score     平价分数, 100 - price_diff * 10
+            value_diff          价格与 convert_value 列的差, 缺列为 NaN
+            high_price_score    股性分数, 即 stock_momentum, 缺列为 NaN
+    """
+    return pd.DataFrame(_score_arrays(bonds_data), index=bonds_data.index)
+
+
+def _select(
+    cols: Dict[str, np.ndarray],
+    mask: np.ndarray,
+    by: str,
+    score_col: str,
+    strategy: str,
+    reason: str,
+    fields: List[str],
+    top_n: int,
+    largest: bool = True,
+) -> pd.DataFrame:
+    """在 mask 内按 by 取前 top_n, 直接用 Series.nlargest/nsmallest, 结果和原来逐策略的 DataFrame.nlargest 一致:
+    有效值不足 top_n 时用 by 为 NaN 的行补齐(排在最后), 并列时的顺序也相同
+
+    只有选中的 top_n 行才格式化 reason, reason 为格式串, 依次填入 fields 列的值
+    """
+    idx = np.flatnonzero(mask)
+    values = pd.Series(cols[by][idx], index=idx)
+    picked = values.nlargest(top_n) if largest else values.nsmallest(top_n)
+    idx = picked.index.to_numpy()
+    return pd.DataFrame({
+        'code': cols['code'][idx],
+        'strategy': strategy,
+        'score': cols[score_col][idx],
+        'reason': [reason.format(*(cols[f][i] for f in fields)) for i in idx],
+    })
+
+
+def _columns(bonds_data: pd.DataFrame, extra: List[str]) -> Dict[str, np.ndarray]:
+    """策略分数和 extra 列转成 numpy 数组, 后续只在数组上操作"""
+    cols = _score_arrays(bonds_data)
+    for c in extra:
+        cols[c] = bonds_data[c].to_numpy(dtype=float)
+    cols['code'] = bonds_data['code'].to_numpy()
+    return cols
+
+
+SCREEN_COLUMNS = ['code', 'strategy', 'score', 'reason']
+
+
+def screen_bonds(
+    bonds_data: pd.DataFrame,
+    risk_preference: str = 'moderate',
+    top_n: int = 10,
+) -> pd.DataFrame:
+    """对同一批可转债一次算出双低/低溢价/平价三个策略的推荐
+
+    Args:
+        bonds_data: 可转债数据
+        risk_preference: 风险偏好 ('conservative'|'moderate'|'aggressive')
+        top_n: 每个策略推荐数量
+
+    Returns:
+        pd.DataFrame: 列 code, strategy, score, reason; 每个策略内按分数从高到低
+    """
+    risk_factor = RISK_FACTORS.get(risk_preference, 1.0)
+
+    # 基础筛选条件
+    base = (
+        (bonds_data['duration'] >= 1.0 * risk_factor) &
+        (bonds_data['remain_size'] >= 1.0) &
+        (bonds_data['price'] >= 90.0) &
+        (bonds_data['premium_rate'] <= 30.0 * risk_factor) &
+        (bonds_data['credit_rating'].isin(RATINGS))
+    )
+    if not base.any():
+        logger.warning("没有符合条件的可转债")
+        return pd.DataFrame(columns=SCREEN_COLUMNS)
+
+    cols = _columns(bonds_data, ['premium_rate'])
+    base = base.to_numpy()
+
+    parts = [
+        # 双低策略
+        _select(cols, base, 'double_low_score', 'double_low_score', Strategy.DOUBLE_LOW.value,
+                '双低值:{:.1f}', ['double_low'], top_n),
+        # 低溢价率策略
+        _select(cols, base, 'low_premium_score', 'low_premium_score', Strategy.LOW_PREMIUM.value,
+                '溢价率:{:.1f}%', ['premium_rate'], top_n),
+        # 平价策略
+        _select(cols, base & (cols['price_diff'] <= 3), 'par_value_score', 'par_value_score',
+                Strategy.PAR_VALUE.value, '价差:{:.1f}', ['price_diff'], top_n),
+    ]
+    return pd.concat(parts, ignore_index=True)
+
+
+def _to_records(screened: pd.DataFrame, strategy: str, columns: List[str]) -> List[Dict]:
+    """列式筛选结果 -> 原来的字典列表"""
+    mask = screened['strategy'].to_numpy() == strategy
+    values = [screened[c].to_numpy()[mask].tolist() for c in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
 def analyze_bonds(
     bonds_data: pd.DataFrame,
     strategy: Strategy,
@@ -50,79 +198,57 @@ def analyze_bonds(
     Returns:
         List[Dict]: 投资建议列表
     """
-    # 风险偏好系数
-    risk_factors = {
-        'conservative': 0.7,
-        'moderate': 1.0,
-        'aggressive': 1.3
-    }
-    risk_factor = risk_factors.get(risk_preference, 1.0)
-    
-    # 基础筛选条件
-    base_conditions = {
-        'min_duration': 1.0 * risk_factor,
-        'min_size': 1.0,
-        'min_price': 90.0,
-        'max_premium': 30.0 * risk_factor
-    }
-    
-    # 基础筛选
-    filtered = bonds_data[
-        (bonds_data['duration'] >= base_conditions['min_duration']) &
-        (bonds_data['remain_size'] >= base_conditions['min_size']) &
-        (bonds_data['price'] >= base_conditions['min_price']) &
-        (bonds_data['premium_rate'] <= base_conditions['max_premium']) &
-        (bonds_data['credit_rating'].isin(['AAA', 'AA+', 'AA']))
-    ].copy()
-    
-    if len(filtered) == 0:
-        logger.warning("没有符合条件的可转债")
-        return []
-    
-    recommendations = []
-    
-    if strategy == Strategy.DOUBLE_LOW:
-        # 双低策略
-        filtered['score'] = 100 - (filtered['premium_rate'] + filtered['price'])
-        selected = filtered.nlargest(10, 'score')
-        for _, bond in selected.iterrows():
-            recommendations.append({
-                'code': bond['code'],
-                'strategy': strategy.value,
-                'score': bond['score'],
-                'reason': f"双低值:{bond['premium_rate']+bond['price']:.1f}"
-            })
-            
-    elif strategy == Strategy.LOW_PREMIUM:
-        # 低溢价率策略
-        filtered['score'] = 100 - filtered['premium_rate']
-        selected = filtered.nlargest(10, 'score')
-        for _, bond in selected.iterrows():
-            recommendations.append({
-                'code': bond['code'],
-                'strategy': strategy.value,
-                'score': bond['score'],
-                'reason': f"溢价率:{bond['premium_rate']:.1f}%"
-            })
-            
-    elif strategy == Strategy.PAR_VALUE:
-        # 平价策略
-        filtered['price_diff'] = abs(
-            filtered['price'] - 
-            filtered['stock_price'] * 100 / filtered['convert_price']
-        )
-        filtered['score'] = 100 - filtered['price_diff'] * 10
-        selected = filtered[filtered['price_diff'] <= 3].nlargest(10, 'score')
-        for _, bond in selected.iterrows():
-            recommendations.append({
-                'code': bond['code'],
-                'strategy': strategy.value,
-                'score': bond['score'],
-                'reason': f"价差:{bond['price_diff']:.1f}"
-            })
-            
+    screened = screen_bonds(bonds_data, risk_preference)
+    recommendations = _to_records(screened, strategy.value, SCREEN_COLUMNS)
     return sorted(recommendations, key=lambda x: x['score'], reverse=True)
 
+def _classify(
+    quantiles: Dict[str, float],
+    buy_threshold: float,
+    sell_threshold: float,
+) -> Dict[str, List[str]]:
+    """溢价率分位数 -> 按信号分类的转债代码, NaN 归为持有"""
+    signals = {'buy': [], 'sell': [], 'hold': []}
+    for code, q in quantiles.items():
+        if q <= buy_threshold:
+            signals['buy'].append(code)
+        elif q >= sell_threshold:
+            signals['sell'].append(code)
+        else:
+            signals['hold'].append(code)
+    return signals
+
+
+def latest_premium_quantiles(bonds_data: pd.DataFrame, lookback_period: int = 120) -> Dict[str, float]:
+    """
+    每只转债最新一天的溢价率在最近 lookback_period 天内的分位数
+
+    所有转债一次 groupby 计算, 只用每只转债最后 lookback_period 行, 历史不足的转债不返回
+
+    Returns:
+        Dict[str, float]: 转债代码 -> 分位数(0-1), 顺序同 bonds_data['code'].unique()
+    """
+    codes = bonds_data['code']
+    # 每行是所在转债的倒数第几行
+    pos = codes.groupby(codes, sort=False).cumcount(ascending=False)
+    window = bonds_data.loc[pos < lookback_period, ['code', 'premium_rate']]
+    window_pos = pos[pos < lookback_period]
+
+    latest = window.loc[window_pos == 0].set_index('code')['premium_rate']
+    last = window['code'].map(latest)
+    rates = window['premium_rate']
+    less = (rates < last).groupby(window['code'], sort=False).sum()
+    equal = (rates == last).groupby(window['code'], sort=False).sum()
+    has_nan = rates.isna().groupby(window['code'], sort=False).any()
+
+    quantile = (less + (equal + 1) / 2) / lookback_period
+    quantile[has_nan] = np.nan
+    # 有倒数第 lookback_period 行, 说明历史足够; 按首次出现的顺序输出
+    full = set(codes[pos == lookback_period - 1])
+    order = [c for c in codes.unique() if c in full]
+    return quantile.reindex(order).to_dict()
+
+
 def get_trade_signals(
     bonds_data: pd.DataFrame,
     lookback_period: int = 120,
@@ -132,7 +258,7 @@ def get_trade_signals(
     """获取转债交易信号
     
     Args:
-        bonds_data: 可转债历史数据
+        bonds_data: 可转债历史数据, 每只转债按日期升序
         lookback_period: 回看期限(天)
         buy_threshold: 买入阈值分位数(0-1)
         sell_threshold: 卖出阈值分位数(0-1)
@@ -140,30 +266,57 @@ def get_trade_signals(
     Returns:
         Dict[str, List[str]]: 按信号分类的转债代码列表
     """
-    signals = {'buy': [], 'sell': [], 'hold': []}
-    
-    for code in bonds_data['code'].unique():
-        bond_data = bonds_data[bonds_data['code'] == code].copy()
-        
-        if len(bond_data) < lookback_period:
-            continue
-        
-        # 计算溢价率分位数
-        premium_rates = bond_data['premium_rate'].rolling(
-            lookback_period
-        ).rank(pct=True)
-        
-        latest_quantile = premium_rates.iloc[-1]
-        
-        # 生成信号
-        if latest_quantile <= buy_threshold:
-            signals['buy'].append(code)
-        elif latest_quantile >= sell_threshold:
-            signals['sell'].append(code)
-        else:
-            signals['hold'].append(code)
-    
-    return signals
+    quantiles = latest_premium_quantiles(bonds_data, lookback_period)
+    return _classify(quantiles, buy_threshold, sell_threshold)
+
+
+@dataclass
+class SignalState:
+    """增量计算交易信号的状态: 每只转债最近 lookback_period 天溢价率的滑动排名和最新分位数"""
+    lookback_period: int = 120
+    buy_threshold: float = 0.2
+    sell_threshold: float = 0.8
+    windows: Dict[str, RollingRank] = field(default_factory=dict)
+    quantiles: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_history(
+        cls,
+        bonds_data: pd.DataFrame,
+        lookback_period: int = 120,
+        buy_threshold: float = 0.2,
+        sell_threshold: float = 0.8,
+    ) -> 'SignalState':
+        """用历史数据初始化, 每只转债只保留最后 lookback_period 天"""
+        state = cls(lookback_period, buy_threshold, sell_threshold)
+        for code, rates in bonds_data.groupby('code', sort=False)['premium_rate']:
+            state.windows[code] = RollingRank.from_history(rates.to_numpy(dtype=float), lookback_period)
+        state.quantiles = latest_premium_quantiles(bonds_data, lookback_period)
+        return state
+
+    def update(self, day_data: pd.DataFrame) -> Dict[str, List[str]]:
+        """
+        追加新的一天, 只更新当天有数据的转债, 每只转债 O(log w)
+
+        Args:
+            day_data: 新一天的数据, 至少有 code, premium_rate 列, 每只转债一行
+
+        Returns:
+            Dict[str, List[str]]: 所有转债的最新信号, 和对全部历史调用 get_trade_signals 的结果一致
+        """
+        for code, rate in zip(day_data['code'], day_data['premium_rate'].to_numpy(dtype=float)):
+            window = self.windows.get(code)
+            if window is None:
+                window = self.windows[code] = RollingRank(self.lookback_period)
+            quantile = window.push(rate)
+            if window.count == self.lookback_period:
+                self.quantiles[code] = quantile
+        return self.signals()
+
+    def signals(self) -> Dict[str, List[str]]:
+        # 按转债首次出现的顺序, 和 get_trade_signals 一致
+        quantiles = {code: self.quantiles[code] for code in self.windows if code in self.quantiles}
+        return _classify(quantiles, self.buy_threshold, self.sell_threshold)
 
 
 def build_portfolio(
@@ -183,10 +336,11 @@ def build_portfolio(
     """
     portfolio = {}
     
-    # 获取不同策略的推荐列表
-    double_low = analyze_bonds(bonds_data, Strategy.DOUBLE_LOW, risk_preference)
-    low_premium = analyze_bonds(bonds_data, Strategy.LOW_PREMIUM, risk_preference)
-    par_value = analyze_bonds(bonds_data, Strategy.PAR_VALUE, risk_preference)
+    # 获取不同策略的推荐列表, 只筛选一次
+    screened = screen_bonds(bonds_data, risk_preference)
+    double_low = _to_records(screened, Strategy.DOUBLE_LOW.value, SCREEN_COLUMNS)
+    low_premium = _to_records(screened, Strategy.LOW_PREMIUM.value, SCREEN_COLUMNS)
+    par_value = _to_records(screened, Strategy.PAR_VALUE.value, SCREEN_COLUMNS)
     
     # 根据风险偏好分配权重
     if risk_preference == 'conservative':
@@ -229,6 +383,48 @@ class BondMetrics:
     credit_rating: str        # 信用评级
     duration: float           # 久期
 
+def screen_convertible_bonds(
+    bonds_data: pd.DataFrame,
+    max_premium_rate: float = 30.0,
+    min_remain_size: float = 1.0,
+    top_n: int = 10,
+) -> pd.DataFrame:
+    """对同一批可转债一次算出双低/平价/高价格三个策略的推荐
+
+    Args:
+        bonds_data: 可转债数据DataFrame
+        max_premium_rate: 高价格策略的最大转股溢价率
+        min_remain_size: 最小剩余规模(亿)
+        top_n: 每个策略推荐数量
+
+    Returns:
+        pd.DataFrame: 列 code, strategy, score, reason
+    """
+    # 基础筛选
+    base = (
+        (bonds_data['remain_size'] >= min_remain_size) &
+        (bonds_data['credit_rating'].isin(RATINGS))
+    )
+    cols = _columns(bonds_data, ['price', 'premium_rate'])
+    cols['value_score'] = 100 - cols['value_diff'] * 10
+    base = base.to_numpy()
+
+    parts = [
+        # 双低策略
+        _select(cols, base, 'double_low', 'double_low_score', ConvertibleBondStrategy.DOUBLE_LOW.value,
+                '双低值:{:.2f}, 溢价率:{:.2f}%', ['double_low', 'premium_rate'], top_n, largest=False),
+        # 平价策略
+        _select(cols, base & (cols['value_diff'] <= 3), 'value_diff', 'value_score',
+                ConvertibleBondStrategy.PAR_VALUE.value,
+                '转股价值差:{:.2f}, 价格:{:.2f}', ['value_diff', 'price'], top_n, largest=False),
+        # 高价格策略
+        _select(cols, base & (cols['price'] >= 110) & (cols['premium_rate'] <= max_premium_rate),
+                'high_price_score', 'high_price_score', ConvertibleBondStrategy.HIGH_PRICE.value,
+                '股性强,动量:{:.2f},价格:{:.2f}', ['high_price_score', 'price'], top_n),
+    ]
+    return pd.concat(parts, ignore_index=True)
+
+
 def analyze_convertible_bonds(
     bonds_data: pd.DataFrame,
     strategy: ConvertibleBondStrategy,
@@ -246,54 +442,8 @@ def analyze_convertible_bonds(
     Returns:
         List[Dict]: 投资建议列表
     """
-    recommendations = []
-    
-    # 基础筛选
-    bonds_data = bonds_data[
-        (bonds_data['remain_size'] >= min_remain_size) &
-        (bonds_data['credit_rating'].isin(['AAA', 'AA+', 'AA']))
-    ]
-    
-    if strategy == ConvertibleBondStrategy.DOUBLE_LOW:
-        # 双低策略实现
-        bonds_data['double_low'] = bonds_data['premium_rate'] + bonds_data['price']
-        selected = bonds_data.nsmallest(10, 'double_low')
-        
-        for _, bond in selected.iterrows():
-            recommendations.append({
-                'code': bond['code'],
-                'reason': f"双低值:{bond['double_low']:.2f}, 溢价率:{bond['premium_rate']:.2f}%",
-                'score': 100 - bond['double_low']
-            })
-            
-    elif strategy == ConvertibleBondStrategy.PAR_VALUE:
-        # 平价策略实现
-        bonds_data['price_diff'] = abs(bonds_data['price'] - bonds_data['convert_value'])
-        selected = bonds_data[bonds_data['price_diff'] <= 3].nsmallest(10, 'price_diff')
-        
-        for _, bond in selected.iterrows():
-            recommendations.append({
-                'code': bond['code'],
-                'reason': f"转股价值差:{bond['price_diff']:.2f}, 价格:{bond['price']:.2f}",
-                'score': 100 - bond['price_diff'] * 10
-            })
-            
-    elif strategy == ConvertibleBondStrategy.HIGH_PRICE:
-        # 高价格策略实现
-        conditions = (
-            (bonds_data['price'] >= 110) &
-            (bonds_data['premium_rate'] <= max_premium_rate)
-        )
-        selected = bonds_data[conditions].nlargest(10, 'stock_momentum')
-        
-        for _, bond in selected.iterrows():
-            recommendations.append({
-                'code': bond['code'],
-                'reason': f"股性强,动量:{bond['stock_momentum']:.2f},价格:{bond['price']:.2f}",
-                'score': bond['stock_momentum']
-            })
-    
-    return recommendations
+    screened = screen_convertible_bonds(bonds_data, max_premium_rate, min_remain_size)
+    return _to_records(screened, strategy.value, ['code', 'reason', 'score'])
 
 def get_convertible_bond_portfolio(
     bonds_data: pd.DataFrame,
@@ -312,18 +462,16 @@ def get_convertible_bond_portfolio(
     """
     portfolio = {}
     
+    def pick(screened: pd.DataFrame, strategy: ConvertibleBondStrategy) -> List[Dict]:
+        return _to_records(screened, strategy.value, ['code', 'reason', 'score'])
+
     # 根据风险偏好选择策略组合
+    # max_premium_rate 只影响高价格策略, 每种风险偏好只需要筛选一次
     if risk_preference == 'conservative':
         # 保守型: 80%双低 + 20%平价
-        double_low = analyze_convertible_bonds(
-            bonds_data, 
-            ConvertibleBondStrategy.DOUBLE_LOW,
-            max_premium_rate=20
-        )
-        par_value = analyze_convertible_bonds(
-            bonds_data,
-            ConvertibleBondStrategy.PAR_VALUE
-        )
+        screened = screen_convertible_bonds(bonds_data, max_premium_rate=20)
+        double_low = pick(screened, ConvertibleBondStrategy.DOUBLE_LOW)
+        par_value = pick(screened, ConvertibleBondStrategy.PAR_VALUE)
         
         # 分配权重
         for bond in double_low[:8]:
@@ -339,22 +487,17 @@ def get_convertible_bond_portfolio(
             (ConvertibleBondStrategy.HIGH_PRICE, 2, 0.1)
         ]
         
+        screened = screen_convertible_bonds(bonds_data)
         for strategy, count, weight in strategies:
-            bonds = analyze_convertible_bonds(bonds_data, strategy)
+            bonds = pick(screened, strategy)
             for bond in bonds[:count]:
                 portfolio[bond['code']] = weight
                 
     else:  # aggressive
         # 激进型: 30%平价 + 70%高价格
-        par_value = analyze_convertible_bonds(
-            bonds_data,
-            ConvertibleBondStrategy.PAR_VALUE
-        )
-        high_price = analyze_convertible_bonds(
-            bonds_data,
-            ConvertibleBondStrategy.HIGH_PRICE,
-            max_premium_rate=50
-        )
+        screened = screen_convertible_bonds(bonds_data, max_premium_rate=50)
+        par_value = pick(screened, ConvertibleBondStrategy.PAR_VALUE)
+        high_price = pick(screened, ConvertibleBondStrategy.HIGH_PRICE)
         
         for bond in par_value[:3]:
             portfolio[bond['code']] = 0.1
@@ -363,6 +506,125 @@ def get_convertible_bond_portfolio(
             
     return portfolio
 
+def _weights(holdings: Union[pd.DataFrame, pd.Series, Dict[str, float]], key: str, weight_col: Optional[str]) -> pd.Series:
+    """持仓 -> 代码为索引的权重; DataFrame 没有权重列时等权"""
+    if isinstance(holdings, dict):
+        return pd.Series(holdings, dtype=float)
+    if isinstance(holdings, pd.Series):
+        return holdings.astype(float)
+    codes = holdings[key].to_numpy()
+    if weight_col is None:
+        weights = np.full(len(codes), 1 / len(codes) if len(codes) else 0.0)
+    else:
+        weights = holdings[weight_col].to_numpy(dtype=float)
+    return pd.Series(weights, index=codes, dtype=float)
+
+
+def diff_weights(old, new, key: str = 'code', weight_col: Optional[str] = None) -> pd.DataFrame:
+    """
+    两次持仓的权重差, 按代码对齐一次完成
+
+    Args:
+        old, new: 持仓, {代码: 权重} / 代码为索引的权重 Series / 含 key 列的 DataFrame(没有 weight_col 时等权)
+
+    Returns:
+        pd.DataFrame: index 为代码, 列 weight_old, weight_new, delta, status(enter|exit|hold)
+    """
+    old_w, new_w = _weights(old, key, weight_col), _weights(new, key, weight_col)
+    table = pd.concat([old_w, new_w], axis=1, keys=['weight_old', 'weight_new'])
+    in_old, in_new = table['weight_old'].notna().to_numpy(), table['weight_new'].notna().to_numpy()
+    table = table.fillna(0.0)
+    table['delta'] = table['weight_new'] - table['weight_old']
+    table['status'] = np.select([in_new & ~in_old, in_old & ~in_new], ['enter', 'exit'], 'hold')
+    return table
+
+
+@dataclass
+class RebalanceDiff:
+    """两个快照之间的调仓结果: 一次 outer merge, 买入/卖出/持有三张表共用"""
+    merged: pd.DataFrame     # new 和 old 按 key outer merge, old 的列加 _old 后缀, 另有 status 和权重列
+    key: str = '代码'
+
+    STATUS_COLUMNS = ['status', 'weight_old', 'weight_new', 'delta']
+
+    def _rows(self, status: str, with_weights: bool = False) -> pd.DataFrame:
+        rows = self.merged[self.merged['status'] == status]
+        return rows if with_weights else rows.drop(columns=self.STATUS_COLUMNS)
+
+    @property
+    def entering(self) -> pd.DataFrame:
+        """需要买入: 新快照有, 旧快照没有"""
+        return self._rows('enter')
+
+    @property
+    def exiting(self) -> pd.DataFrame:
+        """需要卖出: 旧快照有, 新快照没有"""
+        return self._rows('exit')
+
+    @property
+    def continuing(self) -> pd.DataFrame:
+        """继续持有"""
+        return self._rows('hold')
+
+    @property
+    def turnover(self) -> float:
+        """单边换手率"""
+        return float(self.merged['delta'].abs().sum() / 2)
+
+
+def rebalance_diff(
+    new: pd.DataFrame,
+    old: pd.DataFrame,
+    key: str = '代码',
+    weight_col: Optional[str] = None,
+) -> RebalanceDiff:
+    """
+    新旧两次筛选结果的调仓差异
+
+    Args:
+        new, old: 筛选结果, 含 key 列
+        weight_col: 权重列, 默认等权
+    """
+    weights = diff_weights(old, new, key, weight_col)
+    merged = new.merge(old, on=key, how='outer', suffixes=('', '_old'), sort=False)
+    merged = merged.join(weights[RebalanceDiff.STATUS_COLUMNS], on=key)
+    return RebalanceDiff(merged, key)
+
+
+def holdings_turnover(
+    holdings: pd.DataFrame,
+    date_col: str = 'date',
+    key: str = '代码',
+    weight_col: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    多个日期的持仓依次比较, 一次 pivot 算出每期的买入/卖出/持有数量和换手率
+
+    Args:
+        holdings: 长表, 每行一个 (日期, 代码) 持仓
+        weight_col: 权重列, 默认每个日期内等权
+
+    Returns:
+        pd.DataFrame: index 为日期, 列 entering, exiting, continuing, turnover; 第一期和空仓比较
+    """
+    if weight_col is None:
+        weights = 1 / holdings.groupby(date_col)[key].transform('size')
+    else:
+        weights = holdings[weight_col]
+    matrix = pd.DataFrame({date_col: holdings[date_col], key: holdings[key], 'w': weights}) \
+        .pivot_table(index=date_col, columns=key, values='w', aggfunc='sum', fill_value=0.0) \
+        .sort_index()
+    cur = matrix.to_numpy()
+    prev = np.vstack([np.zeros((1, cur.shape[1])), cur[:-1]])
+    held, was_held = cur > 0, prev > 0
+    return pd.DataFrame({
+        'entering': (held & ~was_held).sum(axis=1),
+        'exiting': (~held & was_held).sum(axis=1),
+        'continuing': (held & was_held).sum(axis=1),
+        'turnover': np.abs(cur - prev).sum(axis=1) / 2,
+    }, index=matrix.index)
+
+
 def get_rebalance_suggestions(
     current_portfolio: Dict[str, float],
     target_portfolio: Dict[str, float],
@@ -378,19 +640,109 @@ def get_rebalance_suggestions(
     Returns:
         Dict[str, float]: 调仓建议(正数表示买入,负数表示卖出)
     """
-    suggestions = {}
-    
     # 计算需要调整的仓位
-    for code in set(current_portfolio) | set(target_portfolio):
-        current_weight = current_portfolio.get(code, 0)
-        target_weight = target_portfolio.get(code, 0)
-        diff = target_weight - current_weight
-        
-        if abs(diff) >= threshold:
-            suggestions[code] = diff
-            
-    return suggestions
+    delta = diff_weights(current_portfolio, target_portfolio)['delta']
+    return delta[delta.abs() >= threshold].to_dict()
+
+
+
+# ---------- 集思录快照筛选(中文列名, datas/raw/bonds/conv_*.csv) ----------
+
+# 双低平均值上限 -> (操作建议, 仓位比例)
+POSITION_LEVELS = [
+    (150, '100%仓位', 1.0),
+    (155, '60%仓位', 0.6),
+    (160, '30%仓位', 0.3),
+    (165, '正常交易', 0.3),
+    (170, '减仓', 0.1),
+    (float('inf'), '清仓', 0.0),
+]
+
+
+def position_level(avg_low: float) -> Tuple[str, float]:
+    """双低平均值 -> (操作建议, 仓位比例)"""
+    for upper, res, ratio in POSITION_LEVELS:
+        if avg_low < upper:
+            return res, ratio
+    return POSITION_LEVELS[-1][1:]
+
+
+def judge_bonds(df: pd.DataFrame):
+    avg_low = df['双低'].mean()
+    msg1 = f"转股溢价率平均值： {df['转股溢价率'].mean():.2f}, 双低平均值： {avg_low:.2f}"
+    msg2 = f"转股溢价率中位数： {df['转股溢价率'].median():.2f}, 双低中位数： {df['双低'].median():.2f}"
+    logger.info(msg1)
+    logger.info(msg2)
+
+    res, _ = position_level(avg_low)
+    logger.info(res)
+    return msg1, msg2, avg_low, res
+
 
+def common_logic(df: pd.DataFrame, as_of: Optional[datetime] = None):
+    """
+    Args:
+        as_of: 快照日期, 默认今天; 回测时传快照当天
+    """
+    as_of = as_of or datetime.now()
+
+    # 去掉未来1年到期的
+    df['到期时间'] = pd.to_datetime(df['到期时间'])
+    half_year = as_of + timedelta(days=365)
+    df = df[df['到期时间'] > half_year]
+
+    # ST 有退市风险
+    df = df[~df['正股名称'].str.contains(r'ST|\*')]
+
+    # TODO: 不买银行的
+    return df
+    # df.sort_values(by=['现价', '转股价值', '转股溢价率'], ascending=[True, False, True])
+
+
+def get_low_premium_rate_and_double_low(df: pd.DataFrame, num: int = 30, as_of: Optional[datetime] = None):
+    """
+    低溢价率, 双低, 股性
+    """
+    df = common_logic(df, as_of)
+    df = df[df['转股溢价率'] < 20]
+    df = df.sort_values(by=['转股溢价率'], ascending=[True]).head(50)
+    
+    df = df[df['双低'] < 125]
+    # df = df[df['现价'] < 110]
+    df = df.sort_values(by=['双低'], ascending=[True]).head(num)
+
+    return df
+
+
+def get_double_low_and_low_premium_rate(df: pd.DataFrame, num: int = 30, as_of: Optional[datetime] = None):
+    """
+    双低, 低溢价率, 债性
+    """
+    df = common_logic(df, as_of)
+    
+    df = df[df['双低'] < 125]
+    df = df[df['现价'] < 110]
+    df = df[df['转股溢价率'] < 20]
+    df = df.sort_values(by=['双低'], ascending=[True]).head(50)
+    
+    df = df.sort_values(by=['转股溢价率'], ascending=[True]).head(num)
+
+    return df
+
+
+def get_logic_func(avg_low: float, switch_avg_low: float = 160):
+    if avg_low < switch_avg_low:
+        logic_func = get_low_premium_rate_and_double_low
+    else:
+        logic_func = get_double_low_and_low_premium_rate
+    return logic_func
+
+
+def get_unlisted_bonds(df: pd.DataFrame) -> list:
+    """
+    获取未上市债券
+    """
+    return df[df['上市日期'].isna()]['债券代码'].to_list()
 
 
 # # 1. 基本分析
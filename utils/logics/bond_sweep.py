@@ -0,0 +1,189 @@
+"""
+可转债筛选参数扫描, 多进程
+
+bond 页面的筛选阈值(双低 < 125, 转股溢价率 < 20, 现价 < 110, 前 50/30)和 judge_bonds 的仓位档位
+(150/155/160/165/170)都是手工定的. 这里在所有历史快照上回测网格/随机参数, 输出排名表.
+
+- 快照对齐后的矩阵(SnapshotPanel)写成一个不压缩的 Arrow IPC 文件
+- 每个子进程启动时 memory-map 这个文件, 矩阵零拷贝映射成 numpy, 多个进程共享同一份页缓存, 不 pickle 数据
+- 参数按进程数均匀分块提交, 每块只传参数和结果, 进程间通信量和快照大小无关
+
+python -m utils.logics.bond_sweep                    网格扫描
+python -m utils.logics.bond_sweep --random 5000      随机搜索 5000 组
+python -m utils.logics.bond_sweep --scaling          1, 2, 4... 个进程的耗时
+"""
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from loguru import logger
+
+from utils.logics.bond_backtest import (
+    DEFAULT_GRID,
+    BacktestParams,
+    SnapshotPanel,
+    build_panel,
+    load_snapshots,
+    param_grid,
+    run_backtest,
+)
+
+PANEL_PATH = Path(os.getenv('CACHE_DIR', 'datas/cache')) / 'bond_panel.arrow'
+
+# 矩阵字段, 按 日期 x 转债 展平成一列
+_MATRICES = ['price', 'premium', 'double_low', 'eligible', 'next_return']
+
+# 随机搜索的取值范围: (最小值, 最大值), int 范围取整数
+RANDOM_SPACE = {
+    'premium_max': (5.0, 40.0),
+    'double_low_max': (110.0, 145.0),
+    'price_max': (100.0, 130.0),
+    'pre_select': (10, 80),
+    'num': (5, 40),
+    'switch_avg_low': (140.0, 200.0),
+    'position_shift': (-10.0, 50.0),
+}
+
+
+def write_panel(panel: SnapshotPanel, path: Path = PANEL_PATH) -> Path:
+    """矩阵写成 Arrow IPC 文件, 不压缩才能 memory-map 零拷贝读取"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    columns = {name: getattr(panel, name).ravel() for name in _MATRICES}
+    # bool 在 Arrow 里按位存储, 不能零拷贝, 存成 uint8
+    columns['eligible'] = columns['eligible'].astype(np.uint8)
+    meta = {
+        'dates': [d.isoformat() for d in panel.dates],
+        'codes': panel.codes.tolist(),
+        'avg_low': panel.avg_low.tolist(),
+    }
+    table = pa.table(columns).replace_schema_metadata({'panel': json.dumps(meta)})
+    tmp = path.with_suffix('.tmp')
+    with pa.OSFile(str(tmp), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    return path
+
+
+def read_panel(path: Path = PANEL_PATH) -> SnapshotPanel:
+    """memory-map Arrow 文件, 矩阵直接映射成只读 numpy 数组"""
+    table = pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+    meta = json.loads(table.schema.metadata[b'panel'])
+    shape = (len(meta['dates']), len(meta['codes']))
+    arrays = {
+        name: table.column(name).chunk(0).to_numpy(zero_copy_only=True).reshape(shape)
+        for name in _MATRICES
+    }
+    arrays['eligible'] = arrays['eligible'].view(bool)
+    return SnapshotPanel(
+        dates=pd.DatetimeIndex(meta['dates']),
+        codes=np.array(meta['codes']),
+        avg_low=np.array(meta['avg_low']),
+        **arrays,
+    )
+
+
+# 子进程里的快照矩阵, 进程启动时映射一次
+_panel: Optional[SnapshotPanel] = None
+
+
+def _init_worker(path: str):
+    global _panel
+    _panel = read_panel(Path(path))
+
+
+def _run_chunk(chunk: List[BacktestParams]) -> List[Dict]:
+    return [{**asdict(p), **run_backtest(_panel, p).stats()} for p in chunk]
+
+
+def random_grid(n: int, seed: int = 0, space: Dict = RANDOM_SPACE) -> List[BacktestParams]:
+    """在 space 范围内随机取 n 组参数"""
+    rng = random.Random(seed)
+    grid = []
+    for _ in range(n):
+        values = {
+            name: rng.randint(lo, hi) if isinstance(lo, int) else round(rng.uniform(lo, hi), 1)
+            for name, (lo, hi) in space.items()
+        }
+        grid.append(BacktestParams(**values))
+    return grid
+
+
+def run_sweep(
+    grid: Sequence[BacktestParams],
+    workers: Optional[int] = None,
+    panel_path: Path = PANEL_PATH,
+    sort_by: str = 'total_return',
+) -> pd.DataFrame:
+    """
+    多进程回测所有参数
+
+    Args:
+        grid: 参数列表, 见 param_grid / random_grid
+        workers: 进程数, 默认 CPU 核数
+        panel_path: write_panel 写出的快照矩阵
+        sort_by: 排名指标, 从高到低
+
+    Returns:
+        pd.DataFrame: 参数和指标, 第一列为排名
+    """
+    workers = workers or os.cpu_count() or 1
+    # 每个进程分几块, 块太小进程间通信多, 块太大最后几块负载不均
+    n_chunks = min(len(grid), workers * 4)
+    chunks = [list(grid[i::n_chunks]) for i in range(n_chunks)]
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(str(panel_path),)) as pool:
+        rows = [row for part in pool.map(_run_chunk, chunks) for row in part]
+    table = pd.DataFrame(rows).sort_values(sort_by, ascending=False, ignore_index=True)
+    table.insert(0, 'rank', np.arange(1, len(table) + 1))
+    return table
+
+
+def prepare_panel(path: Path = PANEL_PATH) -> Path:
+    """读取所有快照, 对齐后写成 Arrow 文件"""
+    start = time.perf_counter()
+    panel = build_panel(load_snapshots())
+    write_panel(panel, path)
+    logger.info(
+        f"{len(panel.dates)} 个快照 x {len(panel.codes)} 只转债写入 {path}, "
+        f"{path.stat().st_size / 1e6:.1f}MB, 耗时 {time.perf_counter() - start:.2f}s"
+    )
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--random', type=int, default=0, help='随机搜索的参数组数, 0 为网格扫描')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--sort-by', default='total_return')
+    parser.add_argument('--scaling', action='store_true', help='比较不同进程数的耗时')
+    args = parser.parse_args()
+
+    path = prepare_panel()
+    grid = random_grid(args.random) if args.random else param_grid(**DEFAULT_GRID)
+
+    if args.scaling:
+        max_workers = args.workers or os.cpu_count() or 1
+        counts = sorted({1, *[2 ** i for i in range(1, max_workers.bit_length()) if 2 ** i <= max_workers], max_workers})
+        base = None
+        for n in counts:
+            start = time.perf_counter()
+            run_sweep(grid, n, path, args.sort_by)
+            elapsed = time.perf_counter() - start
+            base = base or elapsed
+            logger.info(f"{n:>3} 个进程: {len(grid)} 组参数 {elapsed:.2f}s, 加速 {base / elapsed:.2f}x")
+    else:
+        start = time.perf_counter()
+        table = run_sweep(grid, args.workers, path, args.sort_by)
+        logger.info(f"{len(grid)} 组参数, 耗时 {time.perf_counter() - start:.2f}s")
+        with pd.option_context('display.max_columns', None, 'display.width', 200):
+            logger.info(f"\n{table.head(args.top)}")
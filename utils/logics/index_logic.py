@@ -16,6 +16,8 @@ import pandas as pd
 import numpy as np
 from loguru import logger
 
+from utils.logics.rolling_rank import RollingRank
+
 
 class IndexStrategy(Enum):
     """指数投资策略类型"""
@@ -91,6 +93,37 @@ def calculate_metrics(
         raise
 
 
+class ValuationPercentiles:
+    """
+    逐日更新市盈率/市净率分位数, 不用每天对全部历史重新 rank
+
+    Args:
+        index_data: 指数历史数据, 含 pe_ttm / pb 列
+        window: 分位数窗口, None 为全部历史, 和 calculate_metrics 一致
+    """
+
+    def __init__(self, index_data: pd.DataFrame, window: Optional[int] = None):
+        self.rankers = {
+            col: RollingRank.from_history(index_data[col].to_numpy(dtype=float), window)
+            for col in ('pe_ttm', 'pb') if col in index_data.columns
+        }
+
+    @property
+    def pe_percentile(self) -> Optional[float]:
+        return self.rankers['pe_ttm'].last() if 'pe_ttm' in self.rankers else None
+
+    @property
+    def pb_percentile(self) -> Optional[float]:
+        return self.rankers['pb'].last() if 'pb' in self.rankers else None
+
+    def update(self, pe_ttm: float = np.nan, pb: float = np.nan) -> Tuple[Optional[float], Optional[float]]:
+        """追加新的一天, 返回 (市盈率分位数, 市净率分位数)"""
+        for col, value in (('pe_ttm', pe_ttm), ('pb', pb)):
+            if col in self.rankers:
+                self.rankers[col].push(value)
+        return self.pe_percentile, self.pb_percentile
+
+
 def analyze_valuation(
     metrics: IndexMetrics,
     pe_threshold: float = 0.3,
@@ -266,10 +299,11 @@ def get_rotation_signal(
     
     
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 import pandas as pd
+import numpy as np
 from loguru import logger
 
 class IndexStrategy(Enum):
@@ -325,6 +359,59 @@ def analyze_valuation(
     
     return sorted(recommendations, key=lambda x: x['score'], reverse=True)
 
+def _last_window_means(codes: np.ndarray, n_codes: int, pos: np.ndarray,
+                       values: np.ndarray, window: int) -> np.ndarray:
+    """每个代码最后 window 个值的均值, 同 rolling(window).mean() 的最后一行"""
+    mask = pos < window
+    sums = np.bincount(codes[mask], weights=values[mask], minlength=n_codes)
+    counts = np.bincount(codes[mask], minlength=n_codes)
+    # 历史不足 window 的为 NaN; 窗口内有 NaN 时 sums 也是 NaN
+    return np.where(counts == window, sums / window, np.nan)
+
+
+def trend_scores(
+    index_data: pd.DataFrame,
+    ma_pairs: Tuple[Tuple[int, int], ...] = ((20, 60),),
+    price_col: str = 'close',
+) -> pd.DataFrame:
+    """多指数、多组均线的趋势打分, 一次算完
+
+    每个代码只需要最后一天的均线, 不算整条 rolling: 按代码分组后取最后 n 行求和.
+
+    Args:
+        index_data: 多个指数的历史数据, 含 code 和 price_col 列, 每个代码按日期升序
+        ma_pairs: (短期, 长期) 均线周期, 可以多组
+        price_col: 价格列
+
+    Returns:
+        pd.DataFrame: index 为代码(按首次出现的顺序), 列:
+            ma_{n}                每个用到的均线周期的最新均线
+            strength_{s}_{l}      (短期均线 - 长期均线) / 长期均线
+            signal_{s}_{l}        buy | sell | hold, 均线缺失或相等为 hold
+            score                 各组均线信号的平均, buy 为 1, sell 为 -1, hold 为 0
+    """
+    codes, uniques = pd.factorize(index_data['code'], sort=False)
+    pos = index_data.groupby(codes, sort=False).cumcount(ascending=False).to_numpy()
+    values = index_data[price_col].to_numpy(dtype=float)
+
+    result = pd.DataFrame(index=pd.Index(uniques, name='code'))
+    for window in sorted({w for pair in ma_pairs for w in pair}):
+        result[f'ma_{window}'] = _last_window_means(codes, len(uniques), pos, values, window)
+
+    votes = []
+    for ma_short, ma_long in ma_pairs:
+        short, long = result[f'ma_{ma_short}'], result[f'ma_{ma_long}']
+        diff = short - long
+        # 求和的顺序和 rolling 不同, 均线相等时可能差最后一位, 按相等处理
+        flat = diff.abs() <= 1e-12 * long.abs()
+        vote = np.where(flat, 0, np.sign(diff.fillna(0)))
+        result[f'strength_{ma_short}_{ma_long}'] = diff / long
+        result[f'signal_{ma_short}_{ma_long}'] = np.select([vote > 0, vote < 0], ['buy', 'sell'], 'hold')
+        votes.append(vote)
+    result['score'] = np.mean(votes, axis=0)
+    return result
+
+
 def analyze_trend(
     index_data: pd.DataFrame,
     ma_short: int = 20,
@@ -340,25 +427,8 @@ def analyze_trend(
     Returns:
         Dict[str, str]: 交易信号
     """
-    signals = {}
-    
-    for code in index_data['code'].unique():
-        df = index_data[index_data['code'] == code].copy()
-        
-        # 计算均线
-        df['ma_short'] = df['close'].rolling(ma_short).mean()
-        df['ma_long'] = df['close'].rolling(ma_long).mean()
-        
-        # 判断趋势
-        latest = df.iloc[-1]
-        if latest['ma_short'] > latest['ma_long']:
-            signals[code] = 'buy'
-        elif latest['ma_short'] < latest['ma_long']:
-            signals[code] = 'sell'
-        else:
-            signals[code] = 'hold'
-            
-    return signals
+    scores = trend_scores(index_data, ((ma_short, ma_long),))
+    return scores[f'signal_{ma_short}_{ma_long}'].to_dict()
 
 def analyze_rotation(
     index_data: pd.DataFrame,
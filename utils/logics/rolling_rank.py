@@ -0,0 +1,97 @@
+"""
+滑动窗口百分位排名
+
+pandas 的 rolling(w).rank(pct=True) 每个窗口都重新排序, 逐日更新时要把整个窗口再算一遍.
+RollingRank 维护窗口内的有序数组, 每来一个新值:
+- 二分查找插入新值, 删除窗口外的旧值
+- 二分查找新值的排名
+窗口只有几百个值, 有序数组的插入/删除是一次 memmove, 比树结构更快.
+
+语义和 pandas 一致: 并列取平均排名, NaN 不参与排名, 窗口内有效值少于 min_periods 时为 NaN.
+"""
+import math
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+
+class RollingRank:
+    """
+    滑动窗口百分位排名
+
+    Args:
+        window: 窗口长度, None 为扩展窗口(全部历史), 同 Series.rank(pct=True)
+        min_periods: 窗口内最少有效值个数, 默认等于 window, 扩展窗口默认 1
+    """
+
+    def __init__(self, window: Optional[int] = None, min_periods: Optional[int] = None):
+        self.window = window
+        if min_periods is None:
+            min_periods = window if window is not None else 1
+        self.min_periods = min_periods
+        self._values = deque()       # 按时间顺序, 含 NaN
+        self._sorted: List[float] = []   # 窗口内有效值, 升序
+
+    def __len__(self) -> int:
+        """窗口内有效值个数"""
+        return len(self._sorted)
+
+    @property
+    def count(self) -> int:
+        """窗口内值的个数, 含 NaN"""
+        return len(self._values)
+
+    def push(self, value: float) -> float:
+        """
+        追加一个值, 返回它在窗口内的百分位排名(0-1]
+        """
+        value = float(value)
+        self._values.append(value)
+        if not math.isnan(value):
+            insort(self._sorted, value)
+        if self.window is not None and len(self._values) > self.window:
+            old = self._values.popleft()
+            if not math.isnan(old):
+                del self._sorted[bisect_left(self._sorted, old)]
+        return self.last()
+
+    def rank(self, value: float) -> float:
+        """value 在当前窗口内的百分位排名(value 已在窗口内), 同 rank(pct=True, method='average')"""
+        if math.isnan(value) or len(self._sorted) < self.min_periods:
+            return np.nan
+        lo = bisect_left(self._sorted, value)
+        hi = bisect_right(self._sorted, value)
+        return (lo + (hi - lo + 1) / 2) / len(self._sorted)
+
+    def last(self) -> float:
+        """窗口最后一个值的百分位排名"""
+        if not self._values:
+            return np.nan
+        return self.rank(self._values[-1])
+
+    def extend(self, values: Iterable[float]) -> np.ndarray:
+        """依次追加, 返回每个值的百分位排名, 同 rolling(window).rank(pct=True)"""
+        return np.array([self.push(v) for v in values], dtype=float)
+
+    @classmethod
+    def from_history(
+        cls,
+        values: Iterable[float],
+        window: Optional[int] = None,
+        min_periods: Optional[int] = None,
+    ) -> 'RollingRank':
+        """用历史数据初始化, 只保留最后 window 个值"""
+        roller = cls(window, min_periods)
+        values = list(values)
+        tail = values if window is None else values[-window:]
+        roller._values.extend(float(v) for v in tail)
+        roller._sorted = sorted(v for v in roller._values if not math.isnan(v))
+        return roller
+
+
+def rolling_rank_pct(values: Iterable[float], window: Optional[int] = None,
+                     min_periods: Optional[int] = None) -> np.ndarray:
+    """整个序列的滑动百分位排名, 同 pd.Series(values).rolling(window).rank(pct=True)"""
+    return RollingRank(window, min_periods).extend(values)
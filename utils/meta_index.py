@@ -0,0 +1,110 @@
+"""
+数据文件元数据索引
+
+为目录下的每个历史数据文件记录: 最早/最晚日期, 行数, 日期集合指纹, mtime,
+以及日期集合本身(按天的位图, 十六进制字符串), 保存在目录下的 _meta.json.
+
+写文件后调用 update_meta 更新; 计算多个文件的共同起始日期时只用元数据, 不用读文件.
+mtime 对不上的条目视为过期, 会重新读取该文件的日期列.
+"""
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from utils.storage import read_table, resolve
+
+META_FILE = '_meta.json'
+
+_lock = threading.Lock()
+_cache: Dict[Path, dict] = {}  # 目录 -> 元数据
+
+
+def _meta_path(path) -> Path:
+    return Path(path).parent / META_FILE
+
+
+def _load(directory: Path) -> dict:
+    if directory not in _cache:
+        meta_file = directory / META_FILE
+        _cache[directory] = json.loads(meta_file.read_text(encoding='utf-8')) if meta_file.exists() else {}
+    return _cache[directory]
+
+
+def _save(directory: Path):
+    meta_file = directory / META_FILE
+    meta_file.write_text(json.dumps(_cache[directory], ensure_ascii=False, indent=1), encoding='utf-8')
+
+
+def _to_days(dates: pd.Series) -> np.ndarray:
+    """日期 -> 1970-01-01 起的天数, 去重升序"""
+    dates = pd.to_datetime(dates, errors='coerce').dropna()
+    return np.unique(dates.values.astype('datetime64[D]').astype(np.int64))
+
+
+def build_meta(path, date_col: str = '日期') -> dict:
+    """读取文件的日期列, 生成元数据"""
+    target = resolve(path)
+    days = _to_days(read_table(path, columns=[date_col])[date_col])
+    entry = {'mtime': target.stat().st_mtime, 'rows': 0, 'min_date': None, 'max_date': None,
+             'base': None, 'bitmap': '0', 'fingerprint': ''}
+    if len(days) == 0:
+        return entry
+    base = int(days[0])
+    bits = np.zeros(int(days[-1]) - base + 1, dtype=bool)
+    bits[days - base] = True
+    bitmap = int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+    bitmap_hex = format(bitmap, 'x')
+    entry.update(
+        rows=len(days),
+        min_date=str(np.datetime64(base, 'D')),
+        max_date=str(np.datetime64(int(days[-1]), 'D')),
+        base=base,
+        bitmap=bitmap_hex,
+        fingerprint=hashlib.sha1(f"{base}:{bitmap_hex}".encode()).hexdigest(),
+    )
+    return entry
+
+
+def update_meta(path, date_col: str = '日期') -> dict:
+    """文件写入后更新它的元数据"""
+    path = Path(path)
+    entry = build_meta(path, date_col)
+    with _lock:
+        meta = _load(path.parent)
+        meta[path.stem] = entry
+        _save(path.parent)
+    return entry
+
+
+def get_meta(path, date_col: str = '日期') -> dict:
+    """获取文件元数据, 不存在或 mtime 变了则重新生成"""
+    path = Path(path)
+    with _lock:
+        entry = _load(path.parent).get(path.stem)
+    if entry is None or entry['mtime'] != resolve(path).stat().st_mtime:
+        logger.debug(f"{path.name} 元数据过期, 重新生成")
+        entry = update_meta(path, date_col)
+    return entry
+
+
+def common_start_date(paths: List, date_col: str = '日期') -> Optional[pd.Timestamp]:
+    """
+    多个文件共同拥有的最早日期(日期集合求交后的最小值), 只用元数据计算
+    """
+    entries = [get_meta(p, date_col) for p in paths]
+    if not entries or any(e['base'] is None for e in entries):
+        return None
+    origin = min(e['base'] for e in entries)
+    common = -1  # 全1
+    for e in entries:
+        common &= int(e['bitmap'], 16) << (e['base'] - origin)
+    if common <= 0:
+        return None
+    first = (common & -common).bit_length() - 1
+    return pd.Timestamp(np.datetime64(origin + first, 'D'))
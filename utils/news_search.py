@@ -0,0 +1,170 @@
+"""
+新闻全文检索
+
+新闻库(utils/news_store)上的倒排索引, 索引标题和摘要:
+- 分词: 中文索引单字和相邻两个字(bigram), 查询时多字词只用 bigram, 单字查单字; 英文单词和数字整体成词, 不区分大小写
+- 打分: BM25, 标题里的词按 TITLE_WEIGHT 倍计; 先按命中的查询词个数排序, 再按分数, 再按时间
+- 增量: 新闻库只追加, 记录已经索引过的分区文件, 每次查询前只索引新出现的文件
+
+索引在进程内, 第一次查询时从新闻库建立(500 条新闻约 0.2s), 之后每次查询几毫秒.
+
+python -m utils.news_search 英伟达    命令行查询
+"""
+import math
+import re
+import sys
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import pandas as pd
+import pyarrow.dataset as ds
+from loguru import logger
+
+from utils.news_store import STORE_DIR, read_parts
+
+# 只索引这些来源(stock_info_global_*), 财经早餐是整段汇总, 不参与检索
+SEARCH_SOURCES = ['ths', 'cls', 'sina', 'em']
+
+TITLE_WEIGHT = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r'[a-z0-9]+(?:\.[0-9]+)?|[㐀-鿿]+')
+
+
+def tokenize(text: str, unigrams: bool = False) -> List[str]:
+    """
+    中文 bigram, 英文单词和数字整体, 返回所有词(含重复)
+
+    Args:
+        unigrams: 中文再加上每个单字, 建索引时用, 这样单字查询('债')也能命中
+    """
+    tokens = []
+    for run in _TOKEN.findall(unicodedata.normalize('NFKC', str(text)).lower()):
+        if run[0] < '㐀' or len(run) == 1:
+            tokens.append(run)
+            continue
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        if unigrams:
+            tokens.extend(run)
+    return tokens
+
+
+class NewsIndex:
+    """
+    倒排索引: 词 -> [(文档序号, 加权词频)], 文档序号按加入顺序递增
+    """
+
+    def __init__(self, store: Path = STORE_DIR, sources: Optional[List[str]] = SEARCH_SOURCES):
+        self.store = Path(store)
+        self.sources = sources
+        self.postings: Dict[str, List[tuple]] = defaultdict(list)
+        self.docs: List[dict] = []
+        self.lengths: List[int] = []
+        self.total_length = 0
+        self.seen_ids: Set[int] = set()
+        self.indexed_files: Set[str] = set()
+        self._lock = threading.RLock()
+
+    def add(self, df: pd.DataFrame) -> int:
+        """加入新闻(news_store 的列), 已加入的 id 跳过, 返回新加入的条数"""
+        count = 0
+        with self._lock:
+            for row in df.itertuples(index=False):
+                if row.id in self.seen_ids or (self.sources is not None and row.source not in self.sources):
+                    continue
+                doc = len(self.docs)
+                tf = Counter(tokenize(row.summary, unigrams=True))
+                for token, n in Counter(tokenize(row.title, unigrams=True)).items():
+                    tf[token] += n * TITLE_WEIGHT
+                for token, n in tf.items():
+                    self.postings[token].append((doc, n))
+                length = sum(tf.values())
+                self.docs.append(row._asdict())
+                self.lengths.append(length)
+                self.total_length += length
+                self.seen_ids.add(row.id)
+                count += 1
+        return count
+
+    def sync(self) -> int:
+        """索引新闻库里新出现的分区文件, 返回新加入的条数"""
+        with self._lock:
+            files = [p for p in self.store.glob('date=*/part-*.parquet') if str(p) not in self.indexed_files]
+            if not files:
+                return 0
+            cond = None if self.sources is None else ds.field('source').isin(self.sources)
+            df = read_parts(files, cond).sort_values('time', kind='stable')
+            count = self.add(df)
+            self.indexed_files.update(str(p) for p in files)
+            return count
+
+    def search(self, query: str, limit: int = 20) -> pd.DataFrame:
+        """
+        按相关度返回前 limit 条
+
+        Returns:
+            pd.DataFrame: news_store 的列, 加上 matched(命中的查询词个数) 和 score
+        """
+        terms = set(tokenize(query))
+        # sync 在别的线程追加 postings / docs 时不能同时读
+        with self._lock:
+            n_docs = len(self.docs)
+            columns = [*(self.docs[0] if self.docs else []), 'matched', 'score']
+            if not terms or not n_docs:
+                return pd.DataFrame(columns=columns)
+            rows = self._rank(terms, n_docs, limit)
+        return pd.DataFrame(rows, columns=columns)
+
+    def _rank(self, terms: Set[str], n_docs: int, limit: int) -> List[dict]:
+        """BM25 打分, 返回前 limit 条, 调用方持有锁"""
+        avg_len = self.total_length / n_docs
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, int] = defaultdict(int)
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc] / avg_len)
+                scores[doc] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+                matched[doc] += 1
+        # 命中词多的优先, 同样多的按分数, 再按时间
+        top = sorted(scores, key=lambda d: (matched[d], scores[d], self.docs[d]['time']), reverse=True)[:limit]
+        return [{**self.docs[d], 'matched': matched[d], 'score': scores[d]} for d in top]
+
+
+_indexes: Dict[Path, NewsIndex] = {}
+_lock = threading.Lock()
+
+
+def get_index(store: Path = STORE_DIR) -> NewsIndex:
+    """进程内共享的索引, 每次取的时候把新写入的新闻加进去"""
+    with _lock:
+        index = _indexes.setdefault(Path(store).resolve(), NewsIndex(store))
+    added = index.sync()
+    if added:
+        logger.debug(f"新闻索引新增 {added} 条, 共 {len(index.docs)} 条")
+    return index
+
+
+def search_news(query: str, limit: int = 20, store: Path = STORE_DIR) -> pd.DataFrame:
+    """检索新闻, 见 NewsIndex.search"""
+    return get_index(store).search(query, limit)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    index = get_index()
+    logger.info(f"建立索引 {len(index.docs)} 条, {len(index.postings)} 个词, 耗时 {time.perf_counter() - start:.3f}s")
+    query = ' '.join(sys.argv[1:]) or '英伟达'
+    start = time.perf_counter()
+    res = index.search(query)
+    logger.info(f"查询 {query!r} 耗时 {(time.perf_counter() - start) * 1000:.2f}ms")
+    with pd.option_context('display.max_colwidth', 40, 'display.width', 200):
+        logger.info(f"\n{res[['source', 'time', 'title', 'matched', 'score']]}")
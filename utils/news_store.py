@@ -0,0 +1,430 @@
+"""
+新闻库
+
+get_ak_news_data 每次抓取都覆盖 datas/raw/news/ 下的 5 个 csv, 历史新闻会丢失.
+这里把新闻存成只追加的 parquet, 按发布日期分区:
+
+    datas/processed/news/news_store/date=2025-12-11/part-20251211144500123456.parquet
+    datas/processed/news/news_store/_index.bin
+    datas/processed/news/news_store/_simhash.bin
+
+- 各来源的列统一成 source, title, summary, time, link, fetched_at
+- 去重键: 来源 + 规范化后的标题(全角转半角, 小写, 去掉空白和标点), 哈希成 8 字节
+- _index.bin 是所有已入库新闻的哈希, 只追加; 进程内缓存成 set, 之后只读新追加的部分,
+  每次抓取只处理新出现的新闻, 和库的大小无关
+- 近似重复: 不同来源对同一条消息的措辞略有不同, 入库时算标题的 SimHash(字符 bigram, 64 位),
+  和前后 CLUSTER_WINDOW 内海明距离不超过 MAX_DISTANCE 的新闻归为一簇, cluster 列为簇内第一条的 id.
+  SimHash 切成 MAX_DISTANCE + 1 段, 距离不超过 MAX_DISTANCE 的两条至少有一段完全相同,
+  按段分桶, 只和同桶的比较, 不用扫描全库. _simhash.bin 保存 (simhash, cluster, time), 只追加
+- latest_news(n): 从最新的日期分区往前读, 凑够 n 条就停; collapse=True 时每簇只返回一条, 附带所有来源
+
+python -m utils.news_store ingest    把 datas/raw/news 下已有的 csv 导入新闻库(重复的跳过)
+python -m utils.news_store backfill  给加入近似重复之前写入的分区补上 simhash 和 cluster 列
+"""
+import hashlib
+import re
+import sys
+import threading
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from loguru import logger
+
+from utils.storage import list_tables, read_table
+
+STORE_DIR = Path('datas/processed/news/news_store')
+RAW_DIR = Path('datas/raw/news')
+INDEX_NAME = '_index.bin'
+
+NEWS_COLUMNS = ['source', 'title', 'summary', 'time', 'link', 'fetched_at']
+
+# 来源 -> (raw 文件名前缀, 显示名, 列名映射)
+SOURCES: Dict[str, tuple] = {
+    'ths': ('ak_stock_info_global_ths', '同花顺', {'标题': 'title', '内容': 'summary', '发布时间': 'time', '链接': 'link'}),
+    'cls': ('ak_stock_info_global_cls', '财联社', {'标题': 'title', '内容': 'summary', '发布日期': 'date', '发布时间': 'time'}),
+    'cjzc_em': ('ak_stock_info_cjzc_em', '东方财富财经早餐', {'标题': 'title', '摘要': 'summary', '发布时间': 'time', '链接': 'link'}),
+    'sina': ('ak_stock_info_global_sina', '新浪财经', {'内容': 'summary', '时间': 'time'}),
+    'em': ('ak_stock_info_global_em', '东方财富', {'标题': 'title', '摘要': 'summary', '发布时间': 'time', '链接': 'link'}),
+}
+
+NEWS_SCHEMA = pa.schema([
+    ('id', pa.uint64()),
+    ('source', pa.string()),
+    ('title', pa.string()),
+    ('summary', pa.string()),
+    ('time', pa.timestamp('ns')),
+    ('link', pa.string()),
+    ('fetched_at', pa.timestamp('ns')),
+    ('simhash', pa.uint64()),
+    ('cluster', pa.uint64()),
+])
+
+SIMHASH_NAME = '_simhash.bin'
+# 海明距离不超过 MAX_DISTANCE 且发布时间相差不超过 CLUSTER_WINDOW 的算同一条新闻
+MAX_DISTANCE = 5
+CLUSTER_WINDOW = pd.Timedelta(days=1)
+# 64 位切成 MAX_DISTANCE + 1 段: (偏移, 掩码)
+_BANDS = [(off, (1 << width) - 1) for off, width in zip([0, 11, 22, 33, 44, 54], [11, 11, 11, 11, 10, 10])]
+_BITS = np.uint64(1) << np.arange(64, dtype=np.uint64)
+
+_PUNCT = re.compile(r'[\W_]+')
+_BRACKET_TITLE = re.compile(r'^【([^】]+)】')
+
+
+def normalize_title(title: str) -> str:
+    """全角转半角, 小写, 去掉空白和标点"""
+    return _PUNCT.sub('', unicodedata.normalize('NFKC', str(title)).lower())
+
+
+def news_hash(source: str, title: str) -> int:
+    """来源 + 规范化标题的 64 位哈希"""
+    key = f"{source}\x00{normalize_title(title)}".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+
+def simhash(title: str) -> int:
+    """规范化标题的字符 bigram 的 64 位 SimHash"""
+    text = normalize_title(title)
+    grams = [text[i:i + 2] for i in range(max(len(text) - 1, 1))]
+    hashes = np.array([int.from_bytes(hashlib.blake2b(g.encode('utf-8'), digest_size=8).digest(), 'little') for g in grams], dtype=np.uint64)
+    votes = np.where((hashes[:, None] & _BITS) > 0, 1, -1).sum(axis=0)
+    return int(_BITS[votes > 0].sum())
+
+
+def to_news(df: pd.DataFrame, source: str) -> pd.DataFrame:
+    """把某个来源的原始数据转成统一的列, 没有标题的(新浪)用正文开头【】里的内容或整段正文"""
+    _, _, columns = SOURCES[source]
+    df = df[[c for c in columns if c in df.columns]].rename(columns=columns)
+    if 'date' in df.columns:
+        df['time'] = df['date'].astype(str) + ' ' + df['time'].astype(str)
+        df = df.drop(columns='date')
+    if 'title' not in df.columns:
+        summary = df['summary'].astype(str)
+        df['title'] = summary.str.extract(_BRACKET_TITLE, expand=False).fillna(summary)
+    for col in ('summary', 'link'):
+        if col not in df.columns:
+            df[col] = ''
+    df['time'] = pd.to_datetime(df['time'], errors='coerce')
+    df['source'] = source
+    df = df.dropna(subset=['title', 'time'])
+    df[['title', 'summary', 'link']] = df[['title', 'summary', 'link']].fillna('').astype(str)
+    return df
+
+
+class _HashIndex:
+    """_index.bin 的进程内缓存, 只读上次之后追加的部分"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.hashes: Set[int] = set()
+        self.offset = 0
+
+    def refresh(self):
+        if not self.path.exists():
+            self.hashes, self.offset = set(), 0
+            return
+        size = self.path.stat().st_size
+        if size < self.offset:
+            # 索引被删除重建过
+            self.hashes, self.offset = set(), 0
+        if size > self.offset:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read(size - self.offset)
+            n = len(data) // 8
+            self.hashes.update(np.frombuffer(data[:n * 8], dtype='<u8').tolist())
+            self.offset += n * 8
+
+    def add(self, hashes: List[int]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(np.asarray(hashes, dtype='<u8').tobytes())
+        self.hashes.update(hashes)
+        self.offset += 8 * len(hashes)
+
+
+class _SimIndex:
+    """_simhash.bin 的进程内缓存, 按 SimHash 分段分桶"""
+
+    _DTYPE = np.dtype([('simhash', '<u8'), ('cluster', '<u8'), ('time', '<i8')])
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.reset()
+
+    def reset(self):
+        self.records: List[tuple] = []
+        self.buckets: Dict[tuple, List[int]] = {}
+        self.offset = 0
+
+    def insert(self, sh: int, cluster: int, time_ns: int):
+        self.records.append((sh, cluster, time_ns))
+        for band, (off, mask) in enumerate(_BANDS):
+            self.buckets.setdefault((band, (sh >> off) & mask), []).append(len(self.records) - 1)
+
+    def refresh(self):
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if size < self.offset:
+            self.reset()
+        if size > self.offset:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read(size - self.offset)
+            n = len(data) // self._DTYPE.itemsize
+            for rec in np.frombuffer(data[:n * self._DTYPE.itemsize], dtype=self._DTYPE).tolist():
+                self.insert(*rec)
+            self.offset += n * self._DTYPE.itemsize
+
+    def match(self, sh: int, time_ns: int) -> Optional[int]:
+        """发布时间在 CLUSTER_WINDOW 内、海明距离最小且不超过 MAX_DISTANCE 的新闻所在的簇"""
+        window = CLUSTER_WINDOW.value
+        best, best_dist = None, MAX_DISTANCE + 1
+        candidates = set()
+        for band, (off, mask) in enumerate(_BANDS):
+            candidates.update(self.buckets.get((band, (sh >> off) & mask), ()))
+        for i in candidates:
+            other, cluster, other_time = self.records[i]
+            if abs(other_time - time_ns) > window:
+                continue
+            dist = bin(other ^ sh).count('1')
+            if dist < best_dist:
+                best, best_dist = cluster, dist
+        return best
+
+    def add(self, records: List[tuple]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(np.array(records, dtype=self._DTYPE).tobytes())
+        self.offset += len(records) * self._DTYPE.itemsize
+
+
+_lock = threading.Lock()
+_indexes: Dict[Path, _HashIndex] = {}
+_sim_indexes: Dict[Path, _SimIndex] = {}
+
+
+def _index(store: Path) -> _HashIndex:
+    path = Path(store) / INDEX_NAME
+    index = _indexes.setdefault(path.resolve(), _HashIndex(path))
+    index.refresh()
+    return index
+
+
+def _sim_index(store: Path) -> _SimIndex:
+    path = Path(store) / SIMHASH_NAME
+    index = _sim_indexes.setdefault(path.resolve(), _SimIndex(path))
+    index.refresh()
+    return index
+
+
+def assign_clusters(news: pd.DataFrame, index: _SimIndex) -> Tuple[pd.Series, List[tuple]]:
+    """
+    按发布时间顺序给新闻分簇, 和已入库或本批前面的新闻近似重复的并入其簇, 否则自成一簇
+
+    Returns:
+        每条新闻的簇, 要追加到 _simhash.bin 的记录
+    """
+    clusters, records = [], []
+    for id_, sh, time_ns in zip(news['id'], news['simhash'], news['time'].astype('int64')):
+        cluster = index.match(sh, time_ns)
+        cluster = id_ if cluster is None else cluster
+        index.insert(sh, cluster, time_ns)
+        clusters.append(cluster)
+        records.append((sh, cluster, time_ns))
+    return pd.Series(clusters, index=news.index, dtype='uint64'), records
+
+
+def news_dates(store: Path = STORE_DIR) -> List[pd.Timestamp]:
+    """有新闻的发布日期, 升序"""
+    store = Path(store)
+    if not store.exists():
+        return []
+    return sorted(pd.Timestamp(p.name.split('=', 1)[1]) for p in store.glob('date=*') if any(p.glob('*.parquet')))
+
+
+def append_news(df: pd.DataFrame, source: str, store: Path = STORE_DIR, fetched_at: Optional[datetime] = None) -> int:
+    """
+    写入一次抓取的新闻, 已入库的跳过
+
+    Args:
+        df: 接口返回的原始数据
+        source: SOURCES 中的来源
+
+    Returns:
+        新入库的条数
+    """
+    fetched_at = fetched_at or datetime.now()
+    news = to_news(df, source)
+    news['id'] = [news_hash(source, t) for t in news['title']]
+    news = news.drop_duplicates('id')
+    with _lock:
+        index = _index(store)
+        news = news[~news['id'].isin(index.hashes)]
+        if news.empty:
+            return 0
+        news['fetched_at'] = pd.Timestamp(fetched_at)
+        news = news.sort_values('time', ignore_index=True)
+        news['simhash'] = [simhash(t) for t in news['title']]
+        sim_index = _sim_index(store)
+        news['cluster'], sim_records = assign_clusters(news, sim_index)
+        name = f"part-{fetched_at:%Y%m%d%H%M%S%f}-{source}.parquet"
+        for date, part in news.groupby(news['time'].dt.date):
+            part_dir = Path(store) / f"date={date.isoformat()}"
+            part_dir.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(part[NEWS_SCHEMA.names], schema=NEWS_SCHEMA, preserve_index=False)
+            # 先写 . 开头的临时文件再改名, 读的时候不会读到写了一半的文件
+            tmp = part_dir / f'.{name}.tmp'
+            pq.write_table(table, tmp)
+            tmp.replace(part_dir / name)
+        # 分区写完再记索引; 中途失败最多下次重复写入几条, 不会漏
+        index.add(news['id'].tolist())
+        sim_index.add(sim_records)
+    merged = int((news['cluster'] != news['id']).sum())
+    logger.info(f"{SOURCES[source][1]}新闻入库 {len(news)} 条, 其中 {merged} 条和已有新闻近似重复")
+    return len(news)
+
+
+def raw_source(path: Path) -> Optional[str]:
+    """ak_stock_info_global_ths_20250919.csv -> ths"""
+    for source, (prefix, _, _) in SOURCES.items():
+        if re.fullmatch(rf'{prefix}(_\d{{8}})?', Path(path).stem):
+            return source
+    return None
+
+
+def ingest_raw(directory: Path = RAW_DIR, store: Path = STORE_DIR) -> int:
+    """把 raw 目录下已有的新闻 csv 导入新闻库, 按文件时间先后导入, 返回新入库条数"""
+    count = 0
+    for path in sorted(list_tables(directory, 'ak_stock_info_*'), key=lambda p: p.stem[-8:] if p.stem[-8:].isdigit() else '99999999'):
+        source = raw_source(path)
+        if source is None:
+            continue
+        count += append_news(read_table(path), source, store)
+    return count
+
+
+def manifest_path(store: Path = STORE_DIR) -> Path:
+    """
+    页面缓存按这个文件的 (mtime, 大小) 判断新闻库是否更新
+
+    _simhash.bin 在每次 append_news 和 backfill_clusters 时都会追加, 取状态不用扫描分区, 也没有副作用;
+    库为空时文件不存在, 导入新闻由更新任务(get_ak_news_data)或 python -m utils.news_store ingest 负责
+    """
+    return Path(store) / SIMHASH_NAME
+
+
+def read_parts(paths: List[Path], filter: Optional[ds.Expression] = None) -> pd.DataFrame:
+    """
+    读若干分区文件
+
+    还没 backfill 的旧分区没有 simhash/cluster 列: cluster 取自己的 id(单独成簇), simhash 为 0,
+    不留空值, 否则 uint64 列会被转成 float 丢精度
+    """
+    dataset = ds.dataset([str(p) for p in paths], schema=NEWS_SCHEMA, format='parquet')
+    table = dataset.to_table(filter=filter)
+    table = table.set_column(table.schema.get_field_index('cluster'), 'cluster', pc.coalesce(table['cluster'], table['id']))
+    table = table.set_column(table.schema.get_field_index('simhash'), 'simhash', pc.fill_null(table['simhash'], pa.scalar(0, pa.uint64())))
+    return table.to_pandas()
+
+
+def backfill_clusters(store: Path = STORE_DIR) -> int:
+    """
+    给没有 simhash/cluster 列的旧分区补算 SimHash 并分簇, 按发布时间顺序, 和 append_news 的结果一致
+
+    只改写缺列的文件(先写临时文件再改名), 新闻内容不变; 返回补算的条数
+    """
+    store = Path(store)
+    legacy = [p for p in sorted(store.glob('date=*/part-*.parquet')) if 'cluster' not in pq.read_schema(p).names]
+    if not legacy:
+        return 0
+    frames = []
+    for path in legacy:
+        df = pq.read_table(path).to_pandas()
+        df['_path'] = str(path)
+        frames.append(df)
+    news = pd.concat(frames, ignore_index=True).sort_values(['time', 'fetched_at'], kind='stable', ignore_index=True)
+    with _lock:
+        sim_index = _sim_index(store)
+        news['simhash'] = [simhash(t) for t in news['title']]
+        news['cluster'], sim_records = assign_clusters(news, sim_index)
+        for path, part in news.groupby('_path'):
+            path = Path(path)
+            table = pa.Table.from_pandas(part[NEWS_SCHEMA.names], schema=NEWS_SCHEMA, preserve_index=False)
+            tmp = path.parent / f'.{path.name}.tmp'
+            pq.write_table(table, tmp)
+            tmp.replace(path)
+        sim_index.add(sim_records)
+    merged = int((news['cluster'] != news['id']).sum())
+    logger.info(f"补算 {len(legacy)} 个分区文件 {len(news)} 条新闻的 SimHash, 其中 {merged} 条近似重复")
+    return len(news)
+
+
+def collapse_clusters(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    同一簇的新闻合并成一条, 保持 df 原来的顺序, 每簇保留最靠前的一条
+
+    Returns:
+        pd.DataFrame: 加上 sources 列, 簇内各来源的 [(来源, 链接)], 每个来源一个
+    """
+    keys = df['cluster']
+    members: Dict[int, Dict[str, str]] = {}
+    for key, source, link in zip(keys, df['source'], df['link']):
+        members.setdefault(key, {}).setdefault(source, link)
+    first = ~keys.duplicated()
+    df = df[first].copy()
+    df['sources'] = [list(members[k].items()) for k in keys[first]]
+    return df.reset_index(drop=True)
+
+
+def latest_news(
+    n: int = 20,
+    store: Path = STORE_DIR,
+    sources: Optional[List[str]] = None,
+    collapse: bool = False,
+) -> pd.DataFrame:
+    """
+    最新的 n 条新闻, 按发布时间倒序
+
+    Args:
+        sources: 只取这些来源, 默认全部
+        collapse: 近似重复的新闻合并成一条, 见 collapse_clusters
+    """
+    cond = None if sources is None else ds.field('source').isin(sources)
+    frames, total, enough = [], 0, False
+    for date in reversed(news_dates(store)):
+        part_dir = Path(store) / f"date={date.date().isoformat()}"
+        frames.append(read_parts(list(part_dir.glob('part-*.parquet')), cond))
+        # 更早的分区发布时间都更早, 凑够 n 条就不用再读;
+        # 合并时同一簇的新闻可能在前一天(CLUSTER_WINDOW), 凑够后再多读一个分区
+        if enough:
+            break
+        if collapse:
+            total = pd.concat(frames)['cluster'].nunique()
+        else:
+            total += len(frames[-1])
+        enough = total >= n
+        if enough and not collapse:
+            break
+    if not frames:
+        return pd.DataFrame(columns=NEWS_SCHEMA.names)
+    df = pd.concat(frames, ignore_index=True)
+    df = df.sort_values(['time', 'fetched_at'], ascending=False, ignore_index=True)
+    if collapse:
+        df = collapse_clusters(df)
+    return df.head(n)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['ingest']:
+        n = ingest_raw()
+        logger.info(f"新入库 {n} 条新闻, 共 {len(_index(STORE_DIR).hashes)} 条")
+    elif sys.argv[1:2] == ['backfill']:
+        backfill_clusters()
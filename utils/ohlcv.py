@@ -0,0 +1,68 @@
+"""
+个股日线 OHLCV
+
+原始数据是 datas/raw/stocks/<symbol>_gegu_stock_ak.xlsx, 每次 pd.read_excel 要几百毫秒.
+和其他 xlsx 一样走 storage.convert_excel / read_table: 第一次读取时转成同名 parquet(xlsx 更新后重新转换),
+之后只读 parquet; 取出 OHLCV 列按日期排序后, 按 (路径, 文件 mtime) 放进有上限的 LRU 缓存, 文件不变时直接返回.
+"""
+import functools
+import os
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+
+from utils.storage import convert_excel, read_table
+
+RAW_DIR = Path('datas/raw/stocks')
+RAW_SUFFIX = '_gegu_stock_ak.xlsx'
+DEFAULT_SYMBOL = 'gegu_stock_ak'
+OHLCV_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+# 最多缓存多少只股票
+CACHE_SIZE = int(os.getenv('OHLCV_CACHE_SIZE', 128))
+
+
+def _raw_path(symbol: str) -> Path:
+    # 没有代码前缀的 gegu_stock_ak.xlsx, symbol 就是文件名
+    if symbol == DEFAULT_SYMBOL:
+        return RAW_DIR / f'{DEFAULT_SYMBOL}.xlsx'
+    return RAW_DIR / f'{symbol}{RAW_SUFFIX}'
+
+
+def _symbol(raw: Path) -> str:
+    if raw.name == f'{DEFAULT_SYMBOL}.xlsx':
+        return DEFAULT_SYMBOL
+    return raw.name[:-len(RAW_SUFFIX)]
+
+
+def list_symbols() -> List[str]:
+    """有日线数据的股票, 已转换的 parquet 和还没转换的 xlsx 都算"""
+    return sorted({_symbol(p.with_suffix('.xlsx')) for suffix in ('.xlsx', '.parquet')
+                   for p in RAW_DIR.glob(f'*{DEFAULT_SYMBOL}{suffix}')})
+
+
+def convert(symbol: str) -> Path:
+    """xlsx -> 同名 parquet, 见 storage.convert_excel; 没有数据时抛出 FileNotFoundError"""
+    return convert_excel(_raw_path(symbol))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _read(path: str, mtime_ns: int) -> pd.DataFrame:
+    df = read_table(path)
+    df = df[[c for c in OHLCV_COLUMNS if c in df.columns]]
+    return df.sort_values('date', ignore_index=True)
+
+
+def load_ohlcv(symbol: str) -> pd.DataFrame:
+    """
+    一只股票的日线, 列 date, open, high, low, close, volume, 按日期升序
+
+    返回的是缓存对象, 不要原地修改
+    """
+    path = convert(symbol)
+    return _read(str(path), path.stat().st_mtime_ns)
+
+
+def cache_info():
+    return _read.cache_info()
@@ -0,0 +1,174 @@
+"""
+数据更新任务图
+
+把 fetch / merge 任务声明成带依赖的节点:
+- 没有依赖关系的任务并发执行
+- 输出文件在 max_age 内更新过、且上游这次没有重新执行的任务直接跳过
+- 每个任务的状态和耗时记录在 state_file, 部分失败后重跑只执行失败和未执行的任务
+- 任务函数抛出异常, 或者返回的结果带有非空的 failures(如 fetcher.FetchReport), 都算失败
+"""
+import glob
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from loguru import logger
+
+DONE = 'done'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+BLOCKED = 'blocked'
+
+
+@dataclass
+class Task:
+    """任务节点"""
+    name: str
+    func: Callable
+    deps: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)  # 输出文件 glob, 用于判断是否需要重跑
+    max_age: float = 20 * 3600                         # 输出在多少秒内更新过算最新
+
+
+def _newest_mtime(pattern: str) -> float:
+    mtimes = [os.path.getmtime(p) for p in glob.glob(pattern)]
+    return max(mtimes) if mtimes else 0.0
+
+
+def is_fresh(task: Task) -> bool:
+    """所有输出都存在, 且都在 max_age 内更新过"""
+    if not task.outputs:
+        return False
+    now = time.time()
+    return all(now - _newest_mtime(p) <= task.max_age for p in task.outputs)
+
+
+def _check_graph(tasks: Dict[str, Task]):
+    for task in tasks.values():
+        for dep in task.deps:
+            if dep not in tasks:
+                raise ValueError(f"任务 {task.name} 依赖的 {dep} 不存在")
+    # 检查环
+    visiting, visited = set(), set()
+
+    def visit(name):
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"任务依赖存在环: {name}")
+        visiting.add(name)
+        for dep in tasks[name].deps:
+            visit(dep)
+        visiting.discard(name)
+        visited.add(name)
+
+    for name in tasks:
+        visit(name)
+
+
+def _load_state(state_file: Path, run_id: str) -> dict:
+    if state_file.exists():
+        state = json.loads(state_file.read_text(encoding='utf-8'))
+        if state.get('run_id') == run_id:
+            return state
+    return {'run_id': run_id, 'tasks': {}}
+
+
+def run_pipeline(
+    tasks: List[Task],
+    max_workers: int = 4,
+    force: bool = False,
+    state_file: str = 'logs/pipeline_state.json',
+    run_id: str = None,
+) -> Dict[str, dict]:
+    """
+    按依赖关系执行任务
+
+    Args:
+        tasks: 任务列表
+        max_workers: 最大并发任务数
+        force: 忽略输出新鲜度和上次的执行状态, 全部重跑
+        state_file: 状态文件, 记录本轮每个任务的状态和耗时
+        run_id: 同一个 run_id 内重跑会跳过已完成的任务, 默认当天日期
+
+    Returns:
+        Dict[str, dict]: 任务名 -> {status, seconds, error}
+    """
+    graph = {t.name: t for t in tasks}
+    _check_graph(graph)
+
+    state_file = Path(state_file)
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    state = _load_state(state_file, run_id or datetime.now().strftime('%Y%m%d'))
+
+    results: Dict[str, dict] = {}
+    executed = set()  # 本次真正执行过的任务, 下游不能跳过
+
+    def save():
+        state['tasks'].update(results)
+        state_file.write_text(json.dumps(state, ensure_ascii=False, indent=1), encoding='utf-8')
+
+    def should_skip(task: Task) -> bool:
+        if force or any(dep in executed for dep in task.deps):
+            return False
+        status = state['tasks'].get(task.name, {}).get('status')
+        if status in (DONE, SKIPPED):
+            return True
+        # 本轮失败或被阻塞过的, 输出文件可能只写了一部分, 不按新鲜度跳过
+        if status in (FAILED, BLOCKED):
+            return False
+        return is_fresh(task)
+
+    def run(task: Task) -> dict:
+        start = time.perf_counter()
+        try:
+            ret = task.func()
+            failures = getattr(ret, 'failures', None)
+            if failures:
+                error = f"{len(failures)} 项失败: " + ', '.join(str(getattr(f, 'key', f)) for f in failures[:5])
+                logger.error(f"任务 {task.name} 部分失败, {error}")
+                return {'status': FAILED, 'seconds': round(time.perf_counter() - start, 2), 'error': error}
+            return {'status': DONE, 'seconds': round(time.perf_counter() - start, 2), 'error': ''}
+        except Exception as e:
+            logger.exception(f"任务 {task.name} 失败")
+            return {'status': FAILED, 'seconds': round(time.perf_counter() - start, 2), 'error': str(e)}
+
+    pending = dict(graph)
+    running = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name, task in list(pending.items()):
+                dep_status = [results.get(d, {}).get('status') for d in task.deps]
+                if any(s in (FAILED, BLOCKED) for s in dep_status):
+                    results[name] = {'status': BLOCKED, 'seconds': 0, 'error': '上游任务失败'}
+                    logger.warning(f"任务 {name} 跳过: 上游任务失败")
+                    del pending[name]
+                elif all(s in (DONE, SKIPPED) for s in dep_status):
+                    del pending[name]
+                    if should_skip(task):
+                        results[name] = {'status': SKIPPED, 'seconds': 0, 'error': ''}
+                        logger.info(f"任务 {name} 已是最新, 跳过")
+                    else:
+                        logger.info(f"任务 {name} 开始")
+                        executed.add(name)
+                        running[pool.submit(run, task)] = name
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                results[name] = future.result()
+                logger.info(f"任务 {name} {results[name]['status']}, 耗时 {results[name]['seconds']}s")
+                save()
+
+    save()
+    elapsed = time.perf_counter() - start
+    summary = ', '.join(f"{k}:{v['status']}({v['seconds']}s)" for k, v in results.items())
+    logger.info(f"任务图执行完成, 总耗时 {elapsed:.1f}s; {summary}")
+    return results
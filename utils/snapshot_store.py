@@ -0,0 +1,187 @@
+"""
+集思录可转债快照库
+
+get_ak_jsl_bond 每天写一份全市场快照 datas/raw/bonds/conv_YYYYMMDD.csv, 分析时要逐个读文件.
+这里把快照存成按日期分区的 parquet, 主键 (date, 代码), 只追加不修改:
+
+    datas/processed/bonds/conv_store/date=2025-12-11/part-0.parquet
+
+- 每个分区内按 代码 排序, 行组较小, 查单只转债时 parquet 按行组统计跳过不相关的数据
+- universe_as_of(date): 某天(含)之前最近一次快照的全市场数据, 只读一个分区
+- bond_history(code): 一只转债在所有快照里的记录, 按日期排序, 分区和行组都按过滤条件裁剪
+- load_history(): 全部快照, 给回测用
+
+python -m utils.snapshot_store ingest    把已有的 conv_*.csv 导入快照库(已导入的日期跳过)
+"""
+import os
+import re
+import sys
+from pathlib import Path
+from typing import List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from loguru import logger
+
+from utils.storage import list_tables, read_table
+
+STORE_DIR = Path('datas/processed/bonds/conv_store')
+RAW_DIR = Path('datas/raw/bonds')
+RAW_PATTERN = 'conv_*'
+
+# 行组行数, 全市场 400~600 只转债, 一个分区大约 10 个行组
+ROW_GROUP_SIZE = 64
+
+CODE_COLUMNS = ['代码', '正股代码']
+TEXT_COLUMNS = ['转债名称', '正股名称', '债券评级']
+DATE_COLUMNS = ['到期时间']
+
+_PARTITIONING = ds.partitioning(pa.schema([('date', pa.date32())]), flavor='hive')
+
+DateLike = Union[str, pd.Timestamp]
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """统一列类型, 不同日期的分区 schema 一致: 代码补齐6位字符串, 文本列字符串, 其余数值"""
+    df = df.copy()
+    for col in df.columns:
+        if col in CODE_COLUMNS:
+            df[col] = df[col].astype(str).str.zfill(6)
+        elif col in TEXT_COLUMNS:
+            df[col] = df[col].astype('string')
+        elif col in DATE_COLUMNS:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+    return df.drop_duplicates('代码').sort_values('代码', ignore_index=True)
+
+
+def _partition(date: DateLike, store: Path) -> Path:
+    return Path(store) / f"date={pd.Timestamp(date).date().isoformat()}"
+
+
+def snapshot_dates(store: Path = STORE_DIR) -> List[pd.Timestamp]:
+    """已入库的快照日期, 升序"""
+    store = Path(store)
+    if not store.exists():
+        return []
+    return sorted(pd.Timestamp(p.name.split('=', 1)[1]) for p in store.glob('date=*') if any(p.glob('*.parquet')))
+
+
+def append_snapshot(df: pd.DataFrame, date: DateLike, store: Path = STORE_DIR) -> Optional[Path]:
+    """
+    写入一天的快照, 只追加: 这一天已经入库则跳过
+
+    Returns:
+        写入的文件, 跳过时为 None
+    """
+    part_dir = _partition(date, store)
+    target = part_dir / 'part-0.parquet'
+    if target.exists():
+        logger.debug(f"快照 {part_dir.name} 已入库, 跳过")
+        return None
+    part_dir.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(_normalize(df), preserve_index=False)
+    # . 开头的文件 pyarrow dataset 会忽略, 写到一半的文件不会被读到
+    tmp = part_dir / '.part-0.parquet.tmp'
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp, target)
+    logger.info(f"快照 {part_dir.name} 入库, {len(df)} 只转债")
+    return target
+
+
+def raw_snapshot_date(path: Path) -> pd.Timestamp:
+    """conv_20251211.csv -> 2025-12-11"""
+    return pd.Timestamp(re.search(r'(\d{8})', Path(path).name).group(1))
+
+
+def ingest_raw(directory: Path = RAW_DIR, pattern: str = RAW_PATTERN, store: Path = STORE_DIR) -> int:
+    """把还没入库的 conv_*.csv 导入快照库, 返回新导入的天数"""
+    stored = set(snapshot_dates(store))
+    count = 0
+    for path in sorted(list_tables(directory, pattern), key=raw_snapshot_date):
+        date = raw_snapshot_date(path)
+        if date in stored:
+            continue
+        append_snapshot(read_table(path), date, store)
+        count += 1
+    return count
+
+
+def _dataset(store: Path) -> ds.Dataset:
+    return ds.dataset(str(store), format='parquet', partitioning=_PARTITIONING)
+
+
+def _to_pandas(table: pa.Table) -> pd.DataFrame:
+    df = table.to_pandas()
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def universe_as_of(date: DateLike, store: Path = STORE_DIR, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    date 当天(含)之前最近一次快照的全市场数据
+
+    Raises:
+        FileNotFoundError: date 之前没有快照
+    """
+    date = pd.Timestamp(date)
+    dates = [d for d in snapshot_dates(store) if d <= date]
+    if not dates:
+        raise FileNotFoundError(f"{store} 中没有 {date.date()} 之前的快照")
+    # ParquetFile 只读这一个文件, 不做分区推断
+    df = pq.ParquetFile(_partition(dates[-1], store) / 'part-0.parquet').read(columns=columns).to_pandas()
+    df.insert(0, 'date', dates[-1])
+    return df
+
+
+def bond_history(
+    code: str,
+    store: Path = STORE_DIR,
+    columns: Optional[List[str]] = None,
+    start: Optional[DateLike] = None,
+    end: Optional[DateLike] = None,
+) -> pd.DataFrame:
+    """一只转债在各个快照中的记录, 按日期升序"""
+    code = str(code).zfill(6)
+    return load_history(store, columns, start, end, ds.field('代码') == code)
+
+
+def load_history(
+    store: Path = STORE_DIR,
+    columns: Optional[List[str]] = None,
+    start: Optional[DateLike] = None,
+    end: Optional[DateLike] = None,
+    filter: Optional[ds.Expression] = None,
+) -> pd.DataFrame:
+    """
+    多个快照的长表, 含 date 列, 按 (date, 代码) 排序
+
+    Args:
+        columns: 只读这些列, date 和 代码 总会返回
+        start, end: 日期范围(含), 只读范围内的分区
+        filter: 额外的 pyarrow 过滤条件
+    """
+    if not snapshot_dates(store):
+        return pd.DataFrame(columns=['date', '代码', *(columns or [])])
+    conds = [] if filter is None else [filter]
+    if start is not None:
+        conds.append(ds.field('date') >= pd.Timestamp(start).date())
+    if end is not None:
+        conds.append(ds.field('date') <= pd.Timestamp(end).date())
+    cond = None
+    for c in conds:
+        cond = c if cond is None else cond & c
+    if columns is not None:
+        columns = ['date', '代码', *[c for c in columns if c not in ('date', '代码')]]
+    table = _dataset(store).to_table(columns=columns, filter=cond)
+    return _to_pandas(table).sort_values(['date', '代码'], ignore_index=True)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['ingest']:
+        n = ingest_raw()
+        logger.info(f"新导入 {n} 个快照, 共 {len(snapshot_dates())} 个")
@@ -0,0 +1,329 @@
+"""
+数据存储层
+
+所有数据读写都走 write_table / read_table, 路径统一写成 .csv 的逻辑路径,
+实际存储格式由后端决定:
+- csv(默认): 读取时按 schema 转换日期和数值列
+- parquet: 写入前按 schema 转换, 日期和数值以原生类型存储, 读取不用再转换
+
+后端通过环境变量 DATA_BACKEND=csv|parquet 选择.
+读取时如果 parquet 文件存在且不比 csv 旧, 优先读 parquet.
+
+早期的 .xlsx 数据(openpyxl 读取很慢)也可以用 read_table 读: 第一次读取时转成同名 .parquet,
+xlsx 更新后重新转换, 之后都读 parquet.
+
+python -m utils.storage migrate  把 datas/raw 和 datas/processed 下已有的csv一次性转成parquet
+python -m utils.storage excel    把 datas 下所有 xlsx 转成 parquet, 并输出每个文件的读取耗时对比
+"""
+import fnmatch
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+from loguru import logger
+
+from utils.incremental import append_incremental, read_last_date
+
+load_dotenv()
+
+DATA_ROOT = Path('datas')
+
+# 数据集 schema, key 为相对 datas/ 的路径模式(不含后缀)
+# datetime: 日期列, float: 数值列, '*': 其余所有列
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    'raw/reits/reits_hist_em_*': {
+        '日期': 'datetime',
+        '今开': 'float', '最高': 'float', '最低': 'float', '最新价': 'float',
+        '成交量': 'float', '成交额': 'float', '振幅': 'float', '换手': 'float',
+    },
+    'raw/reits/reits_realtime_em': {
+        '最新价': 'float', '涨跌额': 'float', '涨跌幅': 'float', '成交量': 'float', '成交额': 'float',
+        '开盘价': 'float', '最高价': 'float', '最低价': 'float', '昨收': 'float',
+    },
+    'raw/indexes/ak_index_global_hist_em_*': {
+        '日期': 'datetime',
+        '今开': 'float', '最新价': 'float', '最高': 'float', '最低': 'float', '振幅': 'float',
+    },
+    'raw/metals/macro_cons_*': {
+        '日期': 'datetime',
+        '总库存': 'float', '增持/减持': 'float', '总价值': 'float', '单价': 'float',
+    },
+    'raw/bonds/ak_cn_us_rate*': {'日期': 'datetime', '*': 'float'},
+    'raw/bonds/ef_get_all_base_info': {'申购日期': 'datetime', '上市日期': 'datetime', '到期日期': 'datetime'},
+    'raw/stocks/ef_行业板块*': {'涨跌幅': 'float', '总市值': 'float', '成交额': 'float'},
+    'raw/stocks/*gegu_stock_ak': {'date': 'datetime'},
+    'processed/reits/reits_merged': {'日期': 'datetime', '*': 'float'},
+    'processed/indexes/ak_index_global_merged_*': {'日期': 'datetime', '*': 'float'},
+    'processed/virtual/*': {'date': 'datetime', '*': 'float'},
+    'processed/gdps/*': {'date': 'datetime', '*': 'float'},
+    'processed/cpis/*': {'date': 'datetime', '*': 'float'},
+    'zhishu_ak_*': {'指数开始时间': 'datetime', '更新时间': 'datetime'},
+}
+
+EXCEL_SUFFIXES = ('.xlsx', '.xls')
+
+
+def get_schema(path) -> Dict[str, str]:
+    """根据路径匹配 schema, 没有则返回空"""
+    parts = Path(path).with_suffix('').parts
+    if DATA_ROOT.name in parts:
+        parts = parts[len(parts) - parts[::-1].index(DATA_ROOT.name):]
+    rel = '/'.join(parts)
+    for pattern, schema in SCHEMAS.items():
+        if fnmatch.fnmatch(rel, pattern):
+            return schema
+    return {}
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """按 schema 转换列类型"""
+    if not schema:
+        return df
+    rest = schema.get('*')
+    for col in df.columns:
+        kind = schema.get(col, rest)
+        if kind == 'datetime' and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif kind == 'float' and not pd.api.types.is_float_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+    return df
+
+
+class CsvBackend:
+    suffix = '.csv'
+
+    def read(self, path: Path, columns: Optional[List[str]] = None, **kwargs) -> pd.DataFrame:
+        return apply_schema(pd.read_csv(path, usecols=columns, **kwargs), get_schema(path))
+
+    def write(self, df: pd.DataFrame, path: Path):
+        df.to_csv(path, index=False)
+
+    def append(self, df: pd.DataFrame, path: Path, date_col: str) -> int:
+        return append_incremental(df, path, date_col)
+
+    def last_date(self, path: Path, date_col: str) -> Optional[pd.Timestamp]:
+        return read_last_date(path, date_col)
+
+
+class ParquetBackend:
+    suffix = '.parquet'
+
+    def read(self, path: Path, columns: Optional[List[str]] = None, **kwargs) -> pd.DataFrame:
+        return pd.read_parquet(path, columns=columns, **kwargs)
+
+    def write(self, df: pd.DataFrame, path: Path):
+        df = apply_schema(df.copy(), get_schema(path))
+        try:
+            df.to_parquet(path, index=False)
+        except Exception:
+            # object列里混了数字和字符串, 统一转成字符串
+            for col in df.columns[df.dtypes == object]:
+                df[col] = df[col].astype('string')
+            df.to_parquet(path, index=False)
+
+    def append(self, df: pd.DataFrame, path: Path, date_col: str) -> int:
+        if not path.exists():
+            self.write(df, path)
+            return len(df)
+        old = self.read(path)
+        last = old[date_col].max()
+        df = apply_schema(df.copy(), get_schema(path))
+        new_rows = df[df[date_col] >= last]
+        if new_rows.empty:
+            return 0
+        # 最后一天可能是盘中数据, 用新数据替换
+        merged = pd.concat([old[old[date_col] < last], new_rows], ignore_index=True)
+        self.write(merged, path)
+        return int((new_rows[date_col] > last).sum())
+
+    def last_date(self, path: Path, date_col: str) -> Optional[pd.Timestamp]:
+        if not path.exists():
+            return None
+        dates = pd.read_parquet(path, columns=[date_col])[date_col]
+        return dates.max() if not dates.empty else None
+
+
+BACKENDS = {
+    'csv': CsvBackend(),
+    'parquet': ParquetBackend(),
+}
+
+
+def get_backend(name: Optional[str] = None):
+    name = name or os.getenv('DATA_BACKEND', 'csv')
+    return BACKENDS[name]
+
+
+def _physical(path, backend) -> Path:
+    return Path(path).with_suffix(backend.suffix)
+
+
+def write_table(df: pd.DataFrame, path, backend: Optional[str] = None) -> Path:
+    """
+    写数据
+
+    Args:
+        df: 数据
+        path: 逻辑路径, 如 datas/raw/reits/reits_realtime_em.csv
+        backend: csv | parquet, 默认取 DATA_BACKEND
+
+    Returns:
+        Path: 实际写入的文件
+    """
+    b = get_backend(backend)
+    target = _physical(path, b)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    b.write(df, target)
+    return target
+
+
+def append_table(df: pd.DataFrame, path, date_col: str = '日期', backend: Optional[str] = None) -> int:
+    """按日期增量追加, 返回新增行数"""
+    b = get_backend(backend)
+    target = _physical(path, b)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    return b.append(df, target, date_col)
+
+
+def last_date(path, date_col: str = '日期', backend: Optional[str] = None) -> Optional[pd.Timestamp]:
+    """已保存数据的最后日期"""
+    b = get_backend(backend)
+    return b.last_date(_physical(path, b), date_col)
+
+
+def resolve(path) -> Path:
+    """
+    逻辑路径 -> 实际文件: parquet 存在且不比 csv 旧则用 parquet
+    """
+    csv_path = Path(path).with_suffix('.csv')
+    pq_path = Path(path).with_suffix('.parquet')
+    if pq_path.exists() and (not csv_path.exists() or pq_path.stat().st_mtime >= csv_path.stat().st_mtime):
+        return pq_path
+    return csv_path
+
+
+def _stale(source: Path, target: Path) -> bool:
+    return not target.exists() or target.stat().st_mtime < source.stat().st_mtime
+
+
+def convert_excel(path, force: bool = False) -> Path:
+    """
+    xlsx -> 同名 parquet, parquet 不存在或比 xlsx 旧时转换
+
+    to_excel 默认写出的索引列(Unnamed: 0)去掉, 其余列按 schema 转换类型
+
+    Returns:
+        parquet 路径
+    """
+    src = Path(path)
+    target = src.with_suffix('.parquet')
+    if src.exists() and (force or _stale(src, target)):
+        df = pd.read_excel(src)
+        if 'Unnamed: 0' in df.columns and df['Unnamed: 0'].equals(pd.Series(range(len(df)))):
+            df = df.drop(columns='Unnamed: 0')
+        # schema 按目标路径匹配, 临时文件名匹配不上
+        df = apply_schema(df, get_schema(target))
+        tmp = target.with_suffix('.tmp.parquet')
+        BACKENDS['parquet'].write(df, tmp)
+        os.replace(tmp, target)
+        logger.info(f"{src} -> {target}")
+    if not target.exists():
+        raise FileNotFoundError(f"{src} 不存在")
+    return target
+
+
+def read_table(path, columns: Optional[List[str]] = None, **kwargs) -> pd.DataFrame:
+    """
+    读数据, 返回按 schema 转换好类型的 DataFrame
+
+    Args:
+        path: 逻辑路径(.csv 或 .parquet 都可以), .xlsx 会先转成 parquet 再读
+        columns: 只读取这些列
+    """
+    if Path(path).suffix in EXCEL_SUFFIXES:
+        return BACKENDS['parquet'].read(convert_excel(path), columns=columns, **kwargs)
+    target = resolve(path)
+    backend = BACKENDS['parquet'] if target.suffix == '.parquet' else BACKENDS['csv']
+    return backend.read(target, columns=columns, **kwargs)
+
+
+def list_tables(directory, pattern: str) -> List[Path]:
+    """
+    列出目录下匹配的数据集, 返回逻辑路径(.csv), csv 和 parquet 去重
+
+    Args:
+        directory: 目录
+        pattern: 不带后缀的 glob, 如 reits_hist_em_*
+    """
+    directory = Path(directory)
+    stems = {p.with_suffix('.csv') for suffix in ('.csv', '.parquet') for p in directory.glob(pattern + suffix)}
+    return sorted(stems)
+
+
+def migrate(root=DATA_ROOT, dirs=('raw', 'processed')) -> List[Path]:
+    """
+    把已有csv转成parquet, 已经是最新的跳过
+    """
+    converted = []
+    for d in dirs:
+        for csv_path in sorted((Path(root) / d).rglob('*.csv')):
+            pq_path = csv_path.with_suffix('.parquet')
+            if not _stale(csv_path, pq_path):
+                continue
+            try:
+                df = CsvBackend().read(csv_path)
+                BACKENDS['parquet'].write(df, pq_path)
+                converted.append(pq_path)
+                logger.info(f"{csv_path} -> {pq_path}")
+            except Exception as e:
+                logger.error(f"转换 {csv_path} 失败: {e}")
+    logger.info(f"共转换 {len(converted)} 个文件")
+    return converted
+
+
+def migrate_excel(root=DATA_ROOT) -> pd.DataFrame:
+    """
+    把 root 下所有 xlsx 转成 parquet, 已经是最新的跳过
+
+    Returns:
+        pd.DataFrame: 每个文件 read_excel 和 read_table 的读取耗时(秒)
+    """
+    rows = []
+    for src in sorted(p for suffix in EXCEL_SUFFIXES for p in Path(root).rglob(f'*{suffix}')):
+        try:
+            convert_excel(src)
+        except Exception as e:
+            logger.error(f"转换 {src} 失败: {e}")
+            continue
+        start = time.perf_counter()
+        df = pd.read_excel(src)
+        excel_time = time.perf_counter() - start
+        start = time.perf_counter()
+        read_table(src)
+        parquet_time = time.perf_counter() - start
+        rows.append({
+            'file': str(src),
+            'rows': len(df),
+            'xlsx_kb': src.stat().st_size / 1024,
+            'parquet_kb': src.with_suffix('.parquet').stat().st_size / 1024,
+            'read_excel': excel_time,
+            'read_table': parquet_time,
+            'speedup': excel_time / parquet_time,
+        })
+    report = pd.DataFrame(rows)
+    with pd.option_context('display.max_columns', None, 'display.width', 200, 'display.float_format', '{:.3f}'.format):
+        logger.info(f"xlsx 读取耗时对比:\n{report}")
+    return report
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['migrate']:
+        migrate()
+    elif sys.argv[1:2] == ['excel']:
+        migrate_excel()
+    else:
+        print("usage: python -m utils.storage migrate|excel")
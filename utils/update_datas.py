@@ -10,6 +10,16 @@ import yfinance as yf  # 国际
 import easyquotation as eq  # 国内
 import pandas as pd
 
+from utils.cache import TTLS, cache_call
+from utils.clean_data import merge_on_date
+from utils.fetcher import fetch_concurrently, guarded
+from utils.incremental import fetch_since
+from utils.meta_index import common_start_date, update_meta
+from utils.news_store import append_news, ingest_raw, news_dates
+from utils.pipeline import Task, run_pipeline
+from utils.snapshot_store import append_snapshot
+from utils.storage import append_table, last_date, list_tables, read_table, write_table
+
 load_dotenv()
 
 
@@ -23,124 +33,133 @@ def ensure_dir(file_path):
 
 
 def get_ak_news_data():
-    """获取 akshare 新闻数据"""
+    """获取 akshare 新闻数据, csv 保存最近一次的结果, 新出现的新闻追加到新闻库"""
     try:
         date_str = datetime.now().strftime('%Y%m%d')
-        
+        if not news_dates():
+            # 新闻库为空, 先把上次抓取留下的 csv 导入, 下面会覆盖它们
+            ingest_raw()
+
         # 全球财经直播
-        df1 = ak.stock_info_global_ths()
+        df1 = guarded('ths', ak.stock_info_global_ths)()
         filename = f"datas/raw/news/ak_stock_info_global_ths.csv"
         ensure_dir(filename)
-        df1.to_csv(filename, index=False)
+        write_table(df1, filename)
+        append_news(df1, 'ths')
         logger.info(f"全球财经直播数据: {filename} 已更新")
 
         # 同花顺财经-电报
-        df2 = ak.stock_info_global_cls()
+        df2 = guarded('cls', ak.stock_info_global_cls)()
         filename = f"datas/raw/news/ak_stock_info_global_cls.csv"
-        df2.to_csv(filename, index=False)
+        write_table(df2, filename)
+        append_news(df2, 'cls')
         logger.info(f"同花顺财经-电报数据: {filename} 已更新")
 
         # 东方财富-财经早餐
-        df3 = ak.stock_info_cjzc_em()
+        df3 = guarded('eastmoney', ak.stock_info_cjzc_em)()
         filename = f"datas/raw/news/ak_stock_info_cjzc_em.csv"
-        df3.to_csv(filename, index=False)
+        write_table(df3, filename)
+        append_news(df3, 'cjzc_em')
         logger.info(f"东方财富-财经早餐数据: {filename} 已更新")
 
         # stock_info_global_sina
-        df4 = ak.stock_info_global_sina()
+        df4 = guarded('sina', ak.stock_info_global_sina)()
         filename = f"datas/raw/news/ak_stock_info_global_sina.csv"
-        df4.to_csv(filename, index=False)
+        write_table(df4, filename)
+        append_news(df4, 'sina')
         logger.info(f"新浪财经-全球财经新闻数据: {filename} 已更新")
         
         # stock_info_global_em
-        df5 = ak.stock_info_global_em()
+        df5 = guarded('eastmoney', ak.stock_info_global_em)()
         filename = f"datas/raw/news/ak_stock_info_global_em.csv"
-        df5.to_csv(filename, index=False)
+        write_table(df5, filename)
+        append_news(df5, 'em')
         logger.info(f"东方财富-全球财经新闻数据: {filename} 已更新")
         
     except Exception as e:
         logger.error(f"获取akshare新闻数据失败: {str(e)}")
+        raise
     
     
-def get_ak_reits_data():
+def get_ak_reits_data(max_workers: int = 8, incremental: bool = True):
     
     """
     获取 akshare reits 数据
+
+    Args:
+        max_workers: 并发下载历史数据的线程数, 1 为串行
+        incremental: 只追加比已保存数据更新的行, False 则全量覆盖
     """
     try:
         # date_str = datetime.now().strftime('%Y%m%d')
         # reits列表
-        reits_list = ak.reits_realtime_em()
+        reits_list = guarded('eastmoney', ak.reits_realtime_em)()
         filename = f"datas/raw/reits/reits_realtime_em.csv"
         ensure_dir(filename)
-        reits_list.to_csv(filename, index=False)
+        write_table(reits_list, filename)
         logger.info(f"REITs列表数据: {filename} 已更新")
         
-        # reits_hist_em
-        
-        for symbol, name in zip(reits_list['代码'], reits_list['名称']):
-            try:
-                df = ak.reits_hist_em(symbol=symbol)
-            except Exception as e:
-                logger.error(f"获取REITs {symbol} 数据失败: {str(e)}")
-                
-                import traceback
-                import pprint
-                print('traceback.print_exc()')
-                traceback.print_exc()
-                
-                print("Locals:", pprint.pformat(locals()))
-                
-                continue
-            filename = f"datas/raw/reits/reits_hist_em_{symbol}_{name}.csv"
+        # reits_hist_em, 并发下载, 每个下载完成立即写csv
+        symbol2name = dict(zip(reits_list['代码'], reits_list['名称']))
+
+        def hist_file(symbol):
+            return f"datas/raw/reits/reits_hist_em_{symbol}_{symbol2name[symbol]}.csv"
+
+        def save_hist(symbol, df):
+            filename = hist_file(symbol)
             ensure_dir(filename)
-            df.to_csv(filename, index=False)
-            logger.info(f"REITs {symbol} 数据: {filename} 已更新")
+            if incremental:
+                n = append_table(df, filename)
+                logger.info(f"REITs {symbol} 数据: {filename} 新增 {n} 行")
+            else:
+                write_table(df, filename)
+                logger.info(f"REITs {symbol} 数据: {filename} 已更新")
+
+        report = fetch_concurrently(
+            symbol2name,
+            lambda symbol: fetch_since(ak.reits_hist_em, last_date(hist_file(symbol)), symbol=symbol)
+            if incremental else ak.reits_hist_em(symbol=symbol),
+            on_result=save_hist,
+            max_workers=max_workers,
+            host='eastmoney',
+        )
+        report.log("REITs历史数据")
+        return report
 
     except Exception as e:
         logger.error(f"获取akshare REITs数据失败: {str(e)}")
+        raise
         
     # merge_ak_reits()
         
 
 def merge_ak_reits():
     """
-    读取多个 akshare REITs 数据, pd.merge 合并后保存为一个csv文件, 方便绘图
+    读取多个 akshare REITs 数据, 按日期一次性对齐合并后保存为一个csv文件, 方便绘图
     """
     reits_dir = Path("datas/raw/reits")
     output_dir = Path("datas/processed/reits")
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    for csv_file in sorted(reits_dir.glob("reits_hist_em_*.csv")):
+    series = {}
+    for csv_file in list_tables(reits_dir, "reits_hist_em_*"):
         try:
-            df_tmp = pd.read_csv(csv_file)
+            df_tmp = read_table(csv_file)
             if "日期" in df_tmp.columns and "今开" in df_tmp.columns:
-                # 解析日期
-                dates = pd.to_datetime(df_tmp["日期"], errors="coerce")
-                vals = pd.to_numeric(df_tmp["今开"], errors="coerce")
+                dates = df_tmp["日期"]
+                vals = df_tmp["今开"]
 
                 name = csv_file.stem.replace("reits_hist_em_", "")
-                
-                # 合并数据
-                if 'merged_df' in locals():
-                    merged_df = pd.merge(merged_df, pd.DataFrame({
-                        '日期': dates,
-                        name: vals
-                    }), on='日期', how='outer')
-                else:
-                    merged_df = pd.DataFrame({
-                        '日期': dates,
-                        name: vals
-                    })
+                series[name] = pd.Series(vals.values, index=dates.values)
 
         except Exception as e:
             logger.warning(f"读取文件 {csv_file} 失败: {e}")
             
-    # 保存合并后的数据
-    if 'merged_df' in locals():
-        merged_df.sort_values('日期', inplace=True)
+    # 一次性按日期对齐合并, 保存
+    if series:
+        merged_df = merge_on_date(series)
         merge_file = output_dir / "reits_merged.csv"
-        merged_df.to_csv(merge_file, index=False)
+        write_table(merged_df, merge_file)
         logger.info(f"REITs合并数据已保存: {merge_file}")
         
     else:
@@ -153,29 +172,30 @@ def get_ak_metals_data():
     try:
         # date_str = datetime.now().strftime('%Y%m%d')
         # 黄金持仓数据
-        gold_data = ak.macro_cons_gold()
+        gold_data = cache_call(guarded('jin10', ak.macro_cons_gold), ttl=TTLS['metals'])
         
         gold_data['单价'] = gold_data['总价值']/gold_data['总库存']
         gold_data['单价'] = gold_data['单价'].round(2)
         
         filename = f"datas/raw/metals/macro_cons_gold.csv"
         ensure_dir(filename)
-        gold_data.to_csv(filename, index=False)
+        write_table(gold_data, filename)
         logger.info(f"黄金持仓数据: {filename} 已更新")
         
         # 白银持仓数据
-        silver_data = ak.macro_cons_silver()
+        silver_data = cache_call(guarded('jin10', ak.macro_cons_silver), ttl=TTLS['metals'])
         
         silver_data['单价'] = silver_data['总价值']/silver_data['总库存']
         silver_data['单价'] = silver_data['单价'].round(2)
         
         filename = f"datas/raw/metals/macro_cons_silver.csv"
         ensure_dir(filename)
-        silver_data.to_csv(filename, index=False)
+        write_table(silver_data, filename)
         logger.info(f"白银持仓数据: {filename} 已更新")
 
     except Exception as e:
         logger.error(f"获取akshare 贵金属数据失败: {str(e)}")
+        raise
         
     
 def get_ak_industry_data():
@@ -185,10 +205,10 @@ def get_ak_industry_data():
         
         # 行业分类数据
         
-        industry_list = ak.stock_sector_spot()
+        industry_list = guarded('sina', ak.stock_sector_spot)()
         filename = f"datas/raw/n_indexes/ak_industry_list_{date_str}.csv"
         ensure_dir(filename)
-        industry_list.to_csv(filename, index=False)
+        write_table(industry_list, filename)
         logger.info(f"行业分类数据: {filename} 已更新")
         
         # industry_list_dfcf = ak.stock_board_industry_name_em()  # 行业板块-名称， 推荐
@@ -207,53 +227,76 @@ def get_ak_bond_data():
         date_str = datetime.now().strftime('%Y%m%d')
         
         # 可转债数据
-        conv_bond = ak.bond_zh_cov()
+        conv_bond = guarded('eastmoney', ak.bond_zh_cov)()
         filename = f"datas/raw/bonds/ak_bond_zh_cov.csv"
         ensure_dir(filename)
-        conv_bond.to_csv(filename, index=False)
+        write_table(conv_bond, filename)
         logger.info(f"可转债数据: {filename} 已更新")
 
         # 国债收益率数据
-        bond_rate = ak.bond_zh_us_rate()
+        bond_rate = guarded('eastmoney', ak.bond_zh_us_rate)()
         filename = f"datas/raw/bonds/ak_cn_us_rate.csv"
         ensure_dir(filename)
-        bond_rate.to_csv(filename, index=False)
+        write_table(bond_rate, filename)
         logger.info(f"中美债券收益率数据: {filename} 已更新")
 
     except Exception as e:
         logger.error(f"获取akshare债券数据失败: {str(e)}")
+        raise
         
         
-def get_ak_index_global_data():
+def get_ak_index_global_data(max_workers: int = 8, incremental: bool = True):
     """
     获取 akshare 全球指数数据
+
+    Args:
+        max_workers: 并发下载历史数据的线程数, 单个指数失败不影响其他指数
+        incremental: 只追加比已保存数据更新的行, False 则全量覆盖
     """
     try:
         # date_str = datetime.now().strftime('%Y%m%d')
         # 全球指数列表
-        index_global = ak.index_global_spot_em()
+        index_global = guarded('eastmoney', ak.index_global_spot_em)()
         filename = f"datas/raw/indexes/ak_index_global_spot_em.csv"
         ensure_dir(filename)
-        index_global.to_csv(filename, index=False)
+        write_table(index_global, filename)
         logger.info(f"全球指数列表数据: {filename} 已更新")
-        
-        for symbol in index_global['名称'].unique():
-            df = ak.index_global_hist_em(symbol=symbol)
-            
-            filename = f"datas/raw/indexes/ak_index_global_hist_em_{symbol.replace('/', '')}.csv"
-            ensure_dir(filename)
-            df.to_csv(filename, index=False)
-            logger.info(f"全球指数 {symbol} 数据: {filename} 已更新")
 
     except Exception as e:
         logger.error(f"获取akshare全球指数数据失败: {str(e)}")
+        raise
+
+    def hist_file(symbol):
+        return f"datas/raw/indexes/ak_index_global_hist_em_{symbol.replace('/', '')}.csv"
+
+    def save_hist(symbol, df):
+        filename = hist_file(symbol)
+        ensure_dir(filename)
+        if incremental:
+            n = append_table(df, filename)
+            logger.info(f"全球指数 {symbol} 数据: {filename} 新增 {n} 行")
+        else:
+            write_table(df, filename)
+            logger.info(f"全球指数 {symbol} 数据: {filename} 已更新")
+        update_meta(filename)
+
+    report = fetch_concurrently(
+        index_global['名称'].unique(),
+        lambda symbol: fetch_since(ak.index_global_hist_em, last_date(hist_file(symbol)), symbol=symbol)
+        if incremental else ak.index_global_hist_em(symbol=symbol),
+        on_result=save_hist,
+        max_workers=max_workers,
+        host='eastmoney',
+    )
+    report.log("全球指数历史数据")
+    return report
         
     # merge_ak_index()
     
     
 def merge_ak_index():
     """
-    读取多个 akshare 全球指数数据, pd.merge 合并后保存为一个csv文件, 方便绘图
+    读取多个 akshare 全球指数数据, 按日期一次性对齐合并后保存为一个csv文件, 方便绘图
     数据的columns: 日期, 名称1, 名称2, 名称3, ...
     
     数据为归一化值
@@ -283,23 +326,27 @@ def merge_ak_index():
         '越南',
     ]
     csvs = []
-    for csv_file in index_dir.glob("ak_index_global_hist_em_*.csv"):
+    for csv_file in list_tables(index_dir, "ak_index_global_hist_em_*"):
         if any(tc in csv_file.stem.replace("ak_index_global_hist_em_", "") for tc in target_csv):
             csvs.append(csv_file)
     
     # 获取 start date
     start_date = get_start_date(csvs)
-    
+    if start_date is None:
+        # 没有文件, 或者各指数没有共同的交易日, 无法按同一天归一化
+        logger.error(f"{len(csvs)} 个全球指数没有共同起始日期, 跳过合并")
+        return
+
+    series = {}
     for csv_file in csvs:
         try:
             
-            df_tmp = pd.read_csv(csv_file)
+            df_tmp = read_table(csv_file)
             
             if "日期" in df_tmp.columns and "今开" in df_tmp.columns:
-                # 解析日期并归一化今开列
-                # dates = pd.to_datetime(df_tmp["日期"], errors="coerce")
+                # 归一化今开列
                 dates = df_tmp["日期"]
-                vals = pd.to_numeric(df_tmp["今开"], errors="coerce")
+                vals = df_tmp["今开"]
                 if vals.dropna().empty:
                     continue
 
@@ -310,44 +357,27 @@ def merge_ak_index():
                 norm = norm.round(2)
 
                 name = csv_file.stem.replace("ak_index_global_hist_em_", "")
-                
-                # 合并数据
-                if 'merged_df' in locals():
-                    merged_df = pd.merge(merged_df, pd.DataFrame({
-                        '日期': dates,
-                        name: norm
-                    }), on='日期', how='outer')
-                else:
-                    merged_df = pd.DataFrame({
-                        '日期': dates,
-                        name: norm
-                    })
+                series[name] = pd.Series(norm.values, index=dates.values)
 
         except Exception as e:
             logger.error(f"读取文件 {csv_file} 失败: {e}")
             
-    # 保存合并后的数据
-    if 'merged_df' in locals():
-        merged_df.sort_values('日期', inplace=True)
-        merge_file = output_dir / f"ak_index_global_merged_{start_date}.csv"
-        merged_df.to_csv(merge_file, index=False)
+    # 一次性按日期对齐合并, 保存
+    if series:
+        merged_df = merge_on_date(series)
+        merge_file = output_dir / f"ak_index_global_merged_{start_date:%Y-%m-%d}.csv"
+        write_table(merged_df, merge_file)
         logger.info(f"全球指数合并数据已保存: {merge_file}")
     else:
         logger.error("没有可合并的全球指数数据")
     
 
-def get_start_date(csvs: list) -> str:
+def get_start_date(csvs: list) -> pd.Timestamp:
     """
     获取多个csv文件的共同起始日期, 非连续
+    用元数据索引里的日期集合求交, 不读取文件; 没有文件或没有共同日期时返回 None
     """
-    k = '日期'
-    common_dates = set(pd.read_csv(csvs[0])[k])
-    for f in csvs[1:]:
-        common_dates &= set(pd.read_csv(f)[k])
-    common_dates = sorted(list(common_dates))
-        
-    if common_dates:
-        return min(common_dates)
+    return common_start_date(csvs)
 
 
 def get_ak_fund_data():
@@ -356,10 +386,10 @@ def get_ak_fund_data():
         date_str = datetime.now().strftime('%Y%m%d')
         
         # ETF基金列表
-        etf_list = ak.fund_etf_category_sina()
+        etf_list = guarded('sina', ak.fund_etf_category_sina)()
         filename = f"datas/raw/funds/ak_etf_list_{date_str}.csv"
         ensure_dir(filename)
-        etf_list.to_csv(filename, index=False)
+        write_table(etf_list, filename)
         logger.info(f"ETF基金列表: {filename} 已更新")
 
         # # 基金公司数据
@@ -372,6 +402,7 @@ def get_ak_fund_data():
         # ak.fund_portfolio_industry_allocation_em()  # 基金行业配置
     except Exception as e:
         logger.error(f"获取akshare基金数据失败: {str(e)}")
+        raise
     
     
 def get_ak_macro_data():
@@ -401,6 +432,7 @@ def get_ak_macro_data():
 
     except Exception as e:
         logger.error(f"获取akshare宏观数据失败: {str(e)}")
+        raise
 
 
 def get_ak_cpi_data():
@@ -408,44 +440,44 @@ def get_ak_cpi_data():
     # date_str = datetime.now().strftime('%Y%m%d')
     
     # cpi消费者物价指数
-    cpi_cn_data = ak.macro_china_cpi_yearly()
+    cpi_cn_data = cache_call(guarded('jin10', ak.macro_china_cpi_yearly), ttl=TTLS['macro'])
     filename = f"datas/raw/cpis/macro_china_cpi_yearly.csv"
     ensure_dir(filename)
-    cpi_cn_data.to_csv(filename, index=False)
+    write_table(cpi_cn_data, filename)
     logger.info(f"中国CPI数据: {filename} 已更新")
     
     # cpi 美国
-    cpi_usa = ak.macro_usa_cpi_yoy()
+    cpi_usa = cache_call(guarded('jin10', ak.macro_usa_cpi_yoy), ttl=TTLS['macro'])
     filename = f"datas/raw/cpis/macro_usa_cpi_yoy.csv"
     ensure_dir(filename)
-    cpi_usa.to_csv(filename, index=False)
+    write_table(cpi_usa, filename)
     logger.info(f"美国CPI数据: {filename} 已更新")
     # cpi 欧元区
-    cpi_enro = ak.macro_euro_cpi_yoy()
+    cpi_enro = cache_call(guarded('jin10', ak.macro_euro_cpi_yoy), ttl=TTLS['macro'])
     filename = f"datas/raw/cpis/macro_euro_cpi_yoy.csv"
     ensure_dir(filename)
-    cpi_enro.to_csv(filename, index=False)
+    write_table(cpi_enro, filename)
     logger.info(f"欧元区CPI数据: {filename} 已更新")
     
     # cpi 澳大利亚
-    cpi_australia = ak.macro_australia_cpi_yearly()
+    cpi_australia = cache_call(guarded('jin10', ak.macro_australia_cpi_yearly), ttl=TTLS['macro'])
     filename = f"datas/raw/cpis/macro_australia_cpi_yearly.csv"
     ensure_dir(filename)
-    cpi_australia.to_csv(filename, index=False)
+    write_table(cpi_australia, filename)
     logger.info(f"澳大利亚CPI数据: {filename} 已更新")
     
     # cpi 加拿大
-    cpi_canada = ak.macro_canada_cpi_yearly()
+    cpi_canada = cache_call(guarded('jin10', ak.macro_canada_cpi_yearly), ttl=TTLS['macro'])
     filename = f"datas/raw/cpis/macro_canada_cpi_yearly.csv"
     ensure_dir(filename)
-    cpi_canada.to_csv(filename, index=False)
+    write_table(cpi_canada, filename)
     logger.info(f"加拿大CPI数据: {filename} 已更新")
     
     # cpi 日本
-    cpi_japan = ak.macro_japan_cpi_yearly()
+    cpi_japan = cache_call(guarded('jin10', ak.macro_japan_cpi_yearly), ttl=TTLS['macro'])
     filename = f"datas/raw/cpis/macro_japan_cpi_yearly.csv"
     ensure_dir(filename)
-    cpi_japan.to_csv(filename, index=False)
+    write_table(cpi_japan, filename)
     logger.info(f"日本CPI数据: {filename} 已更新")
     
     
@@ -453,31 +485,31 @@ def get_ak_gdp_data():
     
     # date_str = datetime.now().strftime('%Y%m%d')
     # china gdp
-    china_gdp = ak.macro_china_gdp_yearly()
+    china_gdp = cache_call(guarded('jin10', ak.macro_china_gdp_yearly), ttl=TTLS['macro'])
     filename = f"datas/raw/gdps/ak_china_gdp.csv"
     ensure_dir(filename)
-    china_gdp.to_csv(filename, index=False)
+    write_table(china_gdp, filename)
     logger.info(f"中国GDP数据: {filename} 已更新")
     
     # usa gdp
-    usa_gdp = ak.macro_usa_gdp_monthly()  # usa gdp
+    usa_gdp = cache_call(guarded('jin10', ak.macro_usa_gdp_monthly), ttl=TTLS['macro'])  # usa gdp
     filename = f"datas/raw/gdps/ak_usa_gdp.csv"
     ensure_dir(filename)
-    usa_gdp.to_csv(filename, index=False)
+    write_table(usa_gdp, filename)
     logger.info(f"美国GDP数据: {filename} 已更新")
     
     # euro gdp
-    enro_gdp = ak.macro_euro_gdp_yoy()  # euro gdp
+    enro_gdp = cache_call(guarded('jin10', ak.macro_euro_gdp_yoy), ttl=TTLS['macro'])  # euro gdp
     filename = f"datas/raw/gdps/ak_euro_gdp.csv"
     ensure_dir(filename)
-    enro_gdp.to_csv(filename, index=False)
+    write_table(enro_gdp, filename)
     logger.info(f"欧元区GDP数据: {filename} 已更新")
     
     # canada gdp
-    canada_gdp = ak.macro_canada_gdp_monthly()
+    canada_gdp = cache_call(guarded('jin10', ak.macro_canada_gdp_monthly), ttl=TTLS['macro'])
     filename = f"datas/raw/gdps/ak_canada_gdp.csv"
     ensure_dir(filename)
-    canada_gdp.to_csv(filename, index=False)
+    write_table(canada_gdp, filename)
     logger.info(f"加拿大GDP数据: {filename} 已更新")
 
 def get_yf_market_data():
@@ -539,13 +571,14 @@ def get_ef_stock_data():
             'ETF',
         ]:
             # PE in data
-            df = ef.stock.get_realtime_quotes(k)
+            df = guarded('eastmoney', ef.stock.get_realtime_quotes)(k)
             filename = f"datas/raw/stocks/ef_{k}.csv"
-            df.to_csv(filename, index=False)
+            write_table(df, filename)
             logger.info(f"ef {k} 数据: {filename} 已更新")
 
     except Exception as e:
         logger.error(f"获取ef股票数据失败: {str(e)}")
+        raise
 
 
 def get_ef_bond_data():
@@ -557,13 +590,14 @@ def get_ef_bond_data():
         # filename = f"datas/raw/bonds/ef_bond_list_{date_str}.csv"
         # bond_list.to_csv(filename, index=False)
         
-        bond_base_info = ef.bond.get_all_base_info()
+        bond_base_info = cache_call(guarded('eastmoney', ef.bond.get_all_base_info), ttl=TTLS['bond_info'])
         filename = f"datas/raw/bonds/ef_get_all_base_info.csv"
-        bond_base_info.to_csv(filename, index=False)
+        write_table(bond_base_info, filename)
         logger.info(f"债券数据: {filename} 已更新")
 
     except Exception as e:
         logger.error(f"获取债券数据失败: {str(e)}")
+        raise
 
 
 def get_ef_futures_data():
@@ -571,10 +605,10 @@ def get_ef_futures_data():
     try:
         # 获取期货合约列表
         date_str = datetime.now().strftime('%Y%m%d')
-        futures_list = ef.futures.get_realtime_quotes()
+        futures_list = guarded('eastmoney', ef.futures.get_realtime_quotes)()
         filename = f"datas/raw/futures/ef_futures_list_{date_str}.csv"
         ensure_dir(filename)
-        futures_list.to_csv(filename, index=False)
+        write_table(futures_list, filename)
         logger.info(f"期货合约列表数据: {filename} 已更新")
 
     except Exception as e:
@@ -584,17 +618,18 @@ def get_ef_futures_data():
 def get_ak_jsl_bond():
     try:
         cookies = os.getenv('JISILU_COOKIES')
-        df = ak.bond_cb_jsl(cookie=cookies)
+        df = guarded('jisilu', ak.bond_cb_jsl)(cookie=cookies)
         if len(df) < 200:
-            logger.error(f'jsl df get fail, need to login: https://www.jisilu.cn/data/cbnew/#cb')
-            return
+            raise RuntimeError(f'jsl 只返回 {len(df)} 条, 需要登录: https://www.jisilu.cn/data/cbnew/#cb')
         # breakpoint()
         filename = f"datas/raw/bonds/conv_{datetime.now().strftime("%Y%m%d")}.csv"
-        df.to_csv(filename, index=False)    
+        write_table(df, filename)    
         logger.info(f"jsl债券数据: {filename} 已更新")
+        append_snapshot(df, datetime.now())
 
     except Exception as e:
         logger.error(f"获取jsl债券数据失败: {str(e)}")
+        raise
     
 
 def get_eq_stock_data():
@@ -604,10 +639,10 @@ def get_eq_stock_data():
     date_str = datetime.now().strftime('%Y%m%d')
     
     obj = eq.use("sina")
-    res = obj.market_snapshot(prefix=True)
+    res = guarded('sina', obj.market_snapshot)(prefix=True)
     df = pd.DataFrame(res).T.reset_index().rename(columns={"index": "code"})
     filename = f"datas/raw/stocks/eq_stocks_{date_str}.csv"
-    df.to_csv(filename, index=False)
+    write_table(df, filename)
     logger.info(f"eq股票数据: {filename} 已更新")
 
 
@@ -616,9 +651,9 @@ def ana_ak_bonds(bond_id2names: dict):
     对特定债券进行分析
     """
     for bond_id, bond_name in bond_id2names.items():
-        df_detail = ak.bond_zh_cov_value_analysis(bond_id)
+        df_detail = guarded('eastmoney', ak.bond_zh_cov_value_analysis)(bond_id)
         breakpoint()
-        df_detail.to_csv(f'datas/raw/bonds/details/{bond_name}.csv', index=False)
+        write_table(df_detail, f'datas/raw/bonds/details/{bond_name}.csv')
         
 
 def ana_ef_fund(codes: list):
@@ -627,17 +662,17 @@ def ana_ef_fund(codes: list):
         date_str = datetime.now().strftime('%Y%m%d')
         
         for code in codes:
-            ef.fund.get_pdf_reports(code)      # 基金公告, 非常老旧10年前的pdf
+            guarded('eastmoney', ef.fund.get_pdf_reports)(code)      # 基金公告, 非常老旧10年前的pdf
             logger.info(f"{code}基金pdf, 已更新")
             
-            df0 = ef.fund.get_base_info(code)        # 基金基本信息
+            df0 = guarded('eastmoney', ef.fund.get_base_info)(code)        # 基金基本信息
             filename = f"datas/raw/funds/ef_get_base_info_{date_str}.csv"
-            df0.to_csv(filename, index=False)
+            write_table(df0, filename)
             logger.info(f"{code} 基金基本信息: {filename} 已更新")
             
-            df = ef.fund.get_types_percentage(code)  # 基金类型占比
+            df = guarded('eastmoney', ef.fund.get_types_percentage)(code)  # 基金类型占比
             filename = f"datas/raw/funds/ef_get_types_percentage_{date_str}.csv"
-            df.to_csv(filename, index=False)
+            write_table(df, filename)
             logger.info(f"{code} 基金类型占比: {filename} 已更新")
             # df2 = ef.stock.get_members(code)         # 获取指数的成分股, FIXME: notwork
             
@@ -679,13 +714,37 @@ def update_ak3():
     merge_ak_reits()
     
     
+def _today(pattern: str) -> str:
+    return pattern.format(date=datetime.now().strftime('%Y%m%d'))
+
+
+# 任务图: 抓取任务互相独立, 并发执行; 合并任务依赖对应的抓取任务
+# outputs 用于判断是否已是最新, 不带后缀, csv/parquet 都算
+# 任务函数出错时抛出异常, 批量下载返回 FetchReport, 有失败的也算任务失败, 重跑时会再执行
+PIPELINE = [
+    Task('ef_stock', get_ef_stock_data, outputs=['datas/raw/stocks/ef_*.*']),
+    Task('ef_bond', get_ef_bond_data, outputs=['datas/raw/bonds/ef_get_all_base_info.*']),
+    Task('jsl_bond', get_ak_jsl_bond, outputs=[_today('datas/raw/bonds/conv_{date}.*')]),
+    Task('news', get_ak_news_data, outputs=['datas/raw/news/ak_stock_info_*.*']),
+    Task('metals', get_ak_metals_data, outputs=['datas/raw/metals/macro_cons_*.*']),
+    Task('ak_bond', get_ak_bond_data, outputs=['datas/raw/bonds/ak_cn_us_rate.*']),
+    Task('fund', get_ak_fund_data, outputs=[_today('datas/raw/funds/ak_etf_list_{date}.*')]),
+    Task('macro', get_ak_macro_data, outputs=['datas/raw/cpis/macro_*.*', 'datas/raw/gdps/ak_*_gdp.*']),
+    Task('reits', get_ak_reits_data, outputs=['datas/raw/reits/reits_hist_em_*.*']),
+    Task('index_global', get_ak_index_global_data, outputs=['datas/raw/indexes/ak_index_global_hist_em_*.*']),
+    Task('merge_reits', merge_ak_reits, deps=['reits'], outputs=['datas/processed/reits/reits_merged.*']),
+    Task('merge_index', merge_ak_index, deps=['index_global'], outputs=['datas/processed/indexes/ak_index_global_merged_*.*']),
+]
+
+
 if __name__ == "__main__":
+    import sys
     from utils.set_log import set_log
     set_log('update_datas.log')
-    
-    update_ef()
-    update_ak0()
-    update_ak1()
-    update_ak2()
-    update_ak3()
+
+    # --force: 忽略已是最新的输出、上次的执行状态和数据源缓存, 全部重跑
+    force = '--force' in sys.argv
+    if force:
+        os.environ['CACHE_REFRESH'] = '1'
+    run_pipeline(PIPELINE, max_workers=4, force=force)
     
\ No newline at end of file